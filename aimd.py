@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# AIMD 적응형 동시성 제어 (asyncio.Semaphore 대체품)
+# - 공용 HEALTH 창(최근 AIMD_WINDOW_SEC 초): API 결과(ok/에러, 지연 ms) + 이벤트루프 지연(lag — looplag.LAG 샘플러)
+# - 창마다 한 번 판단:
+#     에러율 > AIMD_ERR_MAX  또는 p95 > AIMD_P95_MS  또는 lag > AIMD_LAG_MS  → limit *= AIMD_BETA (곱 감소)
+#     그 외 + 창 동안 limit까지 꽉 찼던 적 있음                            → limit += 1 (합 증가)
+# - SHOWS: 동시에 도는 회차 수 / API: 동시에 나가는 API 호출 수
+# 사용:
+#   async with SHOWS: ...                       # Semaphore처럼
+#   async with API.slot() as o:                 # 결과 기록(예외 → 에러)
+#       resp = ...; o.ok = resp.status < 500
+# ENV: AIMD_ENABLE=1, AIMD_SHOWS_MAX=8, AIMD_API_INIT=6, AIMD_API_MAX=16,
+#      AIMD_WINDOW_SEC=3, AIMD_ERR_MAX=0.1, AIMD_P95_MS=2500, AIMD_LAG_MS=250, AIMD_BETA=0.5
+#      SHOWS_CONCURRENCY=0 (>0 이면 러너별 시작값/상한 대신 이 값 — 러너 간 같은 조건 비교용, e2ebench)
+
+import asyncio, os, time, weakref
+from collections import deque
+from contextlib import asynccontextmanager
+
+from looplag import LAG
+
+AIMD_ENABLE     = os.getenv("AIMD_ENABLE", "1") == "1"
+AIMD_SHOWS_MAX  = int(os.getenv("AIMD_SHOWS_MAX", "8"))
+AIMD_API_INIT   = int(os.getenv("AIMD_API_INIT", "6"))
+AIMD_API_MAX    = int(os.getenv("AIMD_API_MAX", "16"))
+AIMD_WINDOW_SEC = float(os.getenv("AIMD_WINDOW_SEC", "3"))
+AIMD_ERR_MAX    = float(os.getenv("AIMD_ERR_MAX", "0.1"))
+AIMD_P95_MS     = float(os.getenv("AIMD_P95_MS", "2500"))
+AIMD_LAG_MS     = float(os.getenv("AIMD_LAG_MS", "250"))
+AIMD_BETA       = float(os.getenv("AIMD_BETA", "0.5"))
+AIMD_MIN_SAMPLES = 4
+SHOWS_CONCURRENCY = int(os.getenv("SHOWS_CONCURRENCY", "0"))
+
+
+class _Health:
+    """최근 창의 API 결과 + 루프 지연. 모든 limiter가 읽기 전용으로 공유."""
+    def __init__(self):
+        self.obs = deque()     # (t, ok, ms)
+
+    def _trim(self, now):
+        lo = now - AIMD_WINDOW_SEC
+        while self.obs and self.obs[0][0] < lo: self.obs.popleft()
+
+    def observe(self, ok: bool, ms: float):
+        now = time.monotonic()
+        self.obs.append((now, bool(ok), float(ms)))
+        self._trim(now)
+
+    def stats(self) -> dict:
+        self._trim(time.monotonic())
+        n = len(self.obs)
+        errs = sum(1 for _, ok, _ in self.obs if not ok)
+        lat = sorted(ms for _, _, ms in self.obs)
+        p95 = lat[min(n - 1, int(n * 0.95))] if n else 0.0
+        lag = LAG.recent_max(AIMD_WINDOW_SEC)
+        return {"n": n, "err": (errs / n) if n else 0.0, "p95": p95, "lag": lag}
+
+    def ensure_lag_sampler(self):
+        # 루프 지연은 looplag 샘플러 하나만 (LOOPLAG_ENABLE=0 이어도 샘플러는 켬)
+        try:
+            LAG.start(need=True)
+        except RuntimeError:
+            pass
+
+
+HEALTH = _Health()
+
+
+class _Obs:
+    __slots__ = ("ok",)
+    def __init__(self): self.ok = True
+
+
+LIMITERS = weakref.WeakSet()     # metrics 스크레이프 시 limit/inflight/대기열 수집
+
+
+class AdaptiveLimiter:
+    def __init__(self, name: str, initial: int, *, lo: int = 1, hi: int | None = None):
+        self.name = name
+        self.lo = max(1, int(lo))
+        self.hi = max(self.lo, int(hi or initial))
+        self.limit = float(min(max(initial, self.lo), self.hi))
+        self.inflight = 0
+        self.waiters = deque()
+        self.saturated = False
+        self.t_adj = time.monotonic()
+        self.history = []      # (t, limit, reason)
+        LIMITERS.add(self)
+
+    # --- Semaphore 호환 ---
+    async def acquire(self):
+        HEALTH.ensure_lag_sampler()
+        cap = int(self.limit) if AIMD_ENABLE else self.hi
+        if self.inflight < cap and not self.waiters:
+            self.inflight += 1
+            if self.inflight >= cap: self.saturated = True
+            return True
+        self.saturated = True
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        try:
+            await fut
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self.release()   # 깨워졌는데 취소됨 → 슬롯 반납
+            else:
+                try: self.waiters.remove(fut)
+                except ValueError: pass
+            raise
+        return True
+
+    def release(self):
+        self.inflight = max(0, self.inflight - 1)
+        self._maybe_adjust()
+        self._wake()
+
+    def _wake(self):
+        cap = int(self.limit) if AIMD_ENABLE else self.hi
+        while self.waiters and self.inflight < cap:
+            fut = self.waiters.popleft()
+            if fut.done(): continue
+            self.inflight += 1
+            fut.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+        return False
+
+    def locked(self) -> bool:
+        return self.inflight >= int(self.limit)
+
+    # --- 결과 기록 + AIMD ---
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        o, t0 = _Obs(), time.monotonic()
+        try:
+            yield o
+        except BaseException:
+            o.ok = False
+            raise
+        finally:
+            HEALTH.observe(o.ok, (time.monotonic() - t0) * 1000.0)
+            self.release()
+
+    def _maybe_adjust(self):
+        if not AIMD_ENABLE:
+            return
+        now = time.monotonic()
+        if now - self.t_adj < AIMD_WINDOW_SEC:
+            return
+        st = HEALTH.stats()
+        old = self.limit
+        reason = ""
+        if st["n"] >= AIMD_MIN_SAMPLES and st["err"] > AIMD_ERR_MAX:
+            reason = f"err={st['err']:.2f}"
+        elif st["n"] >= AIMD_MIN_SAMPLES and st["p95"] > AIMD_P95_MS:
+            reason = f"p95={st['p95']:.0f}ms"
+        elif st["lag"] > AIMD_LAG_MS:
+            reason = f"lag={st['lag']:.0f}ms"
+        if reason:
+            self.limit = max(float(self.lo), self.limit * AIMD_BETA)
+        elif self.saturated:
+            self.limit = min(float(self.hi), self.limit + 1.0)
+            reason = "+1"
+        self.saturated = False
+        self.t_adj = now
+        if int(self.limit) != int(old):
+            self.history.append((round(now, 2), int(self.limit), reason))
+            print(f"[AIMD] {self.name} limit {int(old)} → {int(self.limit)} ({reason})", flush=True)
+
+    def report(self) -> str:
+        st = HEALTH.stats()
+        return (f"[AIMD] {self.name}: limit={int(self.limit)} (lo={self.lo}, hi={self.hi}) changes={len(self.history)}"
+                f" | window n={st['n']} err={st['err']:.2f} p95={st['p95']:.0f}ms lag={st['lag']:.0f}ms")
+
+
+# API 호출 동시성 (모든 스크립트 공용)
+API = AdaptiveLimiter("api", AIMD_API_INIT, hi=AIMD_API_MAX)
+
+
+def shows_limiter(initial: int, name: str = "shows") -> AdaptiveLimiter:
+    """회차 동시성 limiter. 시작값=기존 하드코딩 값, 상한=AIMD_SHOWS_MAX(시작값보다 작으면 시작값)."""
+    if SHOWS_CONCURRENCY > 0:
+        return AdaptiveLimiter(name, SHOWS_CONCURRENCY, hi=SHOWS_CONCURRENCY)
+    return AdaptiveLimiter(name, initial, hi=max(int(initial), AIMD_SHOWS_MAX))
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+# 페이지 없는 API 전용 스냅샷 엔진 (읽기 전용 조회에 회차별 렌더러 불필요)
+# - 기존: bt --info-only 도 회차마다 페이지를 열고 resMain/booking 네비게이션으로 prodSeq/sdSeq/CSRF 수확,
+#         모든 XHR 을 page.evaluate(fetch) 로 실행 / biff_patched.snapshot_sd 는 post_api(CSRF) 때문에 살아있는 page 필요
+# - 여기: 로그인 한 번 → export_session(ctx) 으로 쿠키 + CSRF 토큰 + UA 를 뽑아 ApiSession(httpx) 생성
+#         이후 회차 조회는 HTTP 호출만 (filmapi prodList → prodSeq/sdSeq, RS/seat API → plan/총/잔여/종류별/티켓타입)
+#   ApiSession 은 page 자리에 그대로 넘김 (집계 로직은 러너 것 그대로 → 결과 레코드 동일):
+#     biff_patched: snapshot_sd(api, sd)  — fetch_json 이 api.request.fetch 로, post_api 의 CSRF 는 api.csrf
+#     bt          : xhr(api, ...)         — page.evaluate(fetch) 대신 api.xhr (JSON → form 폴백 동일)
+# - 세션/CSRF 만료 (401/403/419/440, 로그인 HTML/리다이렉트, csrf 오류 — warmstate.session_lost 기준)
+#     → refresh 콜백(page_refresher)이 페이지 하나 빌려 재수확 → 쿠키/토큰 교체 후 그 요청 1회 재시도
+#     동시에 여러 회차가 만료를 보면 갱신은 한 번만 (세대 번호), 본문/헤더의 옛 토큰은 새 토큰으로 치환
+# - 세션 파일(APISNAP_SESSION_FILE) 로 저장하면 브라우저 없는 프로세스에서도 조회 가능:
+#     python apisnap.py 001 002     (refresh 불가 → 만료되면 그 회차는 오류로 기록)
+#   ⚠ 쿠키/토큰 원문이 들어감 → 0600 으로 기록, 공유 금지
+# 사용:
+#   api = await export_session(ctx, page=login_page, refresh=page_refresher(ctx, harvest, [url, ...]))
+#   snap = await snapshot_sd(api, "001")
+#   print(api.report()); await api.close()
+# ENV: APISNAP=1, APISNAP_TIMEOUT_SEC=15, APISNAP_REFRESH_MAX=3, APISNAP_SESSION_FILE= (비우면 저장 안 함)
+
+import asyncio, json, os, sys, time, urllib.parse
+from collections import Counter
+from pathlib import Path
+
+import standin
+from warmstate import session_lost
+
+APISNAP = os.getenv("APISNAP", "1") == "1"
+APISNAP_TIMEOUT_SEC = float(os.getenv("APISNAP_TIMEOUT_SEC", "15"))
+APISNAP_REFRESH_MAX = int(os.getenv("APISNAP_REFRESH_MAX", "3"))
+APISNAP_SESSION_FILE = os.getenv("APISNAP_SESSION_FILE", "")
+
+CSRF_COOKIES = ("XSRF-TOKEN", "CSRF-TOKEN", "X-CSRF-TOKEN", "csrfToken")
+
+
+def csrf_from_cookies(cookies) -> str:
+    for c in cookies or ():
+        if c.get("name") in CSRF_COOKIES and c.get("value"):
+            return urllib.parse.unquote(c["value"])
+    return ""
+
+
+def stale(status: int, text: str, url: str = "") -> bool:
+    """세션/CSRF 갱신이 필요한 응답인가 (로그인으로 리다이렉트, 유실 상태코드/메시지, csrf 오류)."""
+    if "/login" in urllib.parse.urlsplit(url or "").path:
+        return True
+    body = text or ""
+    if body[:1] in ("{", "["):
+        try: body = json.loads(body)
+        except ValueError: pass
+    if session_lost(status, body):
+        return True
+    return status >= 400 and "csrf" in (text or "")[:400].lower()
+
+
+class _Resp:
+    """APIRequestContext 응답 최소 호환 (status / headers / url / text() / json())."""
+    __slots__ = ("status", "headers", "url", "_text")
+
+    def __init__(self, status, headers, url, text):
+        self.status, self.headers, self.url, self._text = status, headers, url, text
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    async def text(self) -> str:
+        return self._text
+
+    async def json(self):
+        return json.loads(self._text)
+
+
+class _Requester:
+    """page.request 자리 — fetch/get/post(url, headers=, data=, params=, timeout=ms)."""
+    def __init__(self, api: "ApiSession"):
+        self.api = api
+
+    async def fetch(self, url, method="GET", headers=None, data=None, params=None, timeout=None, **_):
+        return await self.api.send(method, url, headers, data, params=params, timeout_ms=timeout)
+
+    async def get(self, url, headers=None, params=None, timeout=None, **_):
+        return await self.api.send("GET", url, headers, None, params=params, timeout_ms=timeout)
+
+    async def post(self, url, headers=None, data=None, form=None, params=None, timeout=None, **_):
+        if form is not None:
+            data = urllib.parse.urlencode(form)
+            headers = {"Content-Type": "application/x-www-form-urlencoded", **(headers or {})}
+        return await self.api.send("POST", url, headers, data, params=params, timeout_ms=timeout)
+
+
+def _swap(v, old: str, new: str):
+    """요청 본문/헤더 값 안의 옛 CSRF 토큰 → 새 토큰 (urlencoded 형태 포함)."""
+    if isinstance(v, str):
+        return v.replace(old, new).replace(urllib.parse.quote(old, safe=""), urllib.parse.quote(new, safe=""))
+    if isinstance(v, (bytes, bytearray)):
+        return _swap(bytes(v).decode("utf-8", "ignore"), old, new).encode("utf-8")
+    if isinstance(v, dict):
+        return {k: _swap(x, old, new) for k, x in v.items()}
+    return v
+
+
+class ApiSession:
+    def __init__(self, cookies=(), csrf: str = "", ua: str = "", refresh=None):
+        self.cookies = list(cookies)
+        self.csrf = csrf or csrf_from_cookies(self.cookies)
+        self.ua = ua
+        self.refresh_fn = refresh          # async () -> (cookies, csrf)
+        self.request = _Requester(self)
+        self.gen = 0
+        self.lock = asyncio.Lock()
+        self.client = None
+        self.stats = Counter()             # req / stale / refresh / refresh_fail / retry_ok / err
+
+    # ---------- 전송 ----------
+    def _client(self):
+        if self.client is None:
+            import httpx   # APISNAP 경로에서만 필요
+            self.client = httpx.AsyncClient(follow_redirects=True, timeout=APISNAP_TIMEOUT_SEC,
+                                            headers={"User-Agent": self.ua} if self.ua else None)
+            self._apply(self.cookies)
+        return self.client
+
+    def _apply(self, cookies):
+        jar = self.client.cookies
+        for c in cookies or ():
+            if c.get("name") and c.get("value") is not None:
+                jar.set(c["name"], c["value"], domain=c.get("domain") or "", path=c.get("path") or "/")
+
+    async def _once(self, method, url, headers, data, params, timeout_ms) -> _Resp:
+        if standin.STANDIN:   # e2ebench: maketicket 호스트 → 로컬 스탠드인
+            url, headers = standin.rewrite(url), {**(headers or {}), "x-standin-direct": "1"}
+        kw = {"headers": headers or {}, "params": params}
+        if data is not None:
+            kw["json" if isinstance(data, (dict, list)) else "content"] = data
+        if timeout_ms:
+            kw["timeout"] = float(timeout_ms) / 1000.0
+        self.stats["req"] += 1
+        try:
+            r = await self._client().request(method.upper(), url, **kw)
+        except Exception:
+            self.stats["err"] += 1
+            raise
+        return _Resp(r.status_code, r.headers, str(r.url), r.text)
+
+    async def send(self, method, url, headers=None, data=None, params=None, timeout_ms=None, refresh=True) -> _Resp:
+        gen, tok = self.gen, self.csrf
+        r = await self._once(method, url, headers, data, params, timeout_ms)
+        if not refresh or not stale(r.status, r._text, r.url):
+            return r
+        self.stats["stale"] += 1
+        if not await self._refresh(gen):
+            return r
+        if tok and self.csrf and tok != self.csrf:
+            headers, data = _swap(dict(headers or {}), tok, self.csrf), _swap(data, tok, self.csrf)
+        r = await self._once(method, url, headers, data, params, timeout_ms)
+        if not stale(r.status, r._text, r.url):
+            self.stats["retry_ok"] += 1
+        return r
+
+    async def _refresh(self, gen: int) -> bool:
+        """세션/CSRF 갱신 (한 번에 하나). 그 사이 다른 요청이 이미 갱신했으면 바로 True."""
+        if self.refresh_fn is None:
+            return False
+        async with self.lock:
+            if self.gen != gen:
+                return True
+            if self.stats["refresh"] >= APISNAP_REFRESH_MAX:
+                return False
+            self.stats["refresh"] += 1
+            t0 = time.monotonic()
+            try:
+                cookies, csrf = await self.refresh_fn()
+            except Exception as e:
+                self.stats["refresh_fail"] += 1
+                print(f"[APISNAP] 세션 갱신 실패: {e}", flush=True)
+                return False
+            if self.client is not None:
+                self._apply(cookies)
+            self.cookies = list(cookies or self.cookies)
+            self.csrf = csrf or csrf_from_cookies(cookies) or self.csrf
+            self.gen += 1
+            print(f"[APISNAP] 세션/CSRF 갱신 #{self.stats['refresh']} ({(time.monotonic() - t0) * 1000:.0f}ms,"
+                  f" csrf={'ok' if self.csrf else '-'})", flush=True)
+            return True
+
+    # ---------- bt in-page fetch 호환 ----------
+    async def xhr(self, url, method="GET", params=None, data=None, headers=None, timeout=None) -> dict:
+        """bt.xhr 의 page.evaluate(fetch) 대체: JSON 본문 → POST 실패 시 form 본문. {"status", "body", "mode"}"""
+        m = method.upper()
+        base = {"Accept": "application/json, text/plain, */*", "X-Requested-With": "XMLHttpRequest"}
+        tmo = timeout * 1000 if timeout else None
+        # POST 의 JSON 시도는 갱신 없이 (실패하면 form 으로 다시 보내고, 만료면 그때 갱신 → 갱신 횟수 낭비 X)
+        r = await self.send(m, url, {**base, "Content-Type": "application/json", **(headers or {})},
+                            None if m == "GET" else json.dumps(data or {}), params=params, timeout_ms=tmo,
+                            refresh=(m == "GET"))
+        mode = "json"
+        if not r.ok and m == "POST":
+            form = urllib.parse.urlencode({k: str(v) for k, v in (data or {}).items()})
+            r = await self.send(m, url, {**base, "Content-Type": "application/x-www-form-urlencoded", **(headers or {})},
+                                form, params=params, timeout_ms=tmo)
+            mode = "form"
+        try:
+            body = json.loads(r._text)
+        except ValueError:
+            body = None
+        return {"status": r.status, "body": body, "mode": mode}
+
+    # ---------- 세션 파일 ----------
+    def export_cookies(self) -> list[dict]:
+        if self.client is None:
+            return list(self.cookies)
+        return [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+                for c in self.client.cookies.jar]
+
+    def save(self, path) -> Path:
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(p, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"saved": time.time(), "ua": self.ua, "csrf": self.csrf, "cookies": self.export_cookies()},
+                      f, ensure_ascii=False)
+        return p
+
+    @classmethod
+    def load(cls, path, refresh=None) -> "ApiSession":
+        d = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(d.get("cookies") or [], d.get("csrf") or "", d.get("ua") or "", refresh)
+
+    async def close(self):
+        if APISNAP_SESSION_FILE and (self.stats["req"] or self.stats["refresh"]):
+            try: self.save(APISNAP_SESSION_FILE)   # 서버가 갱신한 쿠키까지 다음 실행으로
+            except Exception as e: print(f"[APISNAP] 세션 저장 실패: {e}", flush=True)
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def report(self) -> str:
+        st = self.stats
+        return (f"[APISNAP] req={st['req']} stale={st['stale']} refresh={st['refresh']}"
+                f" (fail={st['refresh_fail']}) retry_ok={st['retry_ok']} err={st['err']}")
+
+
+# ---------- 브라우저 세션 → ApiSession ----------
+def page_refresher(bctx, harvest, urls):
+    """refresh 콜백: 페이지 하나 빌려 urls 를 차례로 열고 harvest(page) 로 CSRF 수확 → (쿠키, 토큰).
+    urls 는 리스트 또는 리스트를 돌려주는 함수 (최근 회차 RS 주소 등)."""
+    async def _refresh():
+        page = await bctx.new_page()
+        try:
+            tok = ""
+            for u in (urls() if callable(urls) else urls):
+                try:
+                    await page.goto(u, wait_until="domcontentloaded", timeout=int(APISNAP_TIMEOUT_SEC * 1000))
+                except Exception:
+                    continue
+                tok = await harvest(page) or ""
+                if tok:
+                    break
+            return await bctx.cookies(), tok
+        finally:
+            await page.close()
+    return _refresh
+
+
+async def export_session(bctx, csrf: str = "", page=None, refresh=None) -> ApiSession:
+    """로그인된 BrowserContext 의 쿠키(+CSRF, UA) → ApiSession. 토큰이 없으면 refresh 로 한 번 수확.
+    httpx 가 없으면 여기서 ImportError → 호출 쪽(러너)이 페이지 경로로 폴백."""
+    import httpx  # noqa: F401 — 첫 요청이 아니라 export 시점에 실패해야 폴백 가능
+    ua = ""
+    if page is not None:
+        try: ua = await page.evaluate("navigator.userAgent")
+        except Exception: pass
+    api = ApiSession(await bctx.cookies(), csrf, ua, refresh)
+    if not api.csrf and refresh is not None:
+        await api._refresh(api.gen)
+    if APISNAP_SESSION_FILE:
+        print(f"[APISNAP] 세션 저장 → {api.save(APISNAP_SESSION_FILE)} (0600, 공유 금지)", flush=True)
+    return api
+
+
+async def _main(codes: list[str]) -> int:
+    if not APISNAP_SESSION_FILE or not os.path.exists(APISNAP_SESSION_FILE):
+        print("[APISNAP] APISNAP_SESSION_FILE 필요 (러너 실행 중 export 된 세션 파일)")
+        return 2
+    sys.argv = sys.argv[:1]
+    import biff_patched as bp
+    api = ApiSession.load(APISNAP_SESSION_FILE)
+    try:
+        snaps = await bp.snapshot_many(api, codes or bp.SD_CODES, on_result=bp._log_snapshot_line)
+    finally:
+        await api.close()
+    print(api.report())
+    return 0 if all(s and not s.get("__error__") for s in snaps) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+# 실행 아티팩트 압축·중복 제거·보존 정책 (_har, _netlog, runs, debug, out, ...)
+# - pack  : ARCHIVE_OLDER_H 시간보다 오래된 파일을 날짜별 zip(_archive/artifacts-YYYYmmdd.zip)으로
+#           내용 해시(sha256) 기준 중복 제거 → blobs/<sha> 로 한 번만 저장, 원본 경로는 매니페스트에
+#           (같은 HAR 이 두 번 떨어진 capture_…-224120 / -224919 같은 경우 blob 하나)
+#           zip 기록이 끝난 뒤에만 원본 삭제 (--keep 이면 유지), 빈 폴더 정리
+# - prune : 날짜 아카이브 단위로 ARCHIVE_MAX_DAYS 넘은 것 → 삭제, 그래도 ARCHIVE_MAX_MB 넘으면 오래된 순 삭제
+# - list / cat / stats : 인덱스(_archive/index.json)만 보고 조회 — 폴더 스캔 없음
+# - 코드에서 읽기: "archive:" 접두 가상 경로
+#     paths = glob("archive:_har/*.har")  → ["archive:_har/capture_….har", ...]
+#     load_json(p) / read_bytes(p)        → 실제 파일·가상 경로 모두
+#   (biff_patched HAR 인덱스: HAR_PATHS="./_har;archive:_har/*.har", harstat: python harstat.py "archive:_har/*.har")
+# 사용:
+#   python artifacts.py pack [--dry-run] [--keep] [--older-than-h 6]
+#   python artifacts.py prune [--max-days 30] [--max-mb 200]
+#   python artifacts.py list ["_har/*"]   |   python artifacts.py cat _har/capture_x.har   |   python artifacts.py stats
+# ENV: ARCHIVE_DIR=./_archive, ARCHIVE_SRC=_har,_netlog,runs,debug,out,_rec,_metrics,
+#      ARCHIVE_OLDER_H=6, ARCHIVE_MAX_DAYS=30, ARCHIVE_MAX_MB=300
+
+import fnmatch, hashlib, json, os, sys, time, zipfile
+from pathlib import Path
+
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", "./_archive"))
+ARCHIVE_SRC = [s.strip() for s in os.getenv("ARCHIVE_SRC", "_har,_netlog,runs,debug,out,_rec,_metrics").split(",") if s.strip()]
+ARCHIVE_OLDER_H = float(os.getenv("ARCHIVE_OLDER_H", "6"))
+ARCHIVE_MAX_DAYS = float(os.getenv("ARCHIVE_MAX_DAYS", "30"))
+ARCHIVE_MAX_MB = float(os.getenv("ARCHIVE_MAX_MB", "300"))
+
+PREFIX = "archive:"
+INDEX = ARCHIVE_DIR / "index.json"
+
+_index = None      # {"files": {relpath: {"sha","size","mtime","archive"}}} — 프로세스 내 캐시
+
+
+def _zip_path(day: str) -> Path:
+    return ARCHIVE_DIR / f"artifacts-{day}.zip"
+
+
+def _manifest_path(day: str) -> Path:
+    return ARCHIVE_DIR / f"artifacts-{day}.manifest.json"
+
+
+def _write_json(p: Path, obj):
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(json.dumps(obj, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, p)
+
+
+def reindex() -> dict:
+    """날짜별 매니페스트를 합쳐 index.json 재작성."""
+    global _index
+    files = {}
+    for mp in sorted(ARCHIVE_DIR.glob("artifacts-*.manifest.json")):
+        day = mp.name[len("artifacts-"):-len(".manifest.json")]
+        if not _zip_path(day).exists():
+            continue
+        for rel, meta in json.loads(mp.read_text(encoding="utf-8")).items():
+            files[rel] = {**meta, "archive": day}
+    _index = {"built": time.time(), "files": files}
+    if ARCHIVE_DIR.exists():
+        _write_json(INDEX, _index)
+    return _index
+
+
+def index() -> dict:
+    global _index
+    if _index is None:
+        try:
+            _index = json.loads(INDEX.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _index = reindex() if ARCHIVE_DIR.exists() else {"files": {}}
+    return _index
+
+
+# ---------- 읽기 (가상 경로) ----------
+def glob(pattern: str) -> list[str]:
+    """'archive:패턴' → 인덱스에서 매칭되는 가상 경로 (최신 mtime 먼저)."""
+    pat = pattern[len(PREFIX):] if pattern.startswith(PREFIX) else pattern
+    files = index()["files"]
+    hits = [rel for rel in files if fnmatch.fnmatch(rel, pat)]
+    hits.sort(key=lambda r: files[r].get("mtime", 0), reverse=True)
+    return [PREFIX + r for r in hits]
+
+
+def read_bytes(path: str) -> bytes:
+    if not str(path).startswith(PREFIX):
+        return Path(path).read_bytes()
+    rel = str(path)[len(PREFIX):]
+    meta = index()["files"].get(rel)
+    if meta is None:
+        raise FileNotFoundError(path)
+    with zipfile.ZipFile(_zip_path(meta["archive"])) as z:
+        return z.read(f"blobs/{meta['sha']}")
+
+
+def load_json(path: str):
+    return json.loads(read_bytes(path).decode("utf-8", "ignore"))
+
+
+def mtime(path: str) -> float:
+    if str(path).startswith(PREFIX):
+        return index()["files"].get(str(path)[len(PREFIX):], {}).get("mtime", 0)
+    try: return Path(path).stat().st_mtime
+    except OSError: return 0
+
+
+# ---------- pack ----------
+def _candidates(older_h: float):
+    cut = time.time() - older_h * 3600
+    for src in ARCHIVE_SRC:
+        root = Path(src)
+        if not root.is_dir():
+            continue
+        for p in root.rglob("*"):
+            if not p.is_file() or p.suffix == ".tmp":
+                continue
+            st = p.stat()
+            if st.st_mtime < cut:
+                yield p, st
+
+
+def pack(dry_run: bool = False, keep: bool = False, older_h: float = ARCHIVE_OLDER_H) -> dict:
+    groups: dict[str, list] = {}
+    for p, st in _candidates(older_h):
+        groups.setdefault(time.strftime("%Y%m%d", time.localtime(st.st_mtime)), []).append((p, st))
+    res = {"files": 0, "bytes_in": 0, "blobs_new": 0, "dup": 0, "days": len(groups)}
+    if not groups:
+        return res
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    for day, items in sorted(groups.items()):
+        mp = _manifest_path(day)
+        man = json.loads(mp.read_text(encoding="utf-8")) if mp.exists() else {}
+        done = []
+        with zipfile.ZipFile(_zip_path(day), "a" if _zip_path(day).exists() else "w",
+                             compression=zipfile.ZIP_DEFLATED, compresslevel=9) if not dry_run else _NullZip() as z:
+            have = set(z.namelist())
+            for p, st in sorted(items):
+                data = p.read_bytes()
+                sha = hashlib.sha256(data).hexdigest()
+                name = f"blobs/{sha}"
+                if name in have:
+                    res["dup"] += 1
+                else:
+                    z.writestr(name, data)
+                    have.add(name)
+                    res["blobs_new"] += 1
+                man[p.as_posix()] = {"sha": sha, "size": len(data), "mtime": st.st_mtime}
+                res["files"] += 1; res["bytes_in"] += len(data)
+                done.append(p)
+        if dry_run:
+            continue
+        _write_json(mp, man)
+        if not keep:
+            for p in done:
+                try: p.unlink()
+                except OSError: pass
+    if not dry_run:
+        if not keep:
+            _rm_empty_dirs()
+        reindex()
+    return res
+
+
+class _NullZip:
+    def __enter__(self): return self
+    def __exit__(self, *a): return False
+    def namelist(self): return []
+    def writestr(self, *a): pass
+
+
+def _rm_empty_dirs():
+    for src in ARCHIVE_SRC:
+        root = Path(src)
+        if not root.is_dir():
+            continue
+        for d in sorted((d for d in root.rglob("*") if d.is_dir()), key=lambda d: -len(d.parts)):
+            try: d.rmdir()
+            except OSError: pass
+
+
+# ---------- prune ----------
+def prune(max_days: float = ARCHIVE_MAX_DAYS, max_mb: float = ARCHIVE_MAX_MB) -> list[str]:
+    zips = sorted(ARCHIVE_DIR.glob("artifacts-*.zip"))      # 이름 = 날짜 → 오래된 순
+    cut = time.strftime("%Y%m%d", time.localtime(time.time() - max_days * 86400))
+    gone = []
+    def _drop(z: Path):
+        day = z.stem[len("artifacts-"):]
+        for p in (z, _manifest_path(day)):
+            try: p.unlink()
+            except OSError: pass
+        gone.append(day)
+    for z in list(zips):
+        if z.stem[len("artifacts-"):] < cut:
+            _drop(z); zips.remove(z)
+    total = sum(z.stat().st_size for z in zips)
+    while zips and total > max_mb * 1048576:
+        z = zips.pop(0)
+        total -= z.stat().st_size
+        _drop(z)
+    if gone:
+        reindex()
+    return gone
+
+
+# ---------- CLI ----------
+def _stats() -> list[str]:
+    files = index()["files"]
+    out = []
+    for z in sorted(ARCHIVE_DIR.glob("artifacts-*.zip")):
+        day = z.stem[len("artifacts-"):]
+        rows = [m for m in files.values() if m["archive"] == day]
+        raw = sum(m["size"] for m in rows)
+        blobs = len({m["sha"] for m in rows})
+        out.append(f"  {day}: files={len(rows)} blobs={blobs} raw={raw / 1048576:.1f}MB → zip={z.stat().st_size / 1048576:.1f}MB")
+    return out or ["  (아카이브 없음)"]
+
+
+def main(argv=None) -> int:
+    a = list(sys.argv[1:] if argv is None else argv)
+    cmd = a.pop(0) if a else "stats"
+    opt = lambda k, d: (type(d)(a[a.index(k) + 1]) if k in a else d)
+    if cmd == "pack":
+        r = pack(dry_run="--dry-run" in a, keep="--keep" in a, older_h=opt("--older-than-h", ARCHIVE_OLDER_H))
+        print(f"[ARCHIVE] pack{' (dry-run)' if '--dry-run' in a else ''}: days={r['days']} files={r['files']} "
+              f"{r['bytes_in'] / 1048576:.1f}MB, new blobs={r['blobs_new']} dup={r['dup']}")
+    elif cmd == "prune":
+        gone = prune(opt("--max-days", ARCHIVE_MAX_DAYS), opt("--max-mb", ARCHIVE_MAX_MB))
+        print(f"[ARCHIVE] prune: 삭제 {len(gone)}개 {' '.join(gone)}")
+    elif cmd == "list":
+        for p in glob(a[0] if a else "*"):
+            m = index()["files"][p[len(PREFIX):]]
+            print(f"{m['archive']}  {m['size']:>9}  {p[len(PREFIX):]}")
+    elif cmd == "cat":
+        sys.stdout.buffer.write(read_bytes(PREFIX + a[0]))
+    elif cmd == "reindex":
+        print(f"[ARCHIVE] index files={len(reindex()['files'])}")
+    elif cmd == "stats":
+        print(f"[ARCHIVE] {ARCHIVE_DIR}")
+        for ln in _stats(): print(ln)
+    else:
+        print("사용법: python artifacts.py pack|prune|list|cat|stats|reindex")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
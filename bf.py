@@ -16,6 +16,18 @@ from pathlib import Path
 import logging
 
 from playwright.async_api import async_playwright, BrowserContext, Page, Frame, TimeoutError as PWTimeout
+from ratelimit import RL, RL_REPORT
+from sdsched import SdScheduler, note_snapshot
+from aimd import API as AIMD_API, shows_limiter
+from warmdag import run_dag, node, report as warmdag_report
+from warmstate import WARM
+import offload
+from looplag import LAG
+import metrics
+from tracering import TraceRing, TRACE_MODE
+from capture import CAP
+import standin
+from showprof import PROF
 
 # ===== 설정 =====
 HEADLESS         = True
@@ -24,7 +36,7 @@ CHNL             = "WEB"
 REQ_TIMEOUT_MS   = 15000
 STEP_TIMEOUT_MS  = 20000
 RETRY_COUNT      = 1
-CONCURRENCY      = 4
+CONCURRENCY      = 4        # AIMD 시작값 (상한 AIMD_SHOWS_MAX)
 
 # --show / --headful 플래그로 창 띄우기
 if "--show" in sys.argv or "--headful" in sys.argv:
@@ -52,6 +64,7 @@ LOGIN_PW = os.getenv("BF_PW", LOGIN_PW_DEFAULT)
 RUN_ID  = datetime.now().strftime("%Y%m%d-%H%M%S")
 RUN_DIR = Path.cwd() / "runs" / RUN_ID
 RUN_DIR.mkdir(parents=True, exist_ok=True)
+PROF.dir = RUN_DIR / "prof"
 
 LOG_PATH   = RUN_DIR / "bf.log"
 JSONL_PATH = RUN_DIR / "events.ndjson"
@@ -130,8 +143,7 @@ async def get_header(resp, name: str) -> str:
 
 async def _save_snap(page: Page, tag: str):
     with contextlib.suppress(Exception):
-        p = RUN_DIR / f"{tag}.png"
-        await page.screenshot(path=str(p), full_page=True)
+        await CAP.dump(page, tag, html=False, full_page=True)   # 기록은 백그라운드, 실행당 용량 상한
 
 # ===== Ajax POST 래퍼 (x-www-form-urlencoded 강제) =====
 async def request_json(ctx: BrowserContext, method: str, url: str, *,
@@ -150,27 +162,42 @@ async def request_json(ctx: BrowserContext, method: str, url: str, *,
     method = method.upper()
     for attempt in range(retry + 1):
         try:
-            if method == "POST":
-                body = ""
-                if isinstance(data, dict):
-                    body = urlencode(data)
-                    base_headers.setdefault("Content-Type", "application/x-www-form-urlencoded; charset=UTF-8")
-                elif isinstance(data, str):
-                    body = data
-                    base_headers.setdefault("Content-Type", "application/x-www-form-urlencoded; charset=UTF-8")
-                resp = await ctx.request.post(url, headers=base_headers, data=body, timeout=timeout_ms)
-            else:
-                resp = await ctx.request.get(url, headers=base_headers, timeout=timeout_ms)
+            t0 = time.monotonic()
+            qms = await RL.acquire(url, method=method)
+            if qms >= 200:
+                _write_event({"t":"ratelimit","method":method,"url":url,"queue_ms":round(qms,1)})
+            async with AIMD_API.slot() as o:
+                with metrics.request(url, method) as m:
+                    t_send = time.monotonic()
+                    if method == "POST":
+                        body = ""
+                        if isinstance(data, dict):
+                            body = urlencode(data)
+                            base_headers.setdefault("Content-Type", "application/x-www-form-urlencoded; charset=UTF-8")
+                        elif isinstance(data, str):
+                            body = data
+                            base_headers.setdefault("Content-Type", "application/x-www-form-urlencoded; charset=UTF-8")
+                        resp = await ctx.request.post(url, headers=base_headers, data=body, timeout=timeout_ms)
+                    else:
+                        resp = await ctx.request.get(url, headers=base_headers, timeout=timeout_ms)
+                    o.ok = resp.status < 500 and resp.status != 429
+                    m.status = resp.status
 
             if resp.status != 200:
                 txt = await resp.text()
+                WARM.observe(ctx, resp.status, txt)
                 _write_event({"t":"http","ok":False,"method":method,"url":url,"status":resp.status,
                               "headers":base_headers, "data":data or {}, "body":txt[:800]})
                 raise RuntimeError(f"HTTP {resp.status} for {url}")
 
             try:
-                js = await resp.json()
-                _write_event({"t":"http","ok":True,"method":method,"url":url,"status":resp.status})
+                txt = await resp.text()
+                t_end = time.monotonic()
+                js = await offload.loads_async(txt)   # 큰 응답은 루프 밖에서 디코드
+                # 실제 구간 (Playwright HAR에는 RL/AIMD 대기가 안 보이므로 여기서 남김)
+                _write_event({"t":"http","ok":True,"method":method,"url":url,"status":resp.status,
+                              "queue_ms":round((t_send - t0) * 1000, 1), "ms":round((t_end - t_send) * 1000, 1),
+                              "bytes":len(txt.encode("utf-8"))})
                 return js
             except Exception:
                 txt = await resp.text()
@@ -403,6 +430,7 @@ async def filmapi_get_show(ctx: BrowserContext, sdCode: str) -> Show:
         "X-Requested-With": "XMLHttpRequest",
     }
     try:
+        await RL.acquire(url, method="GET")
         resp = await ctx.request.get(url, headers=headers, timeout=REQ_TIMEOUT_MS)
         if resp.status == 200:
             js = await resp.json()
@@ -410,6 +438,7 @@ async def filmapi_get_show(ctx: BrowserContext, sdCode: str) -> Show:
             raise RuntimeError(f"HTTP {resp.status} for GET {url}")
     except Exception as e_get:
         log_err(f"[FilmAPI][GET] 실패: {e_get} → POST 폴백")
+        await RL.acquire(url, method="GET")
         resp = await ctx.request.post(url, data="", headers=headers, timeout=REQ_TIMEOUT_MS)
         if resp.status != 200:
             txt = await resp.text()
@@ -495,6 +524,7 @@ async def ensure_csrf_token(page: Page, show) -> str:
         f"&prodSeq={show.prodSeq}&sdSeq={show.sdSeq}"
         f"&perfDate={show.perfDate}"
     )
+    await RL.acquire(f"{API}/rs/prod", method="POST")
     resp = await page.context.request.post(
         f"{API}/rs/prod",
         headers={
@@ -555,8 +585,13 @@ async def prime_rs(ctx: BrowserContext, show: Show, tok: Tokens) -> None:
         "perfDate": show.perfDate,   # ★ 추가
         "perfDe": show.perfDate,     # ★ 호환 필드(무시되면 OK)
     }
-    for path in ("/rs/prod", "/rs/prodChk", "/rs/chkProdSdSeq", "/rs/informLimit", "/rs/prodSummary"):
-        await request_json(ctx, "POST", f"{API}{path}", data=base, headers=headers_rs(tok))
+    # prod → prodChk → chkProdSdSeq → prodSummary, informLimit은 prodChk 뒤 병렬 (warmdag.RS_DEPS)
+    # 같은 컨텍스트에서 TTL 안에 이미 한 step은 생략 (warmstate.WARM)
+    pq, sq = str(show.prodSeq), str(show.sdSeq)
+    post = lambda path: (lambda: WARM.once(ctx, path, pq, "" if path == "prod" else sq,
+                                           lambda: request_json(ctx, "POST", f"{API}/rs/{path}", data=base, headers=headers_rs(tok))))
+    await run_dag([node(p, post(p)) for p in ("prod", "prodChk", "chkProdSdSeq", "informLimit", "prodSummary")],
+                  name="prime_rs")
 # ===== 좌석 통계 =====
 async def seat_stats(ctx: BrowserContext, show: Show, tok: Tokens) -> Tuple[str, int, int, Dict[str,int]]:
     form = {
@@ -691,73 +726,85 @@ class Runner:
     def __init__(self, ctx: BrowserContext, page: Page):
         self.ctx = ctx
         self.page = page  # 로그인만 이 페이지로
-        self.sem = asyncio.Semaphore(CONCURRENCY)
+        self.sem = shows_limiter(CONCURRENCY)   # AIMD: 에러율/p95/루프지연에 따라 가변
         self.results = []
         self.seed_ss_biff: Dict[str,str] = {}
         self.seed_ss_onestop: Dict[str,str] = {}
+        self.traces: Optional[TraceRing] = None
 
     async def process_sd(self, sdCode: str):
-        async with self.sem:
-            local_page = await self.ctx.new_page()   # ★ 건별 전용 페이지
-            # ★ 새 탭에 포털 세션부터 심기 (origin: biff)
-            await prime_session_storage(local_page, PORTAL_SITE, self.seed_ss_biff)
-
-            # ★ onestop 세션도 있으면 미리 심어 (첫 건 이후 캐시됨)
-            if self.seed_ss_onestop:
-                await prime_session_storage(local_page, ONESTOP_SITE, self.seed_ss_onestop)
-            title = "(제목미상)"
-            try:
-                show = await filmapi_get_show(self.ctx, sdCode)
-                title = (show.title or "(제목미상)").strip()
-                log_info(f"🎬 [{sdCode}] {show.title}")
-                # ★ SSO 브릿지(직렬화) — onestop 세션/쿠키/CSRF 경로 활성화
-                async with SSO_LOCK:
-                    local_page = await bridge_sso(local_page, show)   # ★★★ 새 탭 받을 수 있음
-                    setattr(local_page, "_sso_ready", True)           # 이 탭에서만 onestop/API 허용
-                    if not self.seed_ss_onestop:
-                        with contextlib.suppress(Exception):
-                            self.seed_ss_onestop = await dump_session_storage(local_page)
-
-                    # onestop 세션을 시드로 캐시 (다음 탭부터는 선주입)
-                    if not self.seed_ss_onestop:
-                        with contextlib.suppress(Exception):
-                            self.seed_ss_onestop = await dump_session_storage(local_page)
-                # RS/SEAT 워밍 (전용 페이지에서 수행)
-                tok = await warmup_rs(local_page, show)
-                tok = await warmup_seat(local_page, show, tok)
-
-                # CSRF 확보 (전용 페이지의 쿠키/리퍼러 컨텍스트 사용)
-                if not tok.rs_csrf or not tok.seat_csrf:
-                    t = await ensure_csrf_token(local_page, show)
-                    log_info(f"[{show.sdCode}] rs_csrf len={len(t) if t else 0}")
-                    if not tok.rs_csrf:   tok.rs_csrf = t
-                    if not tok.seat_csrf: tok.seat_csrf = t
-                if not tok.rs_csrf:
-                    raise RuntimeError("missing CSRF after warmup: rs_csrf")
-
-                # 프라이밍 & 좌석 통계는 request API로
-                await prime_rs(self.ctx, show, tok)
-                plan, total, remain, bycat = await seat_stats(self.ctx, show, tok)
-                log_info(f"ℹ️  [{sdCode}] {show.title} | {show.venue} {show.hall} | {show.perfDate} | plan={plan} | 총={total} 잔여={remain}")
-
-                # 단계 이동은 전용 페이지로 진행
-                ok = False
-                if plan == "NRS" and remain > 0:
-                    ok = await nrs_to_checkout(local_page, show)
-                else:
-                    ok = await seat_to_checkout_try(local_page, show)
-
-                if ok:
-                    st = await detect_stage(local_page)
-                    self.results.append((sdCode, title, f"(stage={st}) {local_page.url}"))
-                else:
-                    raise RuntimeError("결제단계 진입 실패(좌석/버튼 불가)")
-            except Exception as e:
-                log_err(f"❌ [{sdCode}] 에러: {e}")
-                self.results.append((sdCode, title, f"(예외: {e})"))
-            finally:
-                with contextlib.suppress(Exception):
-                    await local_page.close()
+        metrics.set_sd(sdCode)
+        # 회차 슬롯(self.sem)은 스케줄러가 잡음 (sched.run limiter=) → 슬롯 받은 뒤 최고 점수 sd 배정
+        local_page = await self.ctx.new_page()   # ★ 건별 전용 페이지
+        # ★ 새 탭에 포털 세션부터 심기 (origin: biff)
+        await prime_session_storage(local_page, PORTAL_SITE, self.seed_ss_biff)
+
+        # ★ onestop 세션도 있으면 미리 심어 (첫 건 이후 캐시됨)
+        if self.seed_ss_onestop:
+            await prime_session_storage(local_page, ONESTOP_SITE, self.seed_ss_onestop)
+        title = "(제목미상)"
+        tsh = self.traces.begin(sdCode) if self.traces else None
+        CAP.begin(sdCode)
+        failed = True
+        try:
+            show = await filmapi_get_show(self.ctx, sdCode)
+            title = (show.title or "(제목미상)").strip()
+            log_info(f"🎬 [{sdCode}] {show.title}")
+            # ★ SSO 브릿지(직렬화) — onestop 세션/쿠키/CSRF 경로 활성화
+            async with SSO_LOCK:
+                local_page = await bridge_sso(local_page, show)   # ★★★ 새 탭 받을 수 있음
+                setattr(local_page, "_sso_ready", True)           # 이 탭에서만 onestop/API 허용
+                if not self.seed_ss_onestop:
+                    with contextlib.suppress(Exception):
+                        self.seed_ss_onestop = await dump_session_storage(local_page)
+
+                # onestop 세션을 시드로 캐시 (다음 탭부터는 선주입)
+                if not self.seed_ss_onestop:
+                    with contextlib.suppress(Exception):
+                        self.seed_ss_onestop = await dump_session_storage(local_page)
+            # RS/SEAT 워밍 (전용 페이지에서 수행)
+            tok = await warmup_rs(local_page, show)
+            tok = await warmup_seat(local_page, show, tok)
+
+            # CSRF 확보 (전용 페이지의 쿠키/리퍼러 컨텍스트 사용)
+            if not tok.rs_csrf or not tok.seat_csrf:
+                t = await ensure_csrf_token(local_page, show)
+                log_info(f"[{show.sdCode}] rs_csrf len={len(t) if t else 0}")
+                if not tok.rs_csrf:   tok.rs_csrf = t
+                if not tok.seat_csrf: tok.seat_csrf = t
+            if not tok.rs_csrf:
+                raise RuntimeError("missing CSRF after warmup: rs_csrf")
+
+            # 프라이밍 & 좌석 통계는 request API로
+            await prime_rs(self.ctx, show, tok)
+            plan, total, remain, bycat = await seat_stats(self.ctx, show, tok)
+            log_info(f"ℹ️  [{sdCode}] {show.title} | {show.venue} {show.hall} | {show.perfDate} | plan={plan} | 총={total} 잔여={remain}")
+            note_snapshot({"plan": plan, "total": total, "remain": remain}, sdCode)
+
+            # 단계 이동은 전용 페이지로 진행
+            ok = False
+            if plan == "NRS" and remain > 0:
+                ok = await nrs_to_checkout(local_page, show)
+            else:
+                ok = await seat_to_checkout_try(local_page, show)
+
+            if ok:
+                st = await detect_stage(local_page)
+                self.results.append((sdCode, title, f"(stage={st}) {local_page.url}"))
+                failed = False
+                CAP.ok(sdCode)
+            else:
+                raise RuntimeError("결제단계 진입 실패(좌석/버튼 불가)")
+        except Exception as e:
+            log_err(f"❌ [{sdCode}] 에러: {e}")
+            self.results.append((sdCode, title, f"(예외: {e})"))
+        finally:
+            if tsh is not None:
+                self.traces.end(tsh, failed=failed)   # 실패/SLO 초과 회차만 trace 청크 저장
+            with contextlib.suppress(Exception):
+                await CAP.end(sdCode, local_page)     # 실패/느린 회차만 HTML/PNG 덤프
+            with contextlib.suppress(Exception):
+                await local_page.close()
 
     async def run(self, sdCodes: List[str]):
         # 공용 self.page는 '로그인' 전용으로만 사용
@@ -765,8 +812,10 @@ class Runner:
         # 로그인/SSO 기반 "시드 탭"의 sessionStorage 캐시
         self.seed_ss_biff = await dump_session_storage(self.page)   # 포털(biff)용
         self.seed_ss_onestop = {}  # onestop은 첫 브릿지 이후 캐시
-        tasks = [asyncio.create_task(self.process_sd(sd)) for sd in sdCodes]
-        await asyncio.gather(*tasks)
+        # 우선순위 스케줄러가 CONCURRENCY 슬롯을 배정 (최근 스냅샷 기준, 매진은 low lane)
+        sched = SdScheduler(sdCodes, self.sem.hi, name="BF")   # 실제 동시 수는 self.sem(AIMD)이 결정
+        log_info(sched.describe())
+        await sched.run(lambda sd: PROF.run(sd, self.process_sd(sd)), limiter=self.sem)
 
 
 # ===== 메인 =====
@@ -775,21 +824,23 @@ async def main():
         print("사용법: python bf.py <sdCode1> <sdCode2> ...")
         return
     sdCodes = [s.strip() for s in sys.argv[1:] if s.strip()]
+    LAG.start()   # LOOPLAG_ENABLE=1 일 때만
+    metrics.serve()   # 127.0.0.1:METRICS_PORT/metrics (METRICS=1)
 
     log_info(f"DEBUG Using proactor: IocpProactor")
 
     async with async_playwright() as pw:
         try:
-            browser = await pw.chromium.launch(
+            browser = await pw.chromium.launch(**standin.launch_kwargs(
                 headless=HEADLESS,
                 channel="chrome",
                 args=["--disable-blink-features=AutomationControlled"]
-            )
+            ))
         except Exception:
-            browser = await pw.chromium.launch(
+            browser = await pw.chromium.launch(**standin.launch_kwargs(
                 headless=HEADLESS,
                 args=["--disable-blink-features=AutomationControlled"]
-            )
+            ))
         try:
             ctx = await browser.new_context(
                 locale="ko-KR",
@@ -805,15 +856,18 @@ async def main():
                 extra_http_headers={"Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7"},
             )
 
-        with contextlib.suppress(Exception):
-            await ctx.tracing.start(screenshots=True, snapshots=True, sources=True)
+        await standin.attach(ctx)            # STANDIN 있을 때만: maketicket 요청 → 로컬 스탠드인
+        traces = TraceRing(ctx, RUN_DIR)      # TRACE_MODE=ring: 실패/느린 회차 청크만 저장 (full=기존 전체 trace)
+        await traces.start()
 
         page = await ctx.new_page()
         with contextlib.suppress(Exception):
             await page.bring_to_front()
 
         runner = Runner(ctx, page)
+        runner.traces = traces
         await runner.run(sdCodes)
+        await CAP.drain()
 
         print("\n" + "─"*72)
         print("📊 결과 요약")
@@ -822,10 +876,26 @@ async def main():
                 print(f"  ✅ [{sd}] {title or '(제목미상)'}  →  {s}")
             else:
                 print(f"  ❌ [{sd}] {title or '(제목미상)'}  {s}")
+        if RL_REPORT:
+            for line in RL.report():
+                print("  " + line)
+            print("  " + runner.sem.report())
+            print("  " + AIMD_API.report())
+            print("  " + WARM.report())
+            print("  " + offload.report())
+            for line in warmdag_report():
+                print("  " + line)
+            print("  " + traces.report())
+            print("  " + CAP.report())
+        for line in LAG.report():
+            print("  " + line)
+        LAG.stop()
+        for line in PROF.report():
+            print("  " + line)
         print("─"*72)
+        _write_event({"t":"ratelimit.stats","stats":RL.stats()})
 
-        with contextlib.suppress(Exception):
-            await ctx.tracing.stop(path=str(TRACE_PATH))
+        await traces.stop(TRACE_PATH)
         await ctx.close()
         await browser.close()
 
@@ -833,7 +903,10 @@ async def main():
         log_info(f"  • 로그: {LOG_PATH}")
         log_info(f"  • 이벤트(JSONL): {JSONL_PATH}")
         log_info(f"  • HAR: {HAR_PATH}")
-        log_info(f"  • Trace: {TRACE_PATH}")
+        if TRACE_MODE == "full":
+            log_info(f"  • Trace: {TRACE_PATH}")
+        else:
+            log_info(f"  • Trace: {', '.join(p.name for p in traces.kept) or '(실패/느린 회차 없음)'} @ {RUN_DIR}")
 
 if __name__ == "__main__":
     try:
@@ -10,6 +10,16 @@ import re, asyncio, urllib.parse, json, random
 from dataclasses import dataclass
 from typing import List, Optional, Dict, Any, Tuple, Union
 from playwright.async_api import async_playwright, Page, Frame
+from ratelimit import RL
+from aimd import API as AIMD_API
+from warmdag import run_dag, node
+from warmstate import WARM
+from schemadec import fields, present
+import offload
+from looplag import LAG
+import metrics
+from capture import CAP
+from recorder import pw_har_kwargs
 import time
 
 # === TRACE: env & paths ===
@@ -741,25 +751,23 @@ async def _prepare_session_like_har(scope, *, prodSeq, sdSeq, perfDate, csrfToke
         base.update(form)
         return post_api(scope, f"/rs/{path}", base, extra_headers=H_RS)
 
-    # ✅ prod → prodChk → chkProdSdSeq → informLimit → prodSummary → blockSummary2
-    try: await P("prod", {"prodSeq": str(prodSeq)})
-    except Exception as e: dlog(f"[SWAP] prod warn: {e}")
-    try: await P("prodChk", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                             "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo,
-                             "perfDate": perfDate})
-    except Exception as e: dlog(f"[SWAP] prodChk warn: {e}")
-    try: await P("chkProdSdSeq", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq), "chnlCd": chnlCd})
-    except Exception as e: dlog(f"[SWAP] chkProdSdSeq warn: {e}")
-    try: await P("informLimit", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                                 "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo})
-    except Exception as e: dlog(f"[SWAP] informLimit warn: {e}")
-    try: await P("prodSummary", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                                 "chnlCd": chnlCd, "perfDate": perfDate})
-    except Exception as e: dlog(f"[SWAP] prodSummary warn: {e}")
-    try: await P("blockSummary2", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq), "chnlCd": chnlCd, "perfDate": perfDate})
-    except Exception as e: dlog(f"[SWAP] blockSummary2 warn: {e}")
-
-    ilog("[SWAP] session prepared (prod→prodChk→chkProdSdSeq→informLimit→prodSummary→blockSummary2)")
+    # ✅ prod → prodChk → chkProdSdSeq → {informLimit ∥ prodSummary ∥ blockSummary2}  (warmdag.RS_DEPS)
+    #    전부 경고만 남기고 계속 (required=False), TTL 안에 이미 한 step은 생략 (warmstate.WARM)
+    pd = {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq)}
+    def W(step, form):
+        return lambda: WARM.once(scope, step, prodSeq, "" if step == "prod" else sdSeq, lambda: P(step, form))
+    await run_dag([
+        node("prod",          W("prod", {"prodSeq": str(prodSeq)}), required=False),
+        node("prodChk",       W("prodChk", {**pd, "chnlCd": chnlCd, "saleTycd": saleTycd,
+                                            "saleCondNo": saleCondNo, "perfDate": perfDate}), required=False),
+        node("chkProdSdSeq",  W("chkProdSdSeq", {**pd, "chnlCd": chnlCd}), required=False),
+        node("informLimit",   W("informLimit", {**pd, "chnlCd": chnlCd, "saleTycd": saleTycd,
+                                                "saleCondNo": saleCondNo}), required=False),
+        node("prodSummary",   W("prodSummary", {**pd, "chnlCd": chnlCd, "perfDate": perfDate}), required=False),
+        node("blockSummary2", W("blockSummary2", {**pd, "chnlCd": chnlCd, "perfDate": perfDate}), required=False),
+    ], name="prepare", log=lambda m: dlog(m.replace("[prepare]", "[SWAP]")))
+
+    ilog("[SWAP] session prepared (prod→prodChk→chkProdSdSeq→informLimit/prodSummary/blockSummary2)")
 
 # === REPLACE ENTIRE FUNCTION: robust NRS counter via /api/v1/rs/tickettype ===
 @trace_step("seat_counts_via_tickettype")
@@ -1014,20 +1022,17 @@ class Tracer:
     def ev(self, event, **kw):   self._emit("INFO", event, **kw)
     def warn(self, event, **kw): self._emit("WARN", event, **kw)
     def err(self, event, **kw):  self._emit("ERR",  event, **kw)
+    # HTML/PNG 는 capture.CAP 이 받아와 백그라운드로 기록 (실행당 용량 상한)
     async def dump_html(self, page, label):
         try:
-            p = TRACE_DIR / f"{label}.html"
-            await page.wait_for_timeout(50)
-            html = await page.content()
-            p.write_text(html, encoding="utf-8")
-            self.ev("dump.html", path=str(p))
+            for p in await CAP.dump(page, label, png=False):
+                self.ev("dump.html", path=str(p))
         except Exception as e:
             self.warn("dump.html.fail", reason=str(e))
     async def dump_png(self, page, label):
         try:
-            p = TRACE_DIR / f"{label}.png"
-            await page.screenshot(path=str(p), full_page=False)
-            self.ev("dump.png", path=str(p))
+            for p in await CAP.dump(page, label, html=False):
+                self.ev("dump.png", path=str(p))
         except Exception as e:
             self.warn("dump.png.fail", reason=str(e))
 
@@ -1499,8 +1504,14 @@ async def fetch_json(scope_or_page, *args, **kwargs):
         fetch_kwargs["data"] = data
 
     # 호출
-    resp = await req.fetch(url, **fetch_kwargs)
-    txt = await resp.text()
+    await RL.acquire(url, method=method)
+    async with AIMD_API.slot() as o:
+        with metrics.request(url, method) as m:
+            resp = await req.fetch(url, **fetch_kwargs)
+            txt = await resp.text()
+            o.ok = resp.status < 500 and resp.status != 429
+            m.status = resp.status
+    WARM.observe(scope_or_page, resp.status, txt)   # 401/403·로그인 리다이렉트 → 워밍업 기록 무효화
     if resp.status < 200 or resp.status >= 300:
         raise RuntimeError(f"{resp.status} {url} — {txt[:200]}")
 
@@ -1511,7 +1522,7 @@ async def fetch_json(scope_or_page, *args, **kwargs):
         return s.startswith("{") or s.startswith("[")
     if "application/json" in ctype or _looks_like_json(txt):
         try:
-            return json.loads(txt)
+            return await offload.loads_async(txt)   # 큰 응답은 루프 밖에서 디코드
         except Exception:
             return txt  # 최후엔 원문
     return txt
@@ -1616,6 +1627,7 @@ async def _load_all_schedules(pop):
         "saleTycd": saleTycd, "saleCondNo": saleCond,
         "perfDate": perfDate0, "csrfToken": csrfToken
     }, extra_headers=H_RS)
+    WARM.mark(pop, "prod", prodSeq)   # 응답을 쓰는 호출이라 생략은 안 하지만 워밍업으로는 인정
     # normalize potential string payload to dict
     import json as _json
     if isinstance(js, str):
@@ -1669,13 +1681,16 @@ async def _swap_session_to_sdseq(pop, prodSeq, sdSeq,
         base.update(form)
         return post_api(pop, f"/rs/{path}", base, extra_headers=H_RS)
 
-    await P("prodChk",      {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo, "perfDate": perfDate,
-                             "user_member_info1": "", "user_member_info2": "", "enCryptTelNo": ""})
-    await P("chkProdSdSeq", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd})
-    try:
-        await P("informLimit", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo})
-    except Exception as e:
-        dlog(f"[SWAP] informLimit warn: {e}")
+    # prodChk(세션 회차 전환) → chkProdSdSeq ∥ informLimit  (warmdag.RS_DEPS), 이미 이 회차면 생략
+    def W(step, form):
+        return lambda: WARM.once(pop, step, prodSeq, sdSeq, lambda: P(step, form))
+    await run_dag([
+        node("prodChk",      W("prodChk", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo, "perfDate": perfDate,
+                                                   "user_member_info1": "", "user_member_info2": "", "enCryptTelNo": ""})),
+        node("chkProdSdSeq", W("chkProdSdSeq", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd})),
+        node("informLimit",  W("informLimit", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo}),
+             required=False),
+    ], name="swap", log=lambda m: dlog(m.replace("[swap]", "[SWAP]")))
 # ============================================================================ #
 
 
@@ -1710,18 +1725,24 @@ async def _fetch_seat_status_list(pop, prodSeq, sdSeq, chnlCd="WEB", csrfToken="
         return []
 
 # === REPLACE ENTIRE FUNCTION: _count_seats ===
+_SEAT_COUNT = fields("seat.countItem",
+    use=("useYn", "use_yn"),
+    st=("seatStatusCd", "seat_status_cd", "statusCd"),
+    cnt=("seatCnt", "seat_cnt"),
+)
+
 def _count_seats(lst, available_codes={"SS01000", "SS02000", "SS03000"}):
     total, remain, by = 0, 0, {}
     for it in (lst or []):
         # ★ 핵심 가드: dict 아니면 스킵 (str/None/숫자/리스트 조각 등 전부 무시)
         if not isinstance(it, dict):
             continue
-        use = (it.get("useYn") or it.get("use_yn") or "N")
-        if use != "Y":
+        use, st, cnt = _SEAT_COUNT(it)
+        if (use or "N") != "Y":
             continue
-        st  = (it.get("seatStatusCd") or it.get("seat_status_cd") or it.get("statusCd") or "")
+        st = st or ""
         try:
-            cnt = int(it.get("seatCnt") or it.get("seat_cnt") or 0)
+            cnt = int(cnt or 0)
         except:
             cnt = 0
         total += cnt
@@ -2505,9 +2526,10 @@ async def payment_hint_chain(scope, prodSeq, sdSeq, perfDate="", csrfToken=None,
         base.update(form)
         return post_api(scope, f"/rs/{path}", base, extra_headers=H_RS)
 
-    try: await P("prodChk", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                             "chnlCd": chnlCd, "saleTycd": saleTycd,
-                             "saleCondNo": saleCondNo, "perfDate": perfDate})
+    try: await WARM.once(scope, "prodChk", prodSeq, sdSeq,
+                         lambda: P("prodChk", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
+                                               "chnlCd": chnlCd, "saleTycd": saleTycd,
+                                               "saleCondNo": saleCondNo, "perfDate": perfDate}))
     except Exception as e: dlog(f"[HINT] prodChk: {e}")
 
     # 아래는 서비스 상황에 따라 선택 (실패해도 전체 플로우는 계속)
@@ -2840,8 +2862,7 @@ async def snapshot_state(scope, tag: str, params: Dict[str,str]):
 
         TR.ev("snapshot", tag=tag, url=page.url, scope_url=getattr(scope, "url", None), 
               frames=frames, vis=vis, sels=sel_state, counters=counters, params=params)
-        await TR.dump_html(page, f"snapshot_{tag}")
-        await TR.dump_png(page, f"snapshot_{tag}")
+        await CAP.note(scope, f"snapshot_{tag}")   # 지문만 링에 — HTML/PNG 는 실패/느린 회차 끝에서
     except Exception as e:
         TR.warn("snapshot.fail", reason=str(e))
 
@@ -2905,7 +2926,10 @@ async def assert_visibility(page: Page):
         dlog(f"[VIS] visibility={vis.get('v')} focus={vis.get('f')}")
     except: pass
 async def process_one(ctx, sd: str) -> RunResult:
+    metrics.set_sd(sd)     # 이 회차 태스크의 API/단계 메트릭 라벨
+    CAP.begin(sd)
     page = await ctx.new_page()
+    work = None
     try:
         # 작품 페이지 → 예매창
         res_url = BASE_RESMAIN.format(sd=sd)
@@ -3021,6 +3045,7 @@ async def process_one(ctx, sd: str) -> RunResult:
             try: setattr(page, "_hold_open", True)  # ★ 성공 시 창 유지 플래그
             except: pass
             log(f"✅ [{sd}] 결제창 진입: {final_url}")
+            CAP.ok(sd)
             return RunResult(sd, title, True, final_url)
         else:
             log(f"❌ [{sd}] 결제창 진입 실패 (url={final_url})")
@@ -3032,6 +3057,10 @@ async def process_one(ctx, sd: str) -> RunResult:
             hold = bool(getattr(page, "_hold_open", False))
         except:
             hold = False
+        # 실패/느린 회차만 HTML/PNG + 지문 링 저장 (창 닫기 전)
+        alive = work if (work is not None and not work.is_closed()) else page
+        try: await CAP.end(sd, alive)
+        except Exception: pass
         if (not hold) and (not page.is_closed()):
             await page.close()
 async def run_all_concurrent(sd_codes: List[str]) -> List[RunResult]:
@@ -3049,8 +3078,7 @@ async def run_all_concurrent(sd_codes: List[str]) -> List[RunResult]:
         ctx = await browser.new_context(
             locale="ko-KR",
             viewport=None,                    # 창 크기 그대로(최대화) 사용
-            record_har_path="rs_trace.har",   # HAR 저장 파일명
-            record_har_omit_content=False,    # 요청/응답 본문까지 남김
+            **pw_har_kwargs("rs_trace.har"),  # REC_SINKS에 pwhar 있을 때만 (요청/응답 본문 포함)
         )
         try:
             if not await ensure_login(ctx):
@@ -3114,8 +3142,15 @@ def ask_retry(failed_codes: List[str]) -> bool:
     except: return False
 
 async def main_once(codes: List[str]) -> List[RunResult]:
+    LAG.start()   # LOOPLAG_ENABLE=1 일 때만
+    metrics.serve()   # 127.0.0.1:METRICS_PORT/metrics (METRICS=1)
     results = await run_all_concurrent(codes)
+    await CAP.drain()   # 남은 캡처 파일 쓰기 끝낸 뒤 집계 (biff_patched 와 같은 순서)
     print_summary(results)
+    for line in LAG.report():
+        print(line)
+    LAG.stop()
+    print(CAP.report())
     return results
 
 if __name__ == "__main__":
@@ -3129,65 +3164,88 @@ if __name__ == "__main__":
 async def rs_block_summary(scope, prodSeq: str, sdSeq: str, chnlCd: str, perfDate: str,
                           saleCond: str, csrfToken: str, H_RS: dict) -> tuple[int,int,dict]:
     """blockSummary2 → (tot, remain, by)
-    - perfDate가 비면 절대 부르지 말 것!
-    - 실패/0일 땐 /rs/prod(listSch) → prodSummary 순으로 보강"""
-    blk = await post_api(
-        scope, "/rs/blockSummary2",
-        {"langCd": "ko", "csrfToken": csrfToken or "",
-         "prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-         "chnlCd": chnlCd, "perfDate": perfDate or "",
-         "saleCondNo": saleCond or "1"},
-        extra_headers=H_RS
-    )
-    block = {}
-    if isinstance(blk, dict):
-        s = blk.get("summary")
-        if isinstance(s, list) and s: block = s[0]
-        elif isinstance(s, dict):     block = s
-    try:
-        avail = int(block.get("admissionAvailPersonCnt") or block.get("restSeatCnt") or 0)
-        tot   = int(block.get("admissionTotalPersonCnt") or block.get("saleSeatCnt") or block.get("rendrSeatCnt") or 0)
-    except Exception:
-        avail, tot = 0, 0
-    if tot <= 0 or tot < avail:
-        tot = max(tot, avail)
-    if tot == 0:
-        try:
-            js = await post_api(scope, "/rs/prod",
-                {"langCd":"ko","csrfToken": csrfToken or "",
-                 "prodSeq": str(prodSeq), "sdSeq":"", "chnlCd": chnlCd,
-                 "saleTycd":"SALE_NORMAL","saleCondNo": saleCond or "1","perfDate": ""},
-                extra_headers=H_RS)
-            if isinstance(js, str):
-                import json as _json
-                try: js = _json.loads(js) if js.strip()[:1] in "[{" else {}
-                except Exception: js = {}
-            sch = js.get("listSch") or [] if isinstance(js, dict) else []
-            for it in _iter_dicts(sch):
-                if str(it.get("sdSeq") or it.get("sdNo") or "") == str(sdSeq):
-                    avail = int(it.get("remainCnt") or it.get("seatRemainCnt") or avail)
-                    guess = int(it.get("seatCnt") or it.get("seatTotalCnt") or 0)
-                    tot = max(tot, guess, avail)
-                    break
-        except Exception:
-            pass
-    if tot == 0 and perfDate:
-        try:
-            ps = await post_api(scope, "/rs/prodSummary",
-                {"langCd":"ko","csrfToken": csrfToken or "",
-                 "prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                 "chnlCd": chnlCd, "perfDate": perfDate or "",
-                 "saleCondNo": saleCond or "1"},
-                extra_headers=H_RS)
-            if isinstance(ps, dict):
-                s = ps.get("summary") or {}
-                avail = max(avail, int(s.get("admissionAvailPersonCnt") or s.get("restSeatCnt") or 0))
-                tot   = max(tot,   int(s.get("admissionTotalPersonCnt") or s.get("saleSeatCnt") or s.get("rendrSeatCnt") or 0))
-        except Exception:
-            pass
+    - perfDate가 비면 prodSummary는 절대 부르지 말 것!
+    - blockSummary2 / /rs/prod(listSch) / prodSummary 를 동시에 띄우고(speculate.first_valid)
+      tot>0 또는 remain>0 인 첫 결과 채택, 나머지 취소"""
+    from speculate import first_valid
+
+    def _num(s, *keys):
+        for k in present(s, keys):
+            try:
+                v = int(s.get(k) or 0)
+                if v: return v
+            except Exception:
+                pass
+        return 0
+
+    async def _blk():
+        blk = await post_api(
+            scope, "/rs/blockSummary2",
+            {"langCd": "ko", "csrfToken": csrfToken or "",
+             "prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
+             "chnlCd": chnlCd, "perfDate": perfDate or "",
+             "saleCondNo": saleCond or "1"},
+            extra_headers=H_RS
+        )
+        block = {}
+        if isinstance(blk, dict):
+            s = blk.get("summary")
+            if isinstance(s, list) and s: block = s[0]
+            elif isinstance(s, dict):     block = s
+        avail = _num(block, "admissionAvailPersonCnt", "restSeatCnt")
+        tot   = _num(block, "admissionTotalPersonCnt", "saleSeatCnt", "rendrSeatCnt")
+        return max(tot, avail), avail
+
+    async def _listsch():
+        js = await post_api(scope, "/rs/prod",
+            {"langCd":"ko","csrfToken": csrfToken or "",
+             "prodSeq": str(prodSeq), "sdSeq":"", "chnlCd": chnlCd,
+             "saleTycd":"SALE_NORMAL","saleCondNo": saleCond or "1","perfDate": ""},
+            extra_headers=H_RS)
+        if isinstance(js, str):
+            import json as _json
+            try: js = _json.loads(js) if js.strip()[:1] in "[{" else {}
+            except Exception: js = {}
+        sch = js.get("listSch") or [] if isinstance(js, dict) else []
+        for it in _iter_dicts(sch):
+            if str(it.get("sdSeq") or it.get("sdNo") or "") == str(sdSeq):
+                avail = int(it.get("remainCnt") or it.get("seatRemainCnt") or 0)
+                guess = int(it.get("seatCnt") or it.get("seatTotalCnt") or 0)
+                return max(guess, avail), avail
+        return 0, 0
+
+    async def _psum():
+        ps = await post_api(scope, "/rs/prodSummary",
+            {"langCd":"ko","csrfToken": csrfToken or "",
+             "prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
+             "chnlCd": chnlCd, "perfDate": perfDate or "",
+             "saleCondNo": saleCond or "1"},
+            extra_headers=H_RS)
+        s = (ps.get("summary") or {}) if isinstance(ps, dict) else {}
+        avail = _num(s, "admissionAvailPersonCnt", "restSeatCnt")
+        tot   = _num(s, "admissionTotalPersonCnt", "saleSeatCnt", "rendrSeatCnt")
+        return max(tot, avail), avail
+
+    cands = [("blockSummary2", _blk), ("listSch", _listsch)]
+    if perfDate:
+        cands.append(("prodSummary", _psum))
+    label, res = await first_valid(cands, lambda r: r[0] > 0 or r[1] > 0, name="rs_block_summary")
+    if label is None:
+        # 전부 0/실패 → 기존처럼 각 소스 최대치
+        got = [r for r in res if r]
+        tot   = max([r[0] for r in got] or [0])
+        avail = max([r[1] for r in got] or [0])
+    else:
+        tot, avail = res
     return tot, avail, {"NRS": avail}
 
 # === HAR 파서: 총좌석/잔여 강제 추출 ==========================================
+HAR_SUMMARY = fields("har.blockSummary2.summary",
+    sd=("sdSeq", "sdseq"),
+    total=("admissionTotalPersonCnt", "saleSeatCnt", "rendrSeatCnt"),
+    remain=("admissionAvailPersonCnt", "restSeatCnt"),
+)
+
 def parse_har_seats(har_path="rs_trace.har", out_json="har_seats.json"):
     import json, re, pathlib
     p = pathlib.Path(har_path)
@@ -3215,9 +3273,8 @@ def parse_har_seats(har_path="rs_trace.har", out_json="har_seats.json"):
             summ = js.get("summary")
             if isinstance(summ, list) and summ: summ = summ[0]
             if isinstance(summ, dict):
-                sd = str(summ.get("sdSeq") or summ.get("sdseq") or "")
-                tot = int(summ.get("admissionTotalPersonCnt") or summ.get("saleSeatCnt") or summ.get("rendrSeatCnt") or 0)
-                rem = int(summ.get("admissionAvailPersonCnt") or summ.get("restSeatCnt") or 0)
+                sd, tot, rem = HAR_SUMMARY(summ)
+                sd, tot, rem = str(sd or ""), int(tot or 0), int(rem or 0)
                 if sd:
                     o = out.setdefault(sd, {"total":0,"remain":0})
                     o["total"] = max(o["total"], tot)
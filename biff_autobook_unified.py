@@ -32,6 +32,15 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 
+from ratelimit import RL, RL_REPORT
+from warmstate import WARM
+import offload
+from looplag import LAG
+import metrics
+import standin
+from showprof import PROF
+from aimd import API as AIMD_API
+
 # ======== USER CONFIG ========
 SD_CODES: List[str] = [
     "001", "002",  # add more codes here
@@ -314,6 +323,7 @@ async def map_sd_from_filmapi(ctx: BrowserContext, sd: str) -> Dict[str, Any]:
         ]
         for cu in catalog_urls:
             try:
+                await RL.acquire(cu, method="GET")
                 res = await ctx.request.get(cu, headers=headers, timeout=15000)
                 if not res.ok:
                     continue
@@ -364,11 +374,17 @@ async def rs_post(ctx: BrowserContext, booking_url: str, csrf: str, path: str, d
     if csrf and "csrfToken" not in payload:
         payload["csrfToken"] = csrf
 
-    r = await ctx.request.post(url, data=payload, headers=headers)
+    await RL.acquire(url, method="POST")
+    async with AIMD_API.slot() as o:
+        with metrics.request(url, "POST") as m:
+            r = await ctx.request.post(url, data=payload, headers=headers)
+            o.ok = r.status < 500 and r.status != 429
+            m.status = r.status
     if not r.ok:
+        WARM.observe(ctx, r.status, None)
         return {"__error__": f"HTTP {r.status}", "__url__": url}
     try:
-        return await r.json()
+        return await offload.loads_async(await r.text())
     except Exception:
         return {"__error__": "Invalid JSON", "__url__": url}
 
@@ -379,6 +395,9 @@ def _unwrap_data(obj: Any) -> Any:
 
 
 async def compute_counts(ctx: BrowserContext, booking_url: str, sc: ShowCtx) -> Tuple[Optional[int], Optional[int]]:
+    """prodSummary / blockSummary2 / (ALL·ZONE) seatBaseMap+seatStatusList 를 동시에 띄우고
+    total·remain 이 둘 다 나온 첫 소스를 채택 (speculate.first_valid). 전부 불완전하면 예전 덮어쓰기 규칙."""
+    from speculate import first_valid
     base_args = {
         "prodSeq": sc.prodSeq,
         "sdSeq": sc.sdSeq,
@@ -388,47 +407,48 @@ async def compute_counts(ctx: BrowserContext, booking_url: str, sc: ShowCtx) ->
         "saleCondNo": "1",
         "lang": LANG,  # 👈 필수
     }
-    total = None
-    remain = None
-
-    psum = await rs_post(ctx, booking_url, sc.csrfToken, "prodSummary", base_args)
-    bsum = await rs_post(ctx, booking_url, sc.csrfToken, "blockSummary2", base_args)
-
-    # 👇 래퍼 해제
-    psum = _unwrap_data(psum)
-    bsum = _unwrap_data(bsum)
-
-    # prodSummary variants
-    if isinstance(psum, dict):
-        try:
-            total = (psum.get("totalSeatCnt") or psum.get("totalSeat") or psum.get("total"))
-            remain = (psum.get("remainSeatCnt") or psum.get("noneSeatCnt") or psum.get("remain"))
-            if isinstance(total, str): total = int(total or 0)
-            if isinstance(remain, str): remain = int(remain or 0)
-        except Exception:
-            pass
 
-    # blockSummary2 (list or dict.blocks)
-    if (total is None or remain is None) and isinstance(bsum, (dict, list)):
-        blocks = []
-        if isinstance(bsum, dict):
-            blocks = bsum.get("blocks") or bsum.get("list") or []
-        else:
-            blocks = bsum
-        t = r = 0
-        for b in blocks:
+    async def _prod_summary():
+        total = remain = None
+        psum = _unwrap_data(await rs_post(ctx, booking_url, sc.csrfToken, "prodSummary", base_args))
+        # prodSummary variants
+        if isinstance(psum, dict):
             try:
-                t += int(b.get("totalSeatCnt") or b.get("totalSeat") or b.get("total") or 0)
-                r += int(b.get("remainSeatCnt") or b.get("remainSeat") or b.get("remain") or 0)
+                total = (psum.get("totalSeatCnt") or psum.get("totalSeat") or psum.get("total"))
+                remain = (psum.get("remainSeatCnt") or psum.get("noneSeatCnt") or psum.get("remain"))
+                if isinstance(total, str): total = int(total or 0)
+                if isinstance(remain, str): remain = int(remain or 0)
             except Exception:
                 pass
-        if t:
-            total, remain = t, r
-
-    # Seat-level (ALL/ZONE) fallback
-    if (sc.planTypeCd in {"ALL", "ZONE"} or sc.planTypeCd == "") and (total is None or remain is None):
-        base = await rs_post(ctx, booking_url, sc.csrfToken, "seatBaseMap", base_args)
-        stat = await rs_post(ctx, booking_url, sc.csrfToken, "seatStatusList", base_args)
+        return total, remain
+
+    async def _block_summary():
+        bsum = _unwrap_data(await rs_post(ctx, booking_url, sc.csrfToken, "blockSummary2", base_args))
+        # blockSummary2 (list or dict.blocks)
+        if isinstance(bsum, (dict, list)):
+            blocks = []
+            if isinstance(bsum, dict):
+                blocks = bsum.get("blocks") or bsum.get("list") or []
+            else:
+                blocks = bsum
+            t = r = 0
+            for b in blocks:
+                try:
+                    t += int(b.get("totalSeatCnt") or b.get("totalSeat") or b.get("total") or 0)
+                    r += int(b.get("remainSeatCnt") or b.get("remainSeat") or b.get("remain") or 0)
+                except Exception:
+                    pass
+            if t:
+                return t, r
+        return None, None
+
+    async def _seat_level():
+        # Seat-level (ALL/ZONE) fallback
+        total = remain = None
+        base, stat = await asyncio.gather(
+            rs_post(ctx, booking_url, sc.csrfToken, "seatBaseMap", base_args),
+            rs_post(ctx, booking_url, sc.csrfToken, "seatStatusList", base_args),
+        )
         base = _unwrap_data(base)
         stat = _unwrap_data(stat)
 
@@ -450,7 +470,25 @@ async def compute_counts(ctx: BrowserContext, booking_url: str, sc: ShowCtx) ->
                 v = str(s.get("saleStatus") or s.get("status") or s.get("able") or s.get("sale") or "").upper()
                 return v in {"Y","ABLE","CAN","OK","EMPTY","TRUE"}
             remain = sum(1 for s in statuses if is_ok(s))
-
+        return total, remain
+
+    cands = [("prodSummary", _prod_summary), ("blockSummary2", _block_summary)]
+    if sc.planTypeCd in {"ALL", "ZONE"} or sc.planTypeCd == "":
+        cands.append(("seatLevel", _seat_level))
+    label, res = await first_valid(cands, lambda r: r[0] is not None and r[1] is not None, name="compute_counts")
+    if label is not None:
+        return res
+    # 어느 소스도 둘 다 주지 못함 → 예전 우선순위 그대로: prodSummary 부분값에서 시작,
+    # blockSummary2 는 짝(total, remain)으로만 덮어쓰고, 좌석 단위는 센 항목만 덮어씀
+    # (서로 다른 소스의 total/remain 을 빈 칸 채우기로 섞지 않음)
+    by = dict(zip((c[0] for c in cands), res))
+    total, remain = by.get("prodSummary") or (None, None)
+    t, r = by.get("blockSummary2") or (None, None)
+    if t is not None and r is not None:
+        total, remain = t, r
+    t, r = by.get("seatLevel") or (None, None)
+    if t is not None: total = t
+    if r is not None: remain = r
     return total, remain
 
 
@@ -632,6 +670,7 @@ async def login_and_get_page(ctx: BrowserContext) -> Page:
     return page
 
 async def process_show(ctx: BrowserContext, sd: str) -> None:
+    metrics.set_sd(sd)
     page = await ctx.new_page()
     print(f"\n🎬 [ {sd} ] 진입 준비")
 
@@ -732,6 +771,7 @@ async def process_show(ctx: BrowserContext, sd: str) -> None:
         "perfDate": sc.perfDate, "lang": LANG,
     })
     if isinstance(j, dict) and "__error__" not in j:
+        WARM.mark(ctx, "prod", sc.prodSeq)
         with contextlib.suppress(Exception):
             inf = j.get("prodInform") or j.get("prod") or {}
             sc.planTypeCd = inf.get("planTypeCd") or inf.get("planType") or sc.planTypeCd
@@ -778,6 +818,8 @@ async def launch_browser(pw, headless: bool) -> Browser:
     launch_kwargs = {"channel": "chrome", "headless": headless}
     if headless:
         launch_kwargs["args"] = ["--headless=new"]
+    if standin.STANDIN:                  # 스탠드인 벤치마크: 번들 Chromium 고정
+        return await pw.chromium.launch(**standin.launch_kwargs(**launch_kwargs))
     try:
         return await pw.chromium.launch(**launch_kwargs)
     except Exception:
@@ -796,6 +838,8 @@ async def launch_browser(pw, headless: bool) -> Browser:
 async def main() -> None:
     # ▼ 추가: 전역 오버라이드 변수 사용을 명시
     global OVR_PROD, OVR_SDSEQ, OVR_DATE
+    LAG.start()   # LOOPLAG_ENABLE=1 일 때만
+    metrics.serve()   # 127.0.0.1:METRICS_PORT/metrics (METRICS=1)
 
     sds: List[str] = []
     headless = HEADLESS
@@ -837,6 +881,7 @@ async def main() -> None:
     async with async_playwright() as pw:
         browser: Browser = await launch_browser(pw, headless)
         ctx: BrowserContext = await browser.new_context(locale="ko-KR")
+        await standin.attach(ctx)  # STANDIN 있을 때만: maketicket 요청 → 로컬 스탠드인
         await attach_netlogger(ctx)  # 네트워크 로그 출력 활성화
         ctx.set_default_timeout(TIMEOUT_MS)
 
@@ -850,10 +895,22 @@ async def main() -> None:
         # Process each schedule code
         for sd in sds:
             try:
-                await process_show(ctx, sd)
+                await PROF.run(sd, process_show(ctx, sd))
             except Exception as e:
                 print(f"❌ [{sd}] 처리 실패: {e}")
 
+        if RL_REPORT:
+            for line in RL.report():
+                print(line)
+            print(AIMD_API.report())
+            print(WARM.report())
+            print(offload.report())
+        for line in LAG.report():
+            print(line)
+        LAG.stop()
+        for line in PROF.report():
+            print(line)
+
         if HOLD_AT_PAYMENT:
             print("\n[RUN] 브라우저를 유지합니다. 창을 닫거나 Ctrl+C 로 종료하세요…")
             while True:
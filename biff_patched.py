@@ -7,28 +7,47 @@
 # 사용: python biff_oneclick_concurrent_v5.py
 
 import re, asyncio, urllib.parse, json, random
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from typing import List, Optional, Dict, Any, Tuple, Union
 from playwright.async_api import async_playwright, Page, Frame
 import time
-import httpx
+from ratelimit import RL, RL_REPORT
+import seatbits
+from sdsched import SdScheduler, note_snapshot
+from aimd import API as AIMD_API, shows_limiter
+from warmdag import run_dag, node, report as warmdag_report
+from warmstate import WARM
+from schemadec import fields, lister, present, report as schema_report
+import offload
+from looplag import LAG
+import metrics
+from capture import CAP
+import artifacts
+from harstat import ReqTiming
+from recorder import REC, pw_har_kwargs
+import standin
+from showprof import PROF
+import apisnap
 
 # === TRACE: env & paths ===
-import os, uuid, datetime, pathlib
+import os, datetime, pathlib
 TRACE_ENABLE = os.getenv("TRACE_ENABLE", "1") == "1"
-TRACE_DIR = pathlib.Path(os.getenv("TRACE_DIR", "./debug"))
-TRACE_DIR.mkdir(parents=True, exist_ok=True)
+TRACE_DIR = pathlib.Path(os.getenv("TRACE_DIR", "./debug"))   # 첫 기록 때 생성 (Tracer._open)
 TRACE_WIRE_BODY = os.getenv("TRACE_WIRE_BODY", "0") == "1"  # POST body 저장 여부(민감정보 주의)
 PAY_STAY = bool(int(os.getenv("PAY_STAY", "1")))   # 1=결제에서 멈춤(기본), 0=자동종료
 PAY_STAY_TIMEOUT_MS = int(os.getenv("PAY_STAY_TIMEOUT_MS", "0"))  # 0=무한
 # ▼ 하드코딩 회차 코드
-SD_CODES = ["001", "002", "554", "910", "324", "911"]
-MAX_CONCURRENCY = len(SD_CODES)
+SD_CODES = [s.strip() for s in os.getenv("SD_CODES", "").split(",") if s.strip()] \
+    or ["001", "002", "554", "910", "324", "911"]   # SD_CODES=001,002 로 덮어쓰기 (e2ebench)
+MAX_CONCURRENCY = len(SD_CODES)   # AIMD 시작값 (상한은 AIMD_SHOWS_MAX)
+SHOWS = shows_limiter(MAX_CONCURRENCY)
 AVAILABLE_CODES = {"SS01000", "SS02000", "SS03000", "AVAILABLE", "OK"}
 BASE_RESMAIN = "https://biff.maketicket.co.kr/ko/resMain?sdCode={sd}"
 LOGIN_URL    = "https://biff.maketicket.co.kr/ko/login"
 KEEP_BROWSER_ON_HOLD = bool(int(os.getenv("KEEP_BROWSER_ON_HOLD", "1")))
 PAYMENT_DETECTED = False  # 결s제 프레임 감지 여부(전역)
+PAYMENT_SDS: set = set()  # 결제 단계까지 간 회차 — 마감 초과여도 재투입 금지 (예매 중복 방지)
+HOLD_PAGES: dict = {}     # sd → 결제창 유지할 page (process_one 이 남기고 runner 가 마감 밖에서 hold)
 OPEN_TIMEOUT  = 25_000
 CLICK_TIMEOUT = 10_000
 STEP_TIMEOUT  = 60_000
@@ -63,8 +82,9 @@ FORCE_SEAT_PREF = bool(int(os.getenv("FORCE_SEAT_PREF", "1")))
 
 # 스냅샷 후 잔여>0 이면 자동으로 hold/Next까지 시도할지
 SNAPSHOT_HOLD = bool(int(os.getenv("SNAPSHOT_HOLD", "0")))
-# 스냅샷 JSON 저장
+# 스냅샷 저장: SQLite 시계열(snapstore.py, SNAPSHOT_DB) + (옵션) run별 JSON 파일
 SNAPSHOT_SAVE = bool(int(os.getenv("SNAPSHOT_SAVE", "1")))
+SNAPSHOT_JSON = bool(int(os.getenv("SNAPSHOT_JSON", "0")))  # 기본 끔 — 같은 모양은 `snapstore.py export` 로
 # sdCode 공급(ENV → 파일 → 상수 SD_CODES 순으로 사용)
 AUTO_SNAPSHOT_ENV = os.getenv("AUTO_SNAPSHOT_SD_CODES", "")
 SD_CODE_FILE = os.getenv("AUTO_SNAPSHOT_FILE", "sd_codes.txt")
@@ -214,8 +234,9 @@ async def ensure_csrf_token_for(p, prodSeq: str, sdSeq: str) -> str:
     if ck:
         return ck
 
-    # 4) same-origin fetch로 응답 헤더에서 x-csrf-token 가져오기
+    # 4) same-origin fetch로 응답 헤더에서 x-csrf-token 가져오기 (in-page fetch 도 같은 호스트 버킷)
     try:
+        await RL.acquire(f"{FILM_ONESTOP_API}/rs/prod", method="POST")
         token = await p.evaluate("""
             async (api) => {
                 const r = await fetch(api + '/rs/prod', {
@@ -254,20 +275,17 @@ def _sale_ok(seat: dict) -> bool:
     if "soldYn"    in seat: sale = sale and (not toY(seat.get("soldYn")))
     return sale and (not rsv)
 
+_SEAT_LABEL = fields("seat.label",
+    name=("seat_type_nm", "seatTypeNm", "seat_class_nm", "seatClassNm",
+          "seat_grade_nm", "seatGradeNm", "seatTypeName", "classNm"),
+    code=("seat_type_code", "seatTypeCode", "seat_class_seq", "seatClassSeq",
+          "seatGradeCd", "seatGradeCode"),
+)
+
 def _seat_label_raw(seat: dict) -> tuple[str, str]:
     """좌석 하나에서 이름/코드 후보를 추출 (좌석등급/유형/클래스 명·코드 등)"""
-    name = (
-        seat.get("seat_type_nm") or seat.get("seatTypeNm") or
-        seat.get("seat_class_nm") or seat.get("seatClassNm") or
-        seat.get("seat_grade_nm") or seat.get("seatGradeNm") or
-        seat.get("seatTypeName") or seat.get("classNm") or ""
-    )
-    code = (
-        seat.get("seat_type_code") or seat.get("seatTypeCode") or
-        seat.get("seat_class_seq") or seat.get("seatClassSeq") or
-        seat.get("seatGradeCd") or seat.get("seatGradeCode") or ""
-    )
-    return str(name), str(code)
+    name, code = _SEAT_LABEL(seat)
+    return str(name or ""), str(code or "")
 
 def _classify_seat_kind(name: str, code: str) -> str:
     """좌석종류 분류 → GENERAL / WHEELCHAIR / BNK / ETC"""
@@ -284,6 +302,13 @@ def _classify_seat_kind(name: str, code: str) -> str:
         return "GENERAL"
     return "ETC"
 
+_TICKET_TYPE = fields("tickettype.row",
+    name=("tkttypNm", "ticketTypeNm", "name", "nm"),
+    seq=("tkttypSeq", "ticketTypeSeq", "seq"),
+    seatClassSeq=("seatClassSeq", "seat_class_seq", "seatClass"),
+    price=("price", "ticketPrice", "salePrice"),
+)
+
 def _collect_ticket_types(ticketType_resp: dict) -> list[dict]:
     """
     /api/v1/rs/tickettype 응답을 좌석/티켓 타입 리스트로 정규화
@@ -296,12 +321,9 @@ def _collect_ticket_types(ticketType_resp: dict) -> list[dict]:
         d.get("result") or []
     )
     for t in items:
-        nm  = t.get("tkttypNm") or t.get("ticketTypeNm") or t.get("name") or t.get("nm")
-        seq = t.get("tkttypSeq") or t.get("ticketTypeSeq") or t.get("seq")
-        scs = t.get("seatClassSeq") or t.get("seat_class_seq") or t.get("seatClass")
-        price = t.get("price") or t.get("ticketPrice") or t.get("salePrice") or 0
+        nm, seq, scs, price = _TICKET_TYPE(t)
         out.append({
-            "name": nm, "tkttypSeq": seq, "seatClassSeq": scs, "price": price
+            "name": nm, "tkttypSeq": seq, "seatClassSeq": scs, "price": price or 0
         })
     return out
 
@@ -343,6 +365,7 @@ async def snapshot_sd(page, sdCode: str) -> dict:
       - RS 워밍업
       - prodSummary / blockSummary2 / seatBaseMap / seatStatusList / tickettype 조회
       - plan 판정 + 총좌석/잔여 및 '좌석종류별 잔여' 집계
+    page 자리에 apisnap.ApiSession 을 넘기면 페이지 없이 HTTP 호출만으로 같은 레코드.
     """
     # map_sd_from_filmapi()는 (prodSeq, sdSeq) 튜플을 반환하므로
     # dict를 돌려주는 get_meta_from_filmapi()로 스위치
@@ -360,9 +383,10 @@ async def snapshot_sd(page, sdCode: str) -> dict:
 
     refs = build_onestop_referers({}, prodSeq, sdSeq)
 
-    # 워밍업
+    # 워밍업 (같은 세션에서 TTL 안에 이미 했으면 생략)
     try:
-        await post_api(page, "/rs/prod", form={}, extra_headers={"Referer": refs["rs"]})
+        await WARM.once(page, "prod", prodSeq, "",
+                        lambda: post_api(page, "/rs/prod", form={}, extra_headers={"Referer": refs["rs"]}))
     except:
         pass
 
@@ -397,49 +421,13 @@ async def snapshot_sd(page, sdCode: str) -> dict:
     total = remain = 0
     by_kind = {}
 
+    # 좌석 단위 응답은 큰 홀에서 수천 행 → 행 수가 크면 기록/집계를 스레드로 (offload.run)
+    n_rows = len(_extract_list(statusList))
+    if plan in ("SEAT", "ALL"):
+        await offload.run(_record_seatbits, sdCode, prodSeq, sdSeq, baseMap, statusList, weight=n_rows)
+
     if plan == "SEAT":
-        # zoneList 총/잔여
-        zl = (baseMap or {}).get("zoneList") or (baseMap or {}).get("zonelist") or []
-        def _toi(x): 
-            try: return int(str(x).strip())
-            except: return 0
-        total  = sum(_toi(z.get("total_seat_cnt") or z.get("totalSeatCnt") or 0) for z in zl)
-        remain = sum(_toi(z.get("rest_seat_cnt")  or z.get("restSeatCnt")  or 0) for z in zl)
-        # 좌석종류별 잔여(판매가능 좌석만)
-        by_kind = _seat_type_tally(statusList)
-        # --- PATCH: 집계형 응답 보강 ---
-        agg = _extract_list(statusList)
-        if agg:
-            # AVAILABLE_CODES는 상단에 이미 있음: {"SS01000","SS02000","SS03000","AVAILABLE","OK"}
-            t2, r2, by = _count_status_items(agg, available=tuple(AVAILABLE_CODES))
-            print(f"[DEBUG] RS/statuslist size={len(agg)} sample={agg[:1]}")
-            print(f"[DEBUG] by={sorted(by.items())} total={t2} remain={r2}")
-            if (total or 0) == 0 and t2:
-                total = t2
-            if r2 is not None:
-                remain = r2
-
-        # (fallback) 자유석/선착순 등으로 status가 빈 경우 → tickettype로 근사
-        if (not agg) or (total in (None, 0)) or (remain is None):
-            lst = _extract_list(ticketType)  # 위에서 이미 동시에 받아둔 raw JSON
-            if lst:
-                t_total = t_remain = 0
-                for row in lst:
-                    tot  = int(row.get("admissionTotalPersonCnt") or row.get("totalPersonCnt") or 0)
-                    sold = int(row.get("admissionPersonCnt")      or row.get("saleCnt")         or 0)
-                    rem  = int(row.get("admissionAvailPersonCnt") or row.get("remainSeatCnt")   or row.get("restSeatCnt") or 0)
-                    if not tot and (rem or sold):
-                        tot = rem + sold
-                    t_total += tot; t_remain += rem
-                if t_total:
-                    total  = t_total if (total in (None, 0)) else total
-                    remain = t_remain if (remain is None) else remain
-                    print(f"[DEBUG] fallback(listTicketType) total={t_total} remain={t_remain}")
-        # --- /PATCH ---
-
-        # zoneList가 잔여 0으로만 오면 statusList로 보강
-        if remain == 0 and by_kind:
-            remain = sum(by_kind.values())
+        total, remain, by_kind = await offload.run(_aggregate_seat_plan, baseMap, statusList, ticketType, weight=n_rows)
     else:
         # NRS/ALL: blockSummary2 집계
         sums = await seat_counts_via_blocksummary2(page, prodSeq, sdSeq)
@@ -459,6 +447,62 @@ async def snapshot_sd(page, sdCode: str) -> dict:
         "ticketTypes": ttypes,
     }
 
+def _aggregate_seat_plan(baseMap, statusList, ticketType) -> tuple:
+    """snapshot_sd의 지정석(SEAT) 집계: zoneList 총/잔여 + 좌석종류별 + 집계형/tickettype 보강.
+    동기 함수 (행이 많으면 offload.run으로 스레드에서 실행)."""
+    # zoneList 총/잔여
+    zl = (baseMap or {}).get("zoneList") or (baseMap or {}).get("zonelist") or []
+    def _toi(x): 
+        try: return int(str(x).strip())
+        except: return 0
+    total  = sum(_toi(z.get("total_seat_cnt") or z.get("totalSeatCnt") or 0) for z in zl)
+    remain = sum(_toi(z.get("rest_seat_cnt")  or z.get("restSeatCnt")  or 0) for z in zl)
+    # 좌석종류별 잔여(판매가능 좌석만)
+    by_kind = _seat_type_tally(statusList)
+    # --- PATCH: 집계형 응답 보강 ---
+    agg = _extract_list(statusList)
+    if agg:
+        # AVAILABLE_CODES는 상단에 이미 있음: {"SS01000","SS02000","SS03000","AVAILABLE","OK"}
+        t2, r2, by = _count_status_items(agg, available=tuple(AVAILABLE_CODES))
+        print(f"[DEBUG] RS/statuslist size={len(agg)} sample={agg[:1]}")
+        print(f"[DEBUG] by={sorted(by.items())} total={t2} remain={r2}")
+        if (total or 0) == 0 and t2:
+            total = t2
+        if r2 is not None:
+            remain = r2
+
+    # (fallback) 자유석/선착순 등으로 status가 빈 경우 → tickettype로 근사
+    if (not agg) or (total in (None, 0)) or (remain is None):
+        lst = _extract_list(ticketType)  # 위에서 이미 동시에 받아둔 raw JSON
+        if lst:
+            t_total = t_remain = 0
+            for row in lst:
+                tot  = int(row.get("admissionTotalPersonCnt") or row.get("totalPersonCnt") or 0)
+                sold = int(row.get("admissionPersonCnt")      or row.get("saleCnt")         or 0)
+                rem  = int(row.get("admissionAvailPersonCnt") or row.get("remainSeatCnt")   or row.get("restSeatCnt") or 0)
+                if not tot and (rem or sold):
+                    tot = rem + sold
+                t_total += tot; t_remain += rem
+            if t_total:
+                total  = t_total if (total in (None, 0)) else total
+                remain = t_remain if (remain is None) else remain
+                print(f"[DEBUG] fallback(listTicketType) total={t_total} remain={t_remain}")
+    # --- /PATCH ---
+
+    # zoneList가 잔여 0으로만 오면 statusList로 보강
+    if remain == 0 and by_kind:
+        remain = sum(by_kind.values())
+    return total, remain, by_kind
+
+def _record_seatbits(sdCode, prodSeq, sdSeq, baseMap, statusList):
+    """좌석 단위 상태를 비트셋 히스토리(seatbits.py)에 한 줄 추가 + 변화 있으면 로그"""
+    try:
+        d = seatbits.record(prodSeq, sdSeq, baseMap, statusList)
+        if d and (d.get("released") or d.get("taken")):
+            print(f"[SEATBITS] [{sdCode}] avail={d['avail']}/{d['n']} +{d['released']} -{d['taken']}")
+    except Exception as e:
+        print(f"[SEATBITS] [{sdCode}] 기록 실패: {e}")
+
 def _log_snapshot_line(s: dict | tuple):
     if isinstance(s, tuple):
         # (sdCode, payload) 형태 허용
@@ -477,28 +521,95 @@ def _log_snapshot_line(s: dict | tuple):
     sold  = " [매진]" if (isinstance(rem, int) and rem == 0) else ""
     print(f"ℹ️  [{sd}] {title} | {hall} | {dtxt} | plan={plan} | 총={tot} 잔여={rem}{sold}" + (f" | 종류별: {kinds}" if kinds else ""))
 
-async def snapshot_many(page, sd_list: list[str]) -> list[dict]:
-    sem = asyncio.Semaphore(MAX_CONCURRENCY or 4)
+# === STREAM: 완료되는 순서대로 로그/디스크 기록 ==============================
+# 한 회차가 끝나는 즉시 ndjson 한 줄 append → 중간에 죽어도 그때까지 결과는 남음
+def _stream_append(path, obj) -> None:
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(obj, ensure_ascii=False, default=str) + "\n")
+    except Exception as e:
+        print(f"[STREAM] append 실패({path}): {e}")
+
+async def snapshot_many(page, sd_list: list[str], on_result=None) -> list[dict]:
+    """우선순위 스케줄러 + 완료 즉시 스트리밍. on_result(snap)는 완료 즉시 호출, 반환은 입력 순서 유지.
+    같은 sd 가 여러 번 있으면 한 번만 조회하고 그 자리들에 같은 결과."""
+    sched = SdScheduler(sd_list, MAX_CONCURRENCY or 4, name="SNAP")
+    print(sched.describe())
+    idx: dict[str, list[int]] = {}
+    for i, sd in enumerate(sd_list):
+        idx.setdefault(sd, []).append(i)
+    out = [None] * len(sd_list)
     async def one(sd):
-        async with sem:
-            return await snapshot_sd(page, sd)
-    return await asyncio.gather(*[one(sd) for sd in sd_list])
+        try:
+            snap = await snapshot_sd(page, sd)
+        except Exception as e:
+            snap = {"sdCode": sd, "__error__": str(e)}
+        for i in idx[sd]:
+            out[i] = snap
+        note_snapshot(snap)
+        if on_result:
+            try: on_result(snap)
+            except Exception as e: print(f"[SNAP] on_result 실패: {e}")
+        return snap
+    await sched.run(one, limiter=SHOWS)
+    return out
+
+async def _snapshot_api_session(page):
+    """로그인된 page 의 쿠키/CSRF → apisnap.ApiSession (조회는 HTTP 만, 갱신 때만 페이지 빌림). 실패 시 None → 페이지 경로."""
+    try:
+        tok = CSRFTOKEN_CACHE["val"] or await _csrf_from_cookies(page.context) or await get_csrf_token_hard(page) or ""
+        refresh = apisnap.page_refresher(page.context, get_csrf_token_hard, [DEFAULT_REF, f"{MAIN_HOST}/"])
+        api = await apisnap.export_session(page.context, csrf=tok, page=page, refresh=refresh)
+        print(f"[SNAP] API 전용 스냅샷 (csrf={'ok' if api.csrf else '-'}, cookies={len(api.cookies)})")
+        return api
+    except Exception as e:
+        print(f"[SNAP] API 세션 export 실패 → 페이지 경로: {e}")
+        return None
 
 async def run_auto_snapshots(page, *, do_hold: bool | None = None):
     do_hold = SNAPSHOT_HOLD if do_hold is None else do_hold
     await install_cors_demo(page.context)  # CORS 교육용 라우팅
 
-    sd_list = await _load_sd_list_from_anywhere(SD_CODES)
-    snaps = await snapshot_many(page, sd_list)
+    import time, pathlib
+    from snapstore import run_id
+    ts = run_id()  # ms 해상도 — 같은 초의 두 run 이 섞이지 않게 (JSON 파일명·store run 공용)
+    stream = pathlib.Path(f"./snapshots-{ts}.ndjson")
+    st = None
+    if SNAPSHOT_SAVE:
+        try:
+            from snapstore import SnapStore
+            st = SnapStore()
+        except Exception as e:
+            print(f"[SNAP] store 열기 실패: {e}")
 
-    for s in snaps:
-        _log_snapshot_line(s)
+    def _on_snap(snap):
+        _log_snapshot_line(snap)
+        if not SNAPSHOT_SAVE:
+            return
+        if st is not None:
+            try: st.append([snap], run=ts)
+            except Exception as e: print(f"[SNAP] store 실패: {e}")
+        if SNAPSHOT_JSON:
+            _stream_append(stream, snap)
 
-    if SNAPSHOT_SAVE:
-        import json, time, pathlib
-        ts = time.strftime("%Y%m%d-%H%M%S")
+    sd_list = await _load_sd_list_from_anywhere(SD_CODES)
+    api = await _snapshot_api_session(page) if apisnap.APISNAP else None
+    try:
+        snaps = await snapshot_many(api or page, sd_list, on_result=_on_snap)
+    finally:
+        if api is not None:
+            print(api.report())
+            await api.close()
+        if st is not None:
+            st.close()
+            print(f"📝 snapshot stored: {st.path} (run={ts})")
+
+    if SNAPSHOT_SAVE and SNAPSHOT_JSON:
+        # 스트림 완료 → 기존 형태(list JSON)로 정리, 중간 ndjson은 제거
         out = pathlib.Path(f"./snapshots-{ts}.json")
         out.write_text(json.dumps(snaps, ensure_ascii=False, indent=2), encoding="utf-8")
+        try: stream.unlink()
+        except Exception: pass
         print(f"📝 snapshot saved: {out}")
 
     if do_hold:
@@ -698,10 +809,7 @@ async def ensure_booking_iframe(p, *, prodSeq: str | None = None, sdSeq: str | N
 def _clean_ref(url: str) -> str:
     return (url or "").rstrip("/")
 
-def build_onestop_referers(page_or_scope, prodSeq: str, sdSeq: str):
-    rs   = _clean_ref(_rs_url(prodSeq, sdSeq))
-    seat = _clean_ref(_seat_url(prodSeq, sdSeq))
-    return {"rs": rs, "seat": seat}
+# build_onestop_referers → 아래 "REPLACE: build_onestop_referers (compat)" 한 곳 (예전 정의는 덮어써져 안 쓰였음)
 
 # ==== PATCH: 읽기성 API는 무CSRF 허용(선택) ===================================
 ALLOW_NO_CSRF = os.getenv("ALLOW_NO_CSRF", "0") == "1"
@@ -935,6 +1043,8 @@ async def install_cors_demo(ctx):
                 pd = req.post_data  # 속성! (메서드 아님)
                 pd_bytes = pd.encode("utf-8") if isinstance(pd, str) and pd else None
             body_bytes = pd_bytes
+            await RL.acquire(req.url, method=req.method)   # 호스트 레이트리밋 공유
+            import httpx   # proxy 모드에서만 필요 → import 시점 비용 제외
             async with httpx.AsyncClient(follow_redirects=True, timeout=20.0) as client:
                 r = await client.request(
                     req.method, req.url,
@@ -993,18 +1103,14 @@ async def install_cors_demo(ctx):
     print(f"[CORS-DEMO] mode={mode} targets={patterns} allow_origin={CORS_ALLOW_ORIGIN}")
 
 # --- PATCH: helpers (put under imports) ---
+_STATUS_LIST = lister("seat.statusList", ("rsSeatStatusList", "seatStatusList", "list", "rows", "resultList"),
+                      nested=("data", "result", "payload"))
+
 def _extract_list(payload):
-    """응답 JSON 어디에 list가 있든 꺼내줌."""
-    if isinstance(payload, dict):
-        for k in ("rsSeatStatusList", "seatStatusList", "list", "rows", "resultList"):
-            v = payload.get(k)
-            if isinstance(v, list):
-                return v
-        for k in ("data", "result", "payload"):
-            v = payload.get(k)
-            if isinstance(v, dict) and isinstance(v.get("list"), list):
-                return v["list"]
-    return []
+    """응답 JSON 어디에 list가 있든 꺼내줌. (경로는 schemadec가 첫 응답에서 학습)"""
+    return _STATUS_LIST(payload)
+
+_STATUS_ITEM = fields("seat.statusItem", cd=("seatStatusCd", "statusCd", "cd"), cnt=("seatCnt", "cnt", "count"))
 
 def _count_status_items(items, available=("SS01000", "AVAILABLE", "OK")):
     """집계: 총=모든 status 합, 잔여=available 코드 합."""
@@ -1013,8 +1119,9 @@ def _count_status_items(items, available=("SS01000", "AVAILABLE", "OK")):
     for it in items or []:
         if not isinstance(it, dict):
             continue
-        cd = str(it.get("seatStatusCd") or it.get("statusCd") or it.get("cd") or "").upper()
-        cnt = int(it.get("seatCnt") or it.get("cnt") or it.get("count") or 0)
+        cd, cnt = _STATUS_ITEM(it)
+        cd = str(cd or "").upper()
+        cnt = int(cnt or 0)
         if not cd or cnt <= 0:
             continue
         total += cnt
@@ -1026,20 +1133,23 @@ def _count_status_items(items, available=("SS01000", "AVAILABLE", "OK")):
 
 
 # --- helper (ADD) ---
+_BASEMAP_ZONES = lister("basemap.zones", ("zoneList", "zones", "data", "list", "items"))
+_BASEMAP_ZONE = fields("basemap.zone",
+    name=("zoneNm", "zone_name", "name"),
+    total=("total_seat_cnt", "totalSeatCnt", "seatCnt"),
+    remain=("rest_seat_cnt", "remainSeatCnt", "availableSeatCnt"),
+)
+
 def _sum_from_basemap(js: dict) -> tuple[int,int,dict]:
     total = remain = 0
-    zones = []
-    if isinstance(js, dict):
-        for k in ("zoneList","zones","data","list","items"):
-            v = js.get(k)
-            if isinstance(v, list):
-                zones = v; break
+    zones = _BASEMAP_ZONES(js)
     by = {}
     for z in (zones or []):
         if not isinstance(z, dict): continue
-        name = (z.get("zoneNm") or z.get("zone_name") or z.get("name") or "").strip()
-        t = int(z.get("total_seat_cnt") or z.get("totalSeatCnt") or z.get("seatCnt") or 0)
-        r = int(z.get("rest_seat_cnt")  or z.get("remainSeatCnt") or z.get("availableSeatCnt") or 0)
+        name, t, r = _BASEMAP_ZONE(z)
+        name = (name or "").strip()
+        t = int(t or 0)
+        r = int(r or 0)
         total += max(t,0); remain += max(r,0)
         if name: by[name] = r
     return total, remain, by
@@ -1384,6 +1494,9 @@ async def get_csrf_token_hard(page):
 
 async def ensure_csrf(page, current_form_tok: str | None):
     """빈 값이면 캐시/하드탐색 → 끝까지 없으면 예외."""
+    # apisnap.ApiSession: export/갱신된 세션 토큰이 우선 (페이지 없음)
+    if (not current_form_tok) and getattr(page, "csrf", None):
+        return page.csrf
     # 캐시에 유효값 있으면 사용
     if (not current_form_tok) and CSRFTOKEN_CACHE["val"]:
         return CSRFTOKEN_CACHE["val"]
@@ -1423,174 +1536,11 @@ def pick(obj, *keys):
     return ""
 
 
-# === NETLOG UTILITIES ==========================================
-import os, json, time, pathlib, traceback
-NETLOG          = int(os.getenv("LOG_POST_BODY", "1"))          # 1=on, 0=off
-NETLOG_RAW      = int(os.getenv("LOG_POST_BODY_RAW", "0"))      # 1=raw body 파일 저장
-NETLOG_DIR      = os.getenv("LOG_POST_DIR", "./_netlog")        # 파일 저장 위치
-NETLOG_MAX      = int(os.getenv("LOG_POST_MAX", "400"))         # 최대 기록 횟수(과다 로그 방지)
-NETLOG_SILENTOK = int(os.getenv("LOG_POST_SILENT_OK", "0"))     # 1이면 200 응답은 요약만
-
-_netlog_seq = 0
-SENSITIVE_KEYS = {
-    "password", "pass", "pin", "card", "cardNo", "cardno",
-    "rrn", "resident", "birth", "mobileAuth", "otp", "auth"
-}
-# csrfToken은 기본 노출 허용(세션 추적용). 완전 가리고 싶으면 아래 True로.
-MASK_CSRF = False
-
-def _redact_form(form: dict):
-    out = {}
-    for k, v in form.items():
-        lk = k.lower()
-        if lk in SENSITIVE_KEYS or (lk == "csrftoken" and MASK_CSRF):
-            out[k] = "***"
-        else:
-            out[k] = v
-    return out
-
-def _short(s: str, n: int = 240) -> str:
-    return s if len(s) <= n else s[:n] + "…"
-
-def _write_file(fname: str, content: str):
-    try:
-        pathlib.Path(NETLOG_DIR).mkdir(parents=True, exist_ok=True)
-        with open(pathlib.Path(NETLOG_DIR) / fname, "w", encoding="utf-8") as f:
-            f.write(content)
-    except Exception as e:
-        print(f"[NET] file write fail: {e}")
-
-def _netlog_req(url: str, headers: dict, form: dict | str, raw_body: str) -> int:
-    """요청 직전 호출. 콘솔+파일 기록. 고유 seq 반환."""
-    global _netlog_seq
-    if not NETLOG:
-        return 0
-    _netlog_seq += 1
-    seq = _netlog_seq
-    ts  = time.strftime("%Y%m%d-%H%M%S")
-
-    # 콘솔 요약
-    safe_hdr = {
-        "Content-Type": headers.get("Content-Type"),
-        "Origin":       headers.get("Origin"),
-        "Referer":      headers.get("Referer"),
-        "X-Requested-With": headers.get("X-Requested-With"),
-        "X-CSRF-TOKEN": ("***" if headers.get("X-CSRF-TOKEN") and MASK_CSRF else headers.get("X-CSRF-TOKEN"))
-    }
-    print(f"[NET] ↗️ POST #{seq} {url}")
-    print(f"[NET]     headers: {json.dumps(safe_hdr, ensure_ascii=False)}")
-    if isinstance(form, dict):
-        print(f"[NET]     form: {json.dumps(_redact_form(form), ensure_ascii=False)}")
-    else:
-        print(f"[NET]     body: {_short(raw_body)}")
-
-    # 파일(요청 원문 + 호출 스택)
-    payload = {
-        "url": url,
-        "headers": headers,
-        "form": form if isinstance(form, dict) else None,
-        "raw_body": raw_body if (NETLOG_RAW or not isinstance(form, dict)) else None,
-        "stack": "".join(traceback.format_stack(limit=14)),
-        "ts": ts,
-        "seq": seq,
-    }
-    _write_file(f"{ts}_{seq:04d}_REQ.json", json.dumps(payload, ensure_ascii=False, indent=2))
-    if NETLOG_RAW:
-        _write_file(f"{ts}_{seq:04d}_REQ.raw.txt", raw_body)
-    return seq
-
-def _netlog_resp(seq: int, url: str, status: int, text: str):
-    if not NETLOG:
-        return
-    ts  = time.strftime("%Y%m%d-%H%M%S")
-    short = _short(text, 500)
-    if status == 200 and NETLOG_SILENTOK:
-        print(f"[NET] ↘️ RESP #{seq} {status} {url}")
-    else:
-        print(f"[NET] ↘️ RESP #{seq} {status} {url} — {_short(short, 200)}")
-    _write_file(f"{ts}_{seq:04d}_RESP.txt", f"{status} {url}\n\n{short}")
+# === NETLOG + HAR → recorder 파이프라인 =========================
+# 요청 기록(콘솔/파일 netlog, HAR, NDJSON, metrics)은 recorder.REC 한 곳에서 캡처 → 백그라운드 싱크로
+# 기존 스위치 LOG_POST_BODY / HAR_ENABLE / HAR_DIR / LOG_POST_* 는 recorder 가 그대로 읽음 (REC_SINKS로 개별 지정)
+import atexit, os, json, time, pathlib, traceback, urllib.parse
 # ================================================================
-# === HAR RECORDER (auto .har) ======================================
-import atexit, pathlib, time, json, urllib.parse
-
-HAR_ENABLE = int(os.getenv("HAR_ENABLE", "1"))
-HAR_DIR    = os.getenv("HAR_DIR", "./_har")
-
-class _HarRec:
-    def __init__(self):
-        self.reset()
-        try:
-            pathlib.Path(HAR_DIR).mkdir(parents=True, exist_ok=True)
-        except: pass
-
-    def reset(self):
-        ts = time.strftime("%Y%m%d-%H%M%S")
-        self.started = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
-        self.path = str(pathlib.Path(HAR_DIR) / f"capture_{ts}.har")
-        self.seq2idx = {}
-        self.log = {
-            "log": {
-                "version": "1.2",
-                "creator": {"name": "biff_har", "version": "1.0"},
-                "entries": []
-            }
-        }
-
-    def _headers_list(self, d):
-        return [{"name": k, "value": str(v)} for k, v in (d or {}).items()]
-
-    def on_req(self, seq, url, method, headers, body_text):
-        if not HAR_ENABLE or not url: return
-        qs = urllib.parse.parse_qs(urllib.parse.urlparse(url).query or "")
-        entry = {
-            "startedDateTime": self.started,
-            "time": 0,
-            "request": {
-                "method": method,
-                "url": url,
-                "httpVersion": "HTTP/1.1",
-                "headers": self._headers_list(headers),
-                "queryString": [{"name": k, "value": (v[0] if isinstance(v,list) and v else "")} for k,v in qs.items()],
-                "headersSize": -1,
-                "bodySize": len(body_text or ""),
-            },
-            "response": {
-                "status": 0, "statusText": "",
-                "httpVersion": "HTTP/1.1",
-                "headers": [], "cookies": [],
-                "content": {"size": 0, "mimeType": "", "text": ""},
-                "redirectURL": ""
-            },
-            "cache": {},
-            "timings": {"send": 0, "wait": 0, "receive": 0}
-        }
-        if body_text:
-            entry["request"]["postData"] = {
-                "mimeType": headers.get("Content-Type","application/x-www-form-urlencoded"),
-                "text": body_text
-            }
-        self.seq2idx[seq] = len(self.log["log"]["entries"])
-        self.log["log"]["entries"].append(entry)
-
-    def on_resp(self, seq, status, headers, text):
-        if not HAR_ENABLE: return
-        idx = self.seq2idx.get(seq)
-        if idx is None: return
-        ent = self.log["log"]["entries"][idx]
-        ent["response"]["status"] = int(status or 0)
-        ent["response"]["headers"] = self._headers_list(headers or {})
-        ent["response"]["content"]["text"] = text or ""
-        ent["response"]["content"]["size"] = len(text or "")
-        ent["response"]["content"]["mimeType"] = (headers or {}).get("content-type","")
-
-        # incremental flush (안전)
-        try:
-            pathlib.Path(self.path).write_text(json.dumps(self.log, ensure_ascii=False, indent=2), encoding="utf-8")
-        except: pass
-
-HAR = _HarRec()
-atexit.register(lambda: pathlib.Path(HAR.path).write_text(json.dumps(HAR.log, ensure_ascii=False, indent=2), encoding="utf-8") if HAR_ENABLE else None)
-# ===================================================================
 
 # --- add: request 스코프 정규화 유틸 ---
 def _as_page(scope):
@@ -1696,6 +1646,8 @@ async def arm_payment_hold(page: Page):
                     page.off("request", _on_req)
                 except:
                     pass
+                if getattr(page, "_sd", None):
+                    PAYMENT_SDS.add(page._sd)
                 asyncio.create_task(hold_at_payment(page))
         except:
             pass
@@ -1774,47 +1726,7 @@ async def ensure_scope_or_spawn(scope_or_page, prodSeq: str, sdSeq: str):
         pass
     return None
 
-@trace_step("seat_counts_via_blocksummary2")
-async def seat_counts_via_blocksummary2(scope0, prodSeq, sdSeq,
-                                        chnlCd="WEB", csrfToken="", perfDate=""):
-    REFS = build_onestop_referers(scope0, str(prodSeq), str(sdSeq))
-    H_RS = _ref_headers(REFS, "rs")
-    if csrfToken:
-        H_RS["X-CSRF-TOKEN"] = csrfToken
-
-    js = await post_api(scope0, "/rs/blockSummary2", {
-        "langCd": "ko", "csrfToken": csrfToken,
-        "prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-        "chnlCd": chnlCd, "perfDate": perfDate or ""
-    }, extra_headers=H_RS, allow_no_csrf=(ALLOW_NO_CSRF or (not csrfToken)))
-
-    # 응답 형태: dict에 data/list/rows/… 또는 리스트
-    if isinstance(js, dict):
-        arr = js.get("data") or js.get("list") or js.get("rows") or js.get("result") or []
-    else:
-        arr = js
-
-    total, remain = 0, 0
-    for it in (arr or []):
-        if not isinstance(it, dict):
-            continue
-        t = _coalesce_int(
-            it,
-            "seatCnt","totalSeatCnt","totSeatCnt",
-            "saleSeatCnt","rendrSeatCnt",
-            "totalPersonCnt","admissionTotalPersonCnt",
-            default=0
-        )
-        a = _coalesce_int(
-            it,
-            "remainSeatCnt","restSeatCnt","availableSeatCnt","ableSeatCnt",
-            "rmnSeatCnt","admissionAvailPersonCnt",
-            default=0
-        )
-        total  += max(t, 0)
-        remain += max(a, 0)
-
-    return total, remain, {"NRS": remain}, "NRS"
+# seat_counts_via_blocksummary2 → 아래 "ADD: NRS/ALL fallback via blockSummary2" 한 곳 (예전 정의는 덮어써져 안 쓰였음)
 
 # --- add: make blockSummary2 results uniform (tuple|dict → dict) ---
 def _coerce_summary(summary):
@@ -1856,27 +1768,6 @@ def build_onestop_referers(scope_or_page, prodSeq: str, sdSeq: str | None = None
     return {"rs": rs, "seat": seat}
 
 
-# === REPLACE: find_booking_scope — prefer payment/price/seat/zone ============
-async def find_booking_scope(p):
-    """현재 페이지나 iframe들 중 filmonestop booking 영역을 찾아서 반환.
-       payment > price > seat/zone > booking 순으로 우선."""
-    try:
-        frames = [f for f in p.frames if "filmonestop.maketicket.co.kr" in (f.url or "")]
-        def score(u: str) -> int:
-            u = u or ""
-            if "/payment" in u or "/order" in u: return 4
-            if "/price"   in u: return 3
-            if "/seat"    in u or "/zone" in u: return 2
-            if "/booking" in u: return 1
-            return 0
-        if frames:
-            return max(frames, key=lambda f: score(f.url or ""))
-        if "filmonestop.maketicket.co.kr" in (p.url or ""):
-            return p
-    except Exception:
-        pass
-    return None
-
 # === REPLACE ENTIRE FUNCTION: _harvest_booking_ctx ===
 async def _harvest_booking_ctx(page) -> dict:
     """현재 페이지에서 prodSeq/sdSeq/chnlCd/csrf/sdCode/perfDate를 안전하게 긁어온다."""
@@ -1932,6 +1823,10 @@ def _har_paths_from_env() -> list[str]:
     for piece in raw.split(";"):
         piece = piece.strip()
         if not piece: continue
+        # archive:_har/*.har → 압축 아카이브 안의 HAR (artifacts.py pack 이후)
+        if piece.startswith(artifacts.PREFIX):
+            out.extend(artifacts.glob(piece))
+            continue
         # 파일이면 그대로, 디렉토리면 *.har
         if any(ch in piece for ch in ["*", "?", "["]):
             out.extend(glob.glob(piece))
@@ -1940,7 +1835,7 @@ def _har_paths_from_env() -> list[str]:
             if p.is_file(): out.append(str(p))
             elif p.is_dir(): out.extend(glob.glob(str(p / "*.har")))
     # 중복 제거 + 최신 우선
-    return sorted(set(out), key=lambda s: (pathlib.Path(s).stat().st_mtime if pathlib.Path(s).exists() else 0), reverse=True)
+    return sorted(set(out), key=artifacts.mtime, reverse=True)
 
 def _kv_from_query(url: str) -> dict:
     try:
@@ -1996,8 +1891,7 @@ def build_har_index(force: bool = False):
     forms  = []    # 원본 폼만 모아두기
     for p in paths:
         try:
-            with open(p, "r", encoding="utf-8", errors="ignore") as f:
-                har = json.load(f)
+            har = artifacts.load_json(p)     # 실제 파일 또는 archive: 가상 경로
         except Exception:
             continue
         entries = (har.get("log", {}) or {}).get("entries", [])
@@ -2044,7 +1938,7 @@ def har_params_for(sd: str|int) -> dict:
 # ===================================================================
 
 def _coalesce_int(d: dict, *keys, default=0):
-    for k in keys:
+    for k in present(d, keys):   # 없는 키는 건너뜀
         try:
             v = d.get(k)
             if v is None: 
@@ -2131,25 +2025,23 @@ async def _prepare_session_like_har(scope, *, prodSeq, sdSeq, perfDate, csrfToke
         base.update(form)
         return post_api(scope, f"/rs/{path}", base, extra_headers=H_RS)
 
-    # ✅ prod → prodChk → chkProdSdSeq → informLimit → prodSummary → blockSummary2
-    try: await P("prod", {"prodSeq": str(prodSeq)})
-    except Exception as e: dlog(f"[SWAP] prod warn: {e}")
-    try: await P("prodChk", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                             "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo,
-                             "perfDate": perfDate})
-    except Exception as e: dlog(f"[SWAP] prodChk warn: {e}")
-    try: await P("chkProdSdSeq", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq), "chnlCd": chnlCd})
-    except Exception as e: dlog(f"[SWAP] chkProdSdSeq warn: {e}")
-    try: await P("informLimit", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                                 "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo})
-    except Exception as e: dlog(f"[SWAP] informLimit warn: {e}")
-    try: await P("prodSummary", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                                 "chnlCd": chnlCd, "perfDate": perfDate})
-    except Exception as e: dlog(f"[SWAP] prodSummary warn: {e}")
-    try: await P("blockSummary2", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq), "chnlCd": chnlCd, "perfDate": perfDate})
-    except Exception as e: dlog(f"[SWAP] blockSummary2 warn: {e}")
-
-    ilog("[SWAP] session prepared (prod→prodChk→chkProdSdSeq→informLimit→prodSummary→blockSummary2)")
+    # ✅ prod → prodChk → chkProdSdSeq → {informLimit ∥ prodSummary ∥ blockSummary2}  (warmdag.RS_DEPS)
+    #    전부 경고만 남기고 계속 (required=False), TTL 안에 이미 한 step은 생략 (warmstate.WARM)
+    pd = {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq)}
+    def W(step, form):
+        return lambda: WARM.once(scope, step, prodSeq, "" if step == "prod" else sdSeq, lambda: P(step, form))
+    await run_dag([
+        node("prod",          W("prod", {"prodSeq": str(prodSeq)}), required=False),
+        node("prodChk",       W("prodChk", {**pd, "chnlCd": chnlCd, "saleTycd": saleTycd,
+                                            "saleCondNo": saleCondNo, "perfDate": perfDate}), required=False),
+        node("chkProdSdSeq",  W("chkProdSdSeq", {**pd, "chnlCd": chnlCd}), required=False),
+        node("informLimit",   W("informLimit", {**pd, "chnlCd": chnlCd, "saleTycd": saleTycd,
+                                                "saleCondNo": saleCondNo}), required=False),
+        node("prodSummary",   W("prodSummary", {**pd, "chnlCd": chnlCd, "perfDate": perfDate}), required=False),
+        node("blockSummary2", W("blockSummary2", {**pd, "chnlCd": chnlCd, "perfDate": perfDate}), required=False),
+    ], name="prepare", log=lambda m: dlog(m.replace("[prepare]", "[SWAP]")))
+
+    ilog("[SWAP] session prepared (prod→prodChk→chkProdSdSeq→informLimit/prodSummary/blockSummary2)")
 
 # === REPLACE ENTIRE FUNCTION: robust NRS counter via /api/v1/rs/tickettype ===
 @trace_step("seat_counts_via_tickettype")
@@ -2505,37 +2397,96 @@ class RunResult:
 
 def log(*a): print(*a)
 
+# === DEADLINE: 회차별 마감시각 (contextvar로 하위 헬퍼까지 전파) ================
+# - process_one 시작 시 now + SHOW_DEADLINE_SEC 를 박아두면
+#   fetch_json / goto 타임아웃이 남은 시간으로 자동 클램프됨
+# - 단계별 예산: SHOW_STAGE_BUDGET="open=0.25,params=0.15,warmup=0.25,summary=0.2,step=0.6" (전체 대비 비율)
+# - 마감 초과로 취소된 회차는 SHOW_REQUEUE_MAX 회까지 큐 뒤로 재투입
+import contextvars
+SHOW_DEADLINE_SEC = float(os.getenv("SHOW_DEADLINE_SEC", "150"))
+SHOW_REQUEUE_MAX  = int(os.getenv("SHOW_REQUEUE_MAX", "1"))
+STAGE_BUDGET = {"open": 0.25, "params": 0.15, "warmup": 0.25, "summary": 0.2, "step": 0.6}
+for _kv in os.getenv("SHOW_STAGE_BUDGET", "").split(","):
+    if "=" in _kv:
+        _k, _v = _kv.split("=", 1)
+        try: STAGE_BUDGET[_k.strip()] = float(_v)
+        except: pass
+REASON_DEADLINE = "deadline 초과"
+
+_SHOW_DEADLINE: contextvars.ContextVar = contextvars.ContextVar("_SHOW_DEADLINE", default=None)
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    pass
+
+def set_show_deadline(sec: float = SHOW_DEADLINE_SEC):
+    return _SHOW_DEADLINE.set(time.monotonic() + sec)
+
+def deadline_left(default: float | None = None) -> float | None:
+    """남은 시간(초). 마감이 없으면 default 그대로, 있으면 min(default, 남은시간)."""
+    dl = _SHOW_DEADLINE.get()
+    if dl is None:
+        return default
+    left = max(0.0, dl - time.monotonic())
+    return left if default is None else min(default, left)
+
+def budget_ms(default_ms: float) -> int:
+    left = deadline_left(default_ms / 1000.0)
+    return max(1, int((left if left is not None else default_ms / 1000.0) * 1000))
+
+async def stage(name: str, aw):
+    """단계 예산(전체 마감 비율)과 남은 시간 중 작은 값으로 wait_for. 초과 시 DeadlineExceeded."""
+    frac = STAGE_BUDGET.get(name)
+    t = deadline_left(SHOW_DEADLINE_SEC * frac if frac else None)
+    if t is not None and t <= 0:
+        try: aw.close()
+        except Exception: pass
+        raise DeadlineExceeded(f"{name}: 남은 시간 없음")
+    t0, outcome = time.monotonic(), "ok"
+    try:
+        return await asyncio.wait_for(aw, t)
+    except asyncio.TimeoutError as e:
+        outcome = "deadline"
+        if isinstance(e, DeadlineExceeded):
+            raise
+        raise DeadlineExceeded(f"{name}: {t:.1f}s 예산 초과")
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        metrics.stage_ms(name, (time.monotonic() - t0) * 1000.0, outcome=outcome)
+
 # ----- Structured tracer -----
 class Tracer:
     def __init__(self):
+        self.f = None              # 첫 이벤트 때 연다 → import/재시도만으로 빈 trace 파일이 쌓이지 않게
+        self.sid = os.urandom(4).hex()
+    def _open(self):
+        TRACE_DIR.mkdir(parents=True, exist_ok=True)
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         self.f = (TRACE_DIR / f"trace_{ts}.jsonl").open("a", encoding="utf-8")
-        self.sid = str(uuid.uuid4())[:8]
     def _emit(self, level, event, **fields):
         if not TRACE_ENABLE: 
             return
         rec = {"ts": time.time(), "lvl": level, "ev": event, **fields}
         try:
+            if self.f is None: self._open()
             self.f.write(json.dumps(rec, ensure_ascii=False) + "\n"); self.f.flush()
         except Exception:
             pass
     def ev(self, event, **kw):   self._emit("INFO", event, **kw)
     def warn(self, event, **kw): self._emit("WARN", event, **kw)
     def err(self, event, **kw):  self._emit("ERR",  event, **kw)
+    # HTML/PNG 는 capture.CAP 이 받아와 백그라운드로 기록 (실행당 용량 상한)
     async def dump_html(self, page, label):
         try:
-            p = TRACE_DIR / f"{label}.html"
-            await page.wait_for_timeout(50)
-            html = await page.content()
-            p.write_text(html, encoding="utf-8")
-            self.ev("dump.html", path=str(p))
+            for p in await CAP.dump(page, label, png=False):
+                self.ev("dump.html", path=str(p))
         except Exception as e:
             self.warn("dump.html.fail", reason=str(e))
     async def dump_png(self, page, label):
         try:
-            p = TRACE_DIR / f"{label}.png"
-            await page.screenshot(path=str(p), full_page=False)
-            self.ev("dump.png", path=str(p))
+            for p in await CAP.dump(page, label, html=False):
+                self.ev("dump.png", path=str(p))
         except Exception as e:
             self.warn("dump.png.fail", reason=str(e))
 
@@ -2953,8 +2904,9 @@ async def post_api(scope_or_page, path: str, form: dict | str,
 
     # 항상 메인 호스트로 Origin/Referer 기본
     base_headers = {"Origin": MAIN_HOST, "Referer": DEFAULT_REF}
-    if needs_csrf and CSRFTOKEN_CACHE.get("val"):
-        base_headers.setdefault("X-CSRF-TOKEN", CSRFTOKEN_CACHE["val"])
+    hdr_tok = getattr(scope_or_page, "csrf", None) or CSRFTOKEN_CACHE.get("val")   # ApiSession 이면 세션 토큰
+    if needs_csrf and hdr_tok:
+        base_headers.setdefault("X-CSRF-TOKEN", hdr_tok)
 
     # x-www-form-urlencoded 강제 (maketicket 기본)
     from urllib.parse import urlencode
@@ -2980,8 +2932,8 @@ async def post_api(scope_or_page, path: str, form: dict | str,
 
 
 
-# === REPLACE ENTIRE FUNCTION: fetch_json (with NETLOG + HAR) ===
-@trace_step("fetch_json")
+# === REPLACE ENTIRE FUNCTION: fetch_json (recorder 파이프라인) ===
+# 요청 단위 기록은 REC(ndjson 싱크 등)가 맡으므로 trace_step 은 걸지 않음
 async def fetch_json(scope_or_page, *args, **kwargs):
     import json
 
@@ -3001,7 +2953,7 @@ async def fetch_json(scope_or_page, *args, **kwargs):
     url     = kwargs["url"]
     data    = kwargs.get("data")
     headers = dict(kwargs.get("headers") or {})
-    timeout = float(kwargs.get("timeout") or 10000)
+    timeout = float(budget_ms(float(kwargs.get("timeout") or 10000)))  # 회차 마감에 맞춰 클램프
 
     # 기본 헤더
     base_hdrs = {"Accept": "application/json, text/plain, */*", "X-Requested-With": "XMLHttpRequest"}
@@ -3015,31 +2967,37 @@ async def fetch_json(scope_or_page, *args, **kwargs):
     body_text = ""
     if data is not None:
         fetch_kwargs["data"] = data
-        if isinstance(data, (bytes, bytearray)):
+        if not REC.wants_body:
+            pass    # 로그용 본문 문자열은 기록할 때만 만든다
+        elif isinstance(data, (bytes, bytearray)):
             try: body_text = data.decode("utf-8", "ignore")
             except: body_text = ""
         else:
             body_text = str(data)
 
-    # --- NETLOG + HAR: 요청 기록 ---
-    seq = _netlog_req(url, base_hdrs, {} if isinstance(data, str) else {}, body_text)
-    if HAR_ENABLE:
-        HAR.on_req(seq, url, method, base_hdrs, body_text)
+    # --- 기록: 한 번 캡처 (cid = run/sd/seq) → 응답 후 싱크로 ---
+    tm = ReqTiming()
+    rec = REC.begin(url, method, base_hdrs, body_text, tm)
 
-    # 호출
-    resp = await req.fetch(url, **fetch_kwargs)
-    txt = await resp.text()
-
-    # --- NETLOG + HAR: 응답 기록 ---
+    # 호출 (호스트 토큰버킷 대기 후)
     try:
-        _netlog_resp(seq, url, resp.status, txt)
-    except Exception:
-        pass
-    if HAR_ENABLE:
-        try:
-            HAR.on_resp(seq, resp.status, dict(resp.headers), txt)
-        except Exception:
-            pass
+        await RL.acquire(url, method=method)
+        tm.rl()
+        async with AIMD_API.slot() as o:
+            with metrics.request(url, method) as m:
+                tm.sent()
+                resp = await req.fetch(url, **fetch_kwargs)
+                tm.headers()
+                txt = await resp.text()
+                tm.done()
+                o.ok = resp.status < 500 and resp.status != 429
+                m.status = resp.status
+    except BaseException as e:
+        tm.done()
+        REC.end(rec, 0, None, "", error=f"{type(e).__name__}: {e}")
+        raise
+    REC.end(rec, resp.status, dict(resp.headers), txt)
+    WARM.observe(scope_or_page, resp.status, txt)   # 401/403·로그인 리다이렉트 → 워밍업 기록 무효화
 
     if resp.status < 200 or resp.status >= 300:
         raise RuntimeError(f"{resp.status} {url} — {txt[:200]}")
@@ -3049,7 +3007,7 @@ async def fetch_json(scope_or_page, *args, **kwargs):
     s = (txt or "").lstrip()
     if "application/json" in ctype or (s.startswith("{") or s.startswith("[")):
         try:
-            return json.loads(txt)
+            return await offload.loads_async(txt)   # 큰 응답은 루프 밖에서 디코드
         except Exception:
             return txt
     return txt
@@ -3191,6 +3149,7 @@ async def _load_all_schedules(pop):
         "saleTycd": saleTycd, "saleCondNo": saleCond,
         "perfDate": perfDate0, "csrfToken": csrfToken
     }, extra_headers=H_RS)
+    WARM.mark(pop, "prod", prodSeq)   # 응답을 쓰는 호출이라 생략은 안 하지만 워밍업으로는 인정
     # normalize potential string payload to dict
     import json as _json
     if isinstance(js, str):
@@ -3244,13 +3203,16 @@ async def _swap_session_to_sdseq(pop, prodSeq, sdSeq,
         base.update(form)
         return post_api(pop, f"/rs/{path}", base, extra_headers=H_RS)
 
-    await P("prodChk",      {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo, "perfDate": perfDate,
-                             "user_member_info1": "", "user_member_info2": "", "enCryptTelNo": ""})
-    await P("chkProdSdSeq", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd})
-    try:
-        await P("informLimit", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo})
-    except Exception as e:
-        dlog(f"[SWAP] informLimit warn: {e}")
+    # prodChk(세션 회차 전환) → chkProdSdSeq ∥ informLimit  (warmdag.RS_DEPS), 이미 이 회차면 생략
+    def W(step, form):
+        return lambda: WARM.once(pop, step, prodSeq, sdSeq, lambda: P(step, form))
+    await run_dag([
+        node("prodChk",      W("prodChk", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo, "perfDate": perfDate,
+                                                   "user_member_info1": "", "user_member_info2": "", "enCryptTelNo": ""})),
+        node("chkProdSdSeq", W("chkProdSdSeq", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd})),
+        node("informLimit",  W("informLimit", {"prodSeq": prodSeq, "sdSeq": sdSeq, "chnlCd": chnlCd, "saleTycd": saleTycd, "saleCondNo": saleCondNo}),
+             required=False),
+    ], name="swap", log=lambda m: dlog(m.replace("[swap]", "[SWAP]")))
 # ============================================================================ #
 
 
@@ -3285,6 +3247,12 @@ async def _fetch_seat_status_list(pop, prodSeq, sdSeq, chnlCd="WEB", csrfToken="
         return []
 
 # === REPLACE ENTIRE FUNCTION: _count_seats ===
+_SEAT_COUNT = fields("seat.countItem",
+    use=("useYn", "use_yn"),
+    st=("seatStatusCd", "seat_status_cd", "statusCd"),
+    cnt=("seatCnt", "seat_cnt"),
+)
+
 def _count_seats(lst, available_codes={"SS01000"}):
     total, remain, by = 0, 0, {}
     for it in (lst or []):
@@ -3292,12 +3260,12 @@ def _count_seats(lst, available_codes={"SS01000"}):
         if not isinstance(it, dict):
             continue
         # 집계 응답(상태별 카운트)은 useYn이 아예 없을 수 있음 → 없으면 통과
-        use = it.get("useYn") or it.get("use_yn")
+        use, st, cnt = _SEAT_COUNT(it)
         if use is not None and str(use).upper() not in ("Y","YES","TRUE","1"):
             continue
-        st  = (it.get("seatStatusCd") or it.get("seat_status_cd") or it.get("statusCd") or "")
+        st = st or ""
         try:
-            cnt = int(it.get("seatCnt") or it.get("seat_cnt") or 0)
+            cnt = int(cnt or 0)
         except:
             cnt = 0
         total += cnt
@@ -4333,9 +4301,10 @@ async def payment_hint_chain(scope, prodSeq, sdSeq, perfDate="", csrfToken=None,
         base.update(form)
         return post_api(scope, f"/rs/{path}", base, extra_headers=H_RS)
 
-    try: await P("prodChk", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                             "chnlCd": chnlCd, "saleTycd": saleTycd,
-                             "saleCondNo": saleCondNo, "perfDate": perfDate})
+    try: await WARM.once(scope, "prodChk", prodSeq, sdSeq,
+                         lambda: P("prodChk", {"prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
+                                               "chnlCd": chnlCd, "saleTycd": saleTycd,
+                                               "saleCondNo": saleCondNo, "perfDate": perfDate}))
     except Exception as e: dlog(f"[HINT] prodChk: {e}")
 
     # 아래는 서비스 상황에 따라 선택 (실패해도 전체 플로우는 계속)
@@ -4475,16 +4444,21 @@ def _sum_seatlist(statusList: dict):
     remain = sum(1 for s in seats if ok(s))
     return total, remain
 
+_NRS_BLOCK = fields("blockSummary2.block", total=("total_cnt", "totalCnt", "plan_cnt"),
+                    remain=("remain_cnt", "remainCnt", "rest_cnt"))
+_NRS_SUMMARY = fields("blockSummary2.summary", total=("total", "totalCnt"), remain=("remain", "remainCnt"))
+
 def _sum_nrs(blockSummary2: dict):
     d = blockSummary2 or {}
     lists = (d.get("blockList") or d.get("blocks") or d.get("areaList") or [])
     total = remain = 0
     for b in lists:
-        total  += _to_int(b.get("total_cnt")  or b.get("totalCnt")  or b.get("plan_cnt")  or 0)
-        remain += _to_int(b.get("remain_cnt") or b.get("remainCnt") or b.get("rest_cnt")  or 0)
-    sumry = d.get("summary") or {}
-    total  = max(total,  _to_int(sumry.get("total")  or sumry.get("totalCnt")  or 0))
-    remain = max(remain, _to_int(sumry.get("remain") or sumry.get("remainCnt") or 0))
+        t, r = _NRS_BLOCK(b)
+        total  += _to_int(t or 0)
+        remain += _to_int(r or 0)
+    t, r = _NRS_SUMMARY(d.get("summary") or {})
+    total  = max(total,  _to_int(t or 0))
+    remain = max(remain, _to_int(r or 0))
     return total, remain
 
 def _detect_plan(prodSummary, baseMap, blockSummary2) -> str:
@@ -4566,9 +4540,10 @@ async def force_snapshot_and_hold(p, sdCode: str, *, quiet=False):
         # 없으면 None으로 둬도 동작은 합니다.
         csrfToken, H_RS = await ensure_csrf_and_headers(p, prodSeq=prodSeq if 'prodSeq' in locals() else None,
                                                         sdSeq=sdSeq   if 'sdSeq'   in locals() else None)
-        await post_api(p, "/rs/prod",
-                    form={"langCd": "ko", "csrfToken": csrfToken or ""},
-                    extra_headers=H_RS)
+        await WARM.once(p, "prod", prodSeq, "",
+                        lambda: post_api(p, "/rs/prod",
+                                         form={"langCd": "ko", "csrfToken": csrfToken or ""},
+                                         extra_headers=H_RS))
     except Exception:
         if not quiet:
             slog(f"[{sdCode}] rs/prod 워밍업 실패 (무시)")
@@ -4606,6 +4581,8 @@ async def force_snapshot_and_hold(p, sdCode: str, *, quiet=False):
 
     # 3) plan 판별
     plan = _detect_plan(prodSummary, baseMap, blockSummary2)
+    if plan in ("SEAT", "ALL"):
+        _record_seatbits(sdCode, prodSeq, sdSeq, baseMap, statusList)
 
     # 3-1) 총/잔여 계산 (SEAT/NRS/ALL 모두 대응)
     by = {}
@@ -5000,8 +4977,7 @@ async def snapshot_state(scope, tag: str, params: Dict[str,str]):
 
         TR.ev("snapshot", tag=tag, url=page.url, scope_url=getattr(scope, "url", None), 
               frames=frames, vis=vis, sels=sel_state, counters=counters, params=params)
-        await TR.dump_html(page, f"snapshot_{tag}")
-        await TR.dump_png(page, f"snapshot_{tag}")
+        await CAP.note(scope, f"snapshot_{tag}")   # 지문만 링에 — HTML/PNG 는 실패/느린 회차 끝에서
     except Exception as e:
         TR.warn("snapshot.fail", reason=str(e))
 
@@ -5065,27 +5041,35 @@ async def assert_visibility(page: Page):
         dlog(f"[VIS] visibility={vis.get('v')} focus={vis.get('f')}")
     except: pass
 async def process_one(ctx, sd: str) -> RunResult:
+    set_show_deadline()
+    metrics.set_sd(sd)     # 이 회차 태스크의 API/단계 메트릭 라벨
+    CAP.begin(sd)
     page = await ctx.new_page()
+    setattr(page, "_sd", sd)
     await arm_payment_hold(page)
+    title = ""
+    work = None
     try:
         # 작품 페이지 → 예매창
         res_url = BASE_RESMAIN.format(sd=sd)
-        await page.goto(res_url, wait_until="domcontentloaded", timeout=OPEN_TIMEOUT)
+        await page.goto(res_url, wait_until="domcontentloaded", timeout=budget_ms(OPEN_TIMEOUT))
         title = (await find_title(page)) or f"sdCode {sd}"
         log(f"🎬 [{sd}] {title}")
+        await CAP.note(page, "resmain", sd)
         # ── NEW: API 스냅샷 선행 (매진이어도 총/잔여 산출) ─────────────────────
         try:
-            snap = await force_snapshot_and_hold(page, sd)
+            snap = await stage("summary", force_snapshot_and_hold(page, sd))
+            note_snapshot(snap, sd)
             # 참고: snap["moved"] 가 True 여도, plan=ALL(존좌석)이면 결제창이 아닐 수 있음.
             # 결제창은 location.pathname 에 /booking 포함될 때만 진입으로 간주.
         except Exception as e:
             wlog(f"[{sd}] snapshot 실패: {e}")
         # ─────────────────────────────────────────────────────────────────────────
 
-        work = await open_booking_from_resmain(page)
+        work = await stage("open", open_booking_from_resmain(page))
         if work is None or work.is_closed():
             return RunResult(sd, title, False, "-", "예매창 열기 실패")
-        await work.wait_for_load_state("domcontentloaded", timeout=STEP_TIMEOUT)
+        await work.wait_for_load_state("domcontentloaded", timeout=budget_ms(STEP_TIMEOUT))
         # ▶ ADD: FCFS도 강제로 booking iFrame 확보
         scope0 = await ensure_booking_iframe(work)  # Page 또는 Frame가 될 수 있음
         scope0 = getattr(scope0, "page", None) or scope0
@@ -5098,13 +5082,14 @@ async def process_one(ctx, sd: str) -> RunResult:
             pass
         await attach_debuggers(work)
         await assert_visibility(work)
+        await CAP.note(work, "booking", sd)
 
         cur = work.url or ""
         if "mypage/tickets/list" in cur or "biff.kr/kor/addon" in cur:
             return RunResult(sd, title, False, cur, "안내/마이페이지 리다이렉트(구매불가)")
 
         # 파라미터 모으기
-        params = await wait_params_from_network(work, timeout_ms=5000)
+        params = await stage("params", wait_params_from_network(work, timeout_ms=budget_ms(5000)))
         params.setdefault("chnlCd","WEB")
         params.setdefault("sdCode", sd)
 
@@ -5150,12 +5135,12 @@ async def process_one(ctx, sd: str) -> RunResult:
             raise RuntimeError(f"missing params: {missing} (sdCode={sd})")
 
         # RS 예열 (csrfToken은 옵션, 내부에서 보강됨)
-        await _prepare_session_like_har(
+        await stage("warmup", _prepare_session_like_har(
             scope_onestop,
             prodSeq=params["prodSeq"],
             sdSeq=params["sdSeq"],
             perfDate=params["perfDate"]
-        )
+        ))
         # ⭐ filmonestop 쿠키/오리진 정착 (RS 401/500 방지)
         await ensure_onestop_cookies(scope0 or work, params.get("prodSeq"), params.get("sdSeq"))
         # 🔁 회차 세션 스왑 (HAR 시퀀스 준수)
@@ -5206,7 +5191,8 @@ async def process_one(ctx, sd: str) -> RunResult:
             else:
                 log(f"🟡 [{sd}] 선착순/기타 단계 감지 → 수량 1 셋팅 후 Next")
 
-        ok = await step_to_payment(work, sd, params, False)
+        await CAP.note(scope or work, "pre-step", sd)
+        ok = await stage("step", step_to_payment(work, sd, params, False))
 
         final_url = work.url if not work.is_closed() else "-"
         if ok:
@@ -5218,11 +5204,17 @@ async def process_one(ctx, sd: str) -> RunResult:
                 global PAYMENT_DETECTED; PAYMENT_DETECTED = True
             except: 
                 pass
-            await hold_at_payment(scope.page if hasattr(scope, "page") else scope)
+            PAYMENT_SDS.add(sd)
+            CAP.ok(sd)
+            # 창 유지(hold_at_payment)는 회차 마감 밖 — runner 가 결과를 받은 뒤 수행
+            HOLD_PAGES[sd] = scope.page if hasattr(scope, "page") else scope
             return RunResult(sd, title, True, final_url)
         else:
             log(f"❌ [{sd}] 결제창 진입 실패 (url={final_url})")
             return RunResult(sd, title, False, final_url, "결제단계 진입 실패")
+    except DeadlineExceeded as e:
+        wlog(f"⏱ [{sd}] {REASON_DEADLINE}: {e}")
+        return RunResult(sd, title, False, page.url if not page.is_closed() else "-", f"{REASON_DEADLINE}: {e}")
     except Exception as e:
         return RunResult(sd, "", False, page.url if not page.is_closed() else "-", f"예외: {e}")
     finally:
@@ -5230,12 +5222,16 @@ async def process_one(ctx, sd: str) -> RunResult:
             hold = bool(getattr(page, "_hold_open", False))
         except:
             hold = False
+        # 실패/느린 회차만 HTML/PNG + 지문 링 저장 (창 닫기 전)
+        alive = work if (work is not None and not work.is_closed()) else page
+        try: await CAP.end(sd, alive)
+        except Exception: pass
         if (not hold) and (not page.is_closed()):
             await page.close()
 async def run_all_concurrent(sd_codes: List[str]) -> List[RunResult]:
     async with async_playwright() as pw:
         # ✅ 크롬으로 실행 (크롬 미설치면: `playwright install chrome`)
-        browser = await pw.chromium.launch(
+        browser = await pw.chromium.launch(**standin.launch_kwargs(   # STANDIN 이면 번들 Chromium + headless
             channel="chrome",  # ← 크로미움 말고 '설치된 크롬' 사용
             headless=False,
             args=[
@@ -5243,27 +5239,51 @@ async def run_all_concurrent(sd_codes: List[str]) -> List[RunResult]:
                 "--start-maximized",
                 "--disable-blink-features=AutomationControlled",
             ],
-        )
+        ))
         ctx = await browser.new_context(
             locale="ko-KR",
             viewport=None,                    # 창 크기 그대로(최대화) 사용
-            record_har_path="rs_trace.har",   # HAR 저장 파일명
-            record_har_omit_content=False,    # 요청/응답 본문까지 남김
+            **pw_har_kwargs("rs_trace.har"),  # REC_SINKS에 pwhar 있을 때만 (요청/응답 본문 포함)
         )
+        await standin.attach(ctx)             # STANDIN 있을 때만: maketicket 요청 → 로컬 스탠드인
         await install_cors_demo(ctx)
         try:
             if not await ensure_login(ctx):
                 await ctx.close(); await browser.close(); return []
 
-            sem = asyncio.Semaphore(MAX_CONCURRENCY)
+            # 슬롯은 우선순위 스케줄러가 배정 (스냅샷 잔여/선호좌석/plan/SD_PRIORITY)
+            sched = SdScheduler(sd_codes, MAX_CONCURRENCY, name="RUN")
+            print(sched.describe())
             results: List[RunResult] = []
+            stream = pathlib.Path(f"./results-{time.strftime('%Y%m%d-%H%M%S')}.ndjson")
 
-            async def runner(code: str):
-                async with sem:
-                    r = await process_one(ctx, code)
-                    results.append(r)
-
-            await asyncio.gather(*(runner(sd) for sd in sd_codes))
+            async def runner(code: str) -> RunResult:
+                try:
+                    # 내부 stage()가 못 잡은 await까지 하드 컷 (슬롯 반납 보장) — 결제창 진입 결과까지만
+                    r = await asyncio.wait_for(PROF.run(code, process_one(ctx, code)), SHOW_DEADLINE_SEC + 5)
+                except asyncio.TimeoutError:
+                    return RunResult(code, "", False, "-", f"{REASON_DEADLINE}: hard cut")
+                except Exception as e:
+                    return RunResult(code, "", False, "-", f"예외: {e}")
+                hold = HOLD_PAGES.pop(code, None)
+                if r.ok and hold is not None:
+                    await hold_at_payment(hold)  # PAY_STAY: 마감과 무관하게 사용자가 닫을 때까지
+                return r
+
+            # 완료 순서대로 즉시 로그 + ndjson append (요약은 이 스트림으로 구성)
+            # 마감 초과 회차는 SHOW_REQUEUE_MAX 회까지 같은 lane 맨 뒤로 재투입
+            tries = {sd: 0 for sd in sd_codes}
+            def _on_done(code: str, r: RunResult) -> bool:
+                if (not r.ok) and r.reason.startswith(REASON_DEADLINE) and tries[code] < SHOW_REQUEUE_MAX \
+                        and code not in PAYMENT_SDS:     # 결제 단계까지 간 회차는 다시 예매하지 않음
+                    tries[code] += 1
+                    wlog(f"🔁 [{code}] 재투입 ({tries[code]}/{SHOW_REQUEUE_MAX}) — {r.reason}")
+                    return True
+                results.append(r)
+                _log_result_line(r)
+                _stream_append(stream, asdict(r))
+                return False
+            await sched.run(runner, on_result=_on_done, limiter=SHOWS)
             KEEP_OPEN_ON_SUCCESS = (os.getenv("KEEP_OPEN_ON_SUCCESS", "1") == "1")
             keep = (KEEP_OPEN_ON_SUCCESS and any(r.ok for r in results)) \
                 or (os.getenv("PAY_STAY","0")=="1" and KEEP_BROWSER_ON_HOLD) \
@@ -5291,6 +5311,11 @@ async def run_all_concurrent(sd_codes: List[str]) -> List[RunResult]:
                 pass
 
 
+def _log_result_line(r: RunResult):
+    mark = "✅" if r.ok else "❌"
+    why = f" ({r.reason})" if (r.reason and not r.ok) else ""
+    print(f"{mark} [{r.sd}] {r.title or '(제목미상)'}{why}  →  {r.url or '-'}", flush=True)
+
 def print_summary(results: List[RunResult]):
     ok = [r for r in results if r.ok]
     ng = [r for r in results if not r.ok]
@@ -5316,6 +5341,23 @@ def print_summary(results: List[RunResult]):
         if r.plan: meta.append(f"모드={r.plan}")
         suffix = (" | " + " | ".join(meta)) if meta else ""
         print(f"  ❌ [{r.sd}] {r.title or '(제목미상)'}{why}{suffix}  →  {r.url or '-'}")
+    if RL_REPORT:
+        for line in RL.report():
+            print("  " + line)
+        print("  " + SHOWS.report())
+        print("  " + AIMD_API.report())
+        print("  " + WARM.report())
+        print("  " + offload.report())
+        print("  " + REC.report())
+        print("  " + CAP.report())
+        for line in schema_report():
+            print("  " + line)
+        for line in warmdag_report():
+            print("  " + line)
+    for line in LAG.report():
+        print("  " + line)
+    for line in PROF.report():
+        print("  " + line)
     print("─"*72 + "\n")
 
 
@@ -5327,8 +5369,12 @@ def ask_retry(failed_codes: List[str]) -> bool:
     except: return False
 
 async def main_once(codes: List[str]) -> List[RunResult]:
+    LAG.start()   # LOOPLAG_ENABLE=1 일 때만
+    metrics.serve()   # 127.0.0.1:METRICS_PORT/metrics (METRICS=1)
     results = await run_all_concurrent(codes)
+    await CAP.drain()
     print_summary(results)
+    LAG.stop()
     return results
 
 if __name__ == "__main__":
@@ -5342,65 +5388,88 @@ if __name__ == "__main__":
 async def rs_block_summary(scope, prodSeq: str, sdSeq: str, chnlCd: str, perfDate: str,
                           saleCond: str, csrfToken: str, H_RS: dict) -> tuple[int,int,dict]:
     """blockSummary2 → (tot, remain, by)
-    - perfDate가 비면 절대 부르지 말 것!
-    - 실패/0일 땐 /rs/prod(listSch) → prodSummary 순으로 보강"""
-    blk = await post_api(
-        scope, "/rs/blockSummary2",
-        {"langCd": "ko", "csrfToken": csrfToken or "",
-         "prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-         "chnlCd": chnlCd, "perfDate": perfDate or "",
-         "saleCondNo": saleCond or "1"},
-        extra_headers=H_RS
-    )
-    block = {}
-    if isinstance(blk, dict):
-        s = blk.get("summary")
-        if isinstance(s, list) and s: block = s[0]
-        elif isinstance(s, dict):     block = s
-    try:
-        avail = int(block.get("admissionAvailPersonCnt") or block.get("restSeatCnt") or 0)
-        tot   = int(block.get("admissionTotalPersonCnt") or block.get("saleSeatCnt") or block.get("rendrSeatCnt") or 0)
-    except Exception:
-        avail, tot = 0, 0
-    if tot <= 0 or tot < avail:
-        tot = max(tot, avail)
-    if tot == 0:
-        try:
-            js = await post_api(scope, "/rs/prod",
-                {"langCd":"ko","csrfToken": csrfToken or "",
-                 "prodSeq": str(prodSeq), "sdSeq":"", "chnlCd": chnlCd,
-                 "saleTycd":"SALE_NORMAL","saleCondNo": saleCond or "1","perfDate": ""},
-                extra_headers=H_RS)
-            if isinstance(js, str):
-                import json as _json
-                try: js = _json.loads(js) if js.strip()[:1] in "[{" else {}
-                except Exception: js = {}
-            sch = js.get("listSch") or [] if isinstance(js, dict) else []
-            for it in _iter_dicts(sch):
-                if str(it.get("sdSeq") or it.get("sdNo") or "") == str(sdSeq):
-                    avail = int(it.get("remainCnt") or it.get("seatRemainCnt") or avail)
-                    guess = int(it.get("seatCnt") or it.get("seatTotalCnt") or 0)
-                    tot = max(tot, guess, avail)
-                    break
-        except Exception:
-            pass
-    if tot == 0 and perfDate:
-        try:
-            ps = await post_api(scope, "/rs/prodSummary",
-                {"langCd":"ko","csrfToken": csrfToken or "",
-                 "prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
-                 "chnlCd": chnlCd, "perfDate": perfDate or "",
-                 "saleCondNo": saleCond or "1"},
-                extra_headers=H_RS)
-            if isinstance(ps, dict):
-                s = ps.get("summary") or {}
-                avail = max(avail, int(s.get("admissionAvailPersonCnt") or s.get("restSeatCnt") or 0))
-                tot   = max(tot,   int(s.get("admissionTotalPersonCnt") or s.get("saleSeatCnt") or s.get("rendrSeatCnt") or 0))
-        except Exception:
-            pass
+    - perfDate가 비면 prodSummary는 절대 부르지 말 것!
+    - blockSummary2 / /rs/prod(listSch) / prodSummary 를 동시에 띄우고(speculate.first_valid)
+      tot>0 또는 remain>0 인 첫 결과 채택, 나머지 취소"""
+    from speculate import first_valid
+
+    def _num(s, *keys):
+        for k in present(s, keys):
+            try:
+                v = int(s.get(k) or 0)
+                if v: return v
+            except Exception:
+                pass
+        return 0
+
+    async def _blk():
+        blk = await post_api(
+            scope, "/rs/blockSummary2",
+            {"langCd": "ko", "csrfToken": csrfToken or "",
+             "prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
+             "chnlCd": chnlCd, "perfDate": perfDate or "",
+             "saleCondNo": saleCond or "1"},
+            extra_headers=H_RS
+        )
+        block = {}
+        if isinstance(blk, dict):
+            s = blk.get("summary")
+            if isinstance(s, list) and s: block = s[0]
+            elif isinstance(s, dict):     block = s
+        avail = _num(block, "admissionAvailPersonCnt", "restSeatCnt")
+        tot   = _num(block, "admissionTotalPersonCnt", "saleSeatCnt", "rendrSeatCnt")
+        return max(tot, avail), avail
+
+    async def _listsch():
+        js = await post_api(scope, "/rs/prod",
+            {"langCd":"ko","csrfToken": csrfToken or "",
+             "prodSeq": str(prodSeq), "sdSeq":"", "chnlCd": chnlCd,
+             "saleTycd":"SALE_NORMAL","saleCondNo": saleCond or "1","perfDate": ""},
+            extra_headers=H_RS)
+        if isinstance(js, str):
+            import json as _json
+            try: js = _json.loads(js) if js.strip()[:1] in "[{" else {}
+            except Exception: js = {}
+        sch = js.get("listSch") or [] if isinstance(js, dict) else []
+        for it in _iter_dicts(sch):
+            if str(it.get("sdSeq") or it.get("sdNo") or "") == str(sdSeq):
+                avail = int(it.get("remainCnt") or it.get("seatRemainCnt") or 0)
+                guess = int(it.get("seatCnt") or it.get("seatTotalCnt") or 0)
+                return max(guess, avail), avail
+        return 0, 0
+
+    async def _psum():
+        ps = await post_api(scope, "/rs/prodSummary",
+            {"langCd":"ko","csrfToken": csrfToken or "",
+             "prodSeq": str(prodSeq), "sdSeq": str(sdSeq),
+             "chnlCd": chnlCd, "perfDate": perfDate or "",
+             "saleCondNo": saleCond or "1"},
+            extra_headers=H_RS)
+        s = (ps.get("summary") or {}) if isinstance(ps, dict) else {}
+        avail = _num(s, "admissionAvailPersonCnt", "restSeatCnt")
+        tot   = _num(s, "admissionTotalPersonCnt", "saleSeatCnt", "rendrSeatCnt")
+        return max(tot, avail), avail
+
+    cands = [("blockSummary2", _blk), ("listSch", _listsch)]
+    if perfDate:
+        cands.append(("prodSummary", _psum))
+    label, res = await first_valid(cands, lambda r: r[0] > 0 or r[1] > 0, name="rs_block_summary")
+    if label is None:
+        # 전부 0/실패 → 기존처럼 각 소스 최대치
+        got = [r for r in res if r]
+        tot   = max([r[0] for r in got] or [0])
+        avail = max([r[1] for r in got] or [0])
+    else:
+        tot, avail = res
     return tot, avail, {"NRS": avail}
 
 # === HAR 파서: 총좌석/잔여 강제 추출 ==========================================
+HAR_SUMMARY = fields("har.blockSummary2.summary",
+    sd=("sdSeq", "sdseq"),
+    total=("admissionTotalPersonCnt", "saleSeatCnt", "rendrSeatCnt"),
+    remain=("admissionAvailPersonCnt", "restSeatCnt"),
+)
+
 def parse_har_seats(har_path="rs_trace.har", out_json="har_seats.json"):
     import json, re, pathlib
     p = pathlib.Path(har_path)
@@ -5428,9 +5497,8 @@ def parse_har_seats(har_path="rs_trace.har", out_json="har_seats.json"):
             summ = js.get("summary")
             if isinstance(summ, list) and summ: summ = summ[0]
             if isinstance(summ, dict):
-                sd = str(summ.get("sdSeq") or summ.get("sdseq") or "")
-                tot = int(summ.get("admissionTotalPersonCnt") or summ.get("saleSeatCnt") or summ.get("rendrSeatCnt") or 0)
-                rem = int(summ.get("admissionAvailPersonCnt") or summ.get("restSeatCnt") or 0)
+                sd, tot, rem = HAR_SUMMARY(summ)
+                sd, tot, rem = str(sd or ""), int(tot or 0), int(rem or 0)
                 if sd:
                     o = out.setdefault(sd, {"total":0,"remain":0})
                     o["total"] = max(o["total"], tot)
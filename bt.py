@@ -31,16 +31,28 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page, TimeoutError as PWTimeout
+from ratelimit import RL, RL_REPORT
+from warmstate import WARM
+from schemadec import present, report as schema_report
+import offload
+from looplag import LAG
+import metrics
+from sdsched import SdScheduler, note_snapshot
+from aimd import API as AIMD_API, shows_limiter
+import standin
+from showprof import PROF
+import apisnap
 
 # === RUNTIME CONFIG (하드코딩) ============================================
 # * 여기만 바꿔서 쓰면 됨 *
 from types import SimpleNamespace
 
 RUNTIME = SimpleNamespace(
-    SDCODES=["001", "911", "324"],  # ← 스케쥴넘버들
+    SDCODES=[s.strip() for s in os.getenv("SD_CODES", "").split(",") if s.strip()]
+            or ["001", "911", "324"],  # ← 스케쥴넘버들 (SD_CODES=001,002 로 덮어쓰기)
     HEADLESS=False,                 # 헤드리스 모드
-    CONCURRENCY=3,                  # 동시 처리 수
-    INFO_ONLY=True,                 # 정보만 수집 (예매/결제 미진행)
+    CONCURRENCY=3,                  # 동시 처리 수 (AIMD 시작값, 상한 AIMD_SHOWS_MAX)
+    INFO_ONLY=os.getenv("BT_INFO_ONLY", "1") == "1",   # 정보만 수집 (예매/결제 미진행)
     DEBUG=True,                     # 디버그 로그 ON/OFF
     STAY_SEC=600,                   # 결제창 HOLD 유지 (초)
 )
@@ -167,6 +179,7 @@ def _regex_find_csrf(html: str) -> str:
 async def _harvest_csrf_via_http(context: BrowserContext, book_url: str, referer: str) -> str:
     """페이지를 HTTP로 직접 받아서 hidden/meta/스크립트에서 csrfToken을 긁는다."""
     try:
+        await RL.acquire(book_url, method="GET")
         resp = await context.request.get(book_url, headers={
             "Accept": "text/html, */*",
             "Referer": referer,
@@ -221,6 +234,7 @@ async def _post_into_booking(ctx, page: Page) -> bool:
         "Origin": SITE,
     }
     try:
+        await RL.acquire(f"{ALT_SITE}/ko/booking", method="POST")
         resp = await page.context.request.post(f"{ALT_SITE}/ko/booking", form=form, headers=headers)
         html = await resp.text()
         token = _regex_find_csrf(html)
@@ -362,12 +376,28 @@ async def xhr(page: Page, url: str, method: str = "GET",
       return { status: r.status, body: r.body, mode: r.mode };
     }
     """
-    ret = await page.evaluate(js, {
-        "url": url, "method": method, "params": params,
-        "data": data, "headers": headers or {}
-    })
+    # in-page fetch도 같은 호스트 버킷을 탄다 (JSON→form 폴백은 한 요청으로 취급)
+    await RL.acquire(url, method=method)
+    async with AIMD_API.slot() as o:
+        with metrics.request(url, method) as m:
+            if isinstance(page, apisnap.ApiSession):   # API 전용: 렌더러 없이 같은 JSON→form 폴백
+                ret = await page.xhr(url, method, params, data, headers, timeout)
+            else:
+                ret = await page.evaluate(js, {
+                    "url": url, "method": method, "params": params,
+                    "data": data, "headers": headers or {}
+                })
+            st = int(ret.get("status") or 0)
+            o.ok = 0 < st < 500 and st != 429
+            m.status = st
+    WARM.observe(page, st, ret.get("body"))
     dbg(f"XHR {method} {url} -> {ret.get('status')} ({ret.get('mode')})")
     return ret["status"], ret["body"]
+
+
+def _xhr_ok(r) -> bool:
+    """xhr() 결과 (status, body)가 워밍업 성공으로 볼 만한지 (WARM.once ok=)."""
+    return bool(r) and 200 <= int(r[0] or 0) < 300
 @dataclass
 class Ctx:
     sd: str
@@ -413,10 +443,13 @@ async def _map_sd_via_filmapi(ctx, page, FILMAPI) -> bool:
     """filmapi 전체 목록을 스캔해서 sdCode 일치 항목으로 prodSeq/sdSeq를 얻는다."""
     st, body = await xhr(page, f"{FILMAPI}/api/v1/prodList", method="GET", params=None,
                          headers={"Referer": ctx.referer or SITE})
-    if st != 200 or not isinstance(body, dict):
+    if st != 200 or not isinstance(body, (dict, list)):
         return False
-    items = body.get("data") or body.get("list") or []
+    # biff_patched.get_meta_from_filmapi 와 같은 키 수용 (API 전용 경로는 이 매핑이 유일한 출처)
+    items = body if isinstance(body, list) else (body.get("data") or body.get("list") or body.get("prodList") or [])
     for it in (items if isinstance(items, list) else []):
+        if not isinstance(it, dict):
+            continue
         sd = str(it.get("sdCode") or it.get("sd_code") or it.get("sdCd") or "")
         if sd == ctx.sd:
             ctx.prodSeq = str(it.get("prodSeq") or it.get("prod_seq") or "")
@@ -460,14 +493,19 @@ async def fetch_json(context: BrowserContext, url: str, method: str = "GET",
 
     # Try JSON payload first (POST), then form-encoded as fallback
     try:
-        if method.upper() == "GET":
-            resp = await req.get(url_final, headers=h, timeout=timeout*1000)
-        else:
-            resp = await req.post(url_final, headers={**h, "Content-Type":"application/json"}, data=json.dumps(data or {}), timeout=timeout*1000)
+        await RL.acquire(url_final, method=method)
+        async with AIMD_API.slot() as o:
+            with metrics.request(url_final, method) as m:
+                if method.upper() == "GET":
+                    resp = await req.get(url_final, headers=h, timeout=timeout*1000)
+                else:
+                    resp = await req.post(url_final, headers={**h, "Content-Type":"application/json"}, data=json.dumps(data or {}), timeout=timeout*1000)
+                o.ok = resp.status < 500 and resp.status != 429
+                m.status = resp.status
         st = resp.status
         txt = await resp.text()
         try:
-            return st, json.loads(txt) if txt else None
+            return st, (await offload.loads_async(txt)) if txt else None
         except Exception:
             return st, None
     except Exception:
@@ -477,11 +515,16 @@ async def fetch_json(context: BrowserContext, url: str, method: str = "GET",
         try:
             from urllib.parse import urlencode
             payload = urlencode(data or {})
-            resp = await req.post(url_final, headers={**h, "Content-Type":"application/x-www-form-urlencoded"}, data=payload, timeout=timeout*1000)
+            await RL.acquire(url_final, method=method)
+            async with AIMD_API.slot() as o:
+                with metrics.request(url_final, method) as m:
+                    resp = await req.post(url_final, headers={**h, "Content-Type":"application/x-www-form-urlencoded"}, data=payload, timeout=timeout*1000)
+                    o.ok = resp.status < 500 and resp.status != 429
+                    m.status = resp.status
             st = resp.status
             txt = await resp.text()
             try:
-                return st, json.loads(txt) if txt else None
+                return st, (await offload.loads_async(txt)) if txt else None
             except Exception:
                 return st, None
         except Exception:
@@ -650,8 +693,10 @@ async def resolve_context(ctx: Ctx, page: Page) -> Ctx:
             "chnlCd":    ctx.chnlCd or "WEB",
             "csrfToken": ctx.csrf,   # 바디에 토큰 필수
         }
-        st, obj = await xhr(page, f"{API}/api/v1/rs/prodChk", method="POST", data=data, headers=headers)
-        dbg("prodChk", {"status": st, "ok": isinstance(obj, dict)})
+        r = await WARM.once(page, "prodChk", ctx.prodSeq, ctx.sdSeq,
+                            lambda: xhr(page, f"{API}/api/v1/rs/prodChk", method="POST", data=data, headers=headers),
+                            ok=_xhr_ok)
+        dbg("prodChk", {"status": r[0], "ok": isinstance(r[1], dict)} if r else {"skip": "warm"})
 
 
     # === [NEW] 루트에서 CSRF 수확 ===
@@ -711,8 +756,10 @@ async def resolve_context(ctx: Ctx, page: Page) -> Ctx:
             "chnlCd":  ctx.chnlCd or "WEB",
             "csrfToken": ctx.csrf,
         }
-        st, obj = await xhr(page, f"{API}/api/v1/rs/prodChk", method="POST", data=data, headers=headers)
-        dbg("prodChk", {"status": st, "ok": isinstance(obj, dict)})
+        r = await WARM.once(page, "prodChk", ctx.prodSeq, ctx.sdSeq,
+                            lambda: xhr(page, f"{API}/api/v1/rs/prodChk", method="POST", data=data, headers=headers),
+                            ok=_xhr_ok)
+        dbg("prodChk", {"status": r[0], "ok": isinstance(r[1], dict)} if r else {"skip": "warm"})
 
     # === [NEW] prodChk 선행 (토큰/세션 초기화) ===
     if ctx.prodSeq and ctx.sdSeq and ctx.csrf:
@@ -730,18 +777,23 @@ async def resolve_context(ctx: Ctx, page: Page) -> Ctx:
             "sdSeq":   str(ctx.sdSeq),
             "csrfToken": ctx.csrf,            # <-- 중요: 폼 바디에 토큰
         }
-        st, obj = await xhr(page, f"{API}/api/v1/rs/prodChk", method="POST", data=data, headers=headers)
-        dbg("prodChk", {"status": st, "ok": isinstance(obj, dict)})
+        r = await WARM.once(page, "prodChk", ctx.prodSeq, ctx.sdSeq,
+                            lambda: xhr(page, f"{API}/api/v1/rs/prodChk", method="POST", data=data, headers=headers),
+                            ok=_xhr_ok)
+        dbg("prodChk", {"status": r[0], "ok": isinstance(r[1], dict)} if r else {"skip": "warm"})
 
 
     # 7) 사전 검증 (CSRF 있을 때만)
     headers = build_api_headers(ctx)
     if ctx.prodSeq and ctx.sdSeq and ctx.csrf:
-        _st_chk, _ = await xhr(page, f"{API}/api/v1/rs/chkProdSdSeq", method="POST",
-                               data={"prodSeq": ctx.prodSeq, "sdSeq": ctx.sdSeq,
-                                     "chnlCd": ctx.chnlCd or "WEB", "csrfToken": ctx.csrf},
-                               headers=headers)
-        dbg("chkProdSdSeq(prodSeq/sdSeq)", {"prodSeq": ctx.prodSeq, "sdSeq": ctx.sdSeq}, "->", _st_chk, type(_).__name__)
+        r = await WARM.once(page, "chkProdSdSeq", ctx.prodSeq, ctx.sdSeq,
+                            lambda: xhr(page, f"{API}/api/v1/rs/chkProdSdSeq", method="POST",
+                                        data={"prodSeq": ctx.prodSeq, "sdSeq": ctx.sdSeq,
+                                              "chnlCd": ctx.chnlCd or "WEB", "csrfToken": ctx.csrf},
+                                        headers=headers),
+                            ok=_xhr_ok)
+        dbg("chkProdSdSeq(prodSeq/sdSeq)", {"prodSeq": ctx.prodSeq, "sdSeq": ctx.sdSeq}, "->",
+            *((r[0], type(r[1]).__name__) if r else ("skip(warm)",)))
 
     ctx.referer = page.url or ALT_SITE
     return ctx
@@ -792,8 +844,8 @@ async def detect_plan_type(ctx: Ctx, page: Page) -> str:
 
 
 def _pull_int(d: Dict[str, Any], *keys: str) -> int:
-    for k in keys:
-        if k in d and d.get(k) is not None:
+    for k in present(d, keys):   # d에 있는 키만
+        if d.get(k) is not None:
             try:
                 return int(d.get(k))
             except Exception:
@@ -804,27 +856,26 @@ async def summarize_seats(ctx: Ctx, page: Page) -> Tuple[Optional[int], Optional
     """Return (total, remain, plan_used).
     NRS: blockSummary2 → tickettype
     RS : GetRsSeatStatusList → blockSummary2
+    후보 체인은 speculate.first_valid로 동시에 띄우고 'total>0 or remain>0' 첫 결과 채택.
+    blockSummary2는 NRS/RS 후보가 같은 응답을 공유(요청 1회).
     """
+    from speculate import first_valid, once
     headers = build_api_headers(ctx)
     if ctx.csrf:
         headers["X-CSRF-TOKEN"] = ctx.csrf
     plan = (ctx.plan_type or "").upper()
+    form = {
+        "prod_seq": ctx.prodSeq,
+        "sd_seq": ctx.sdSeq,
+        "chnl_cd": ctx.chnlCd,
+        "csrfToken": ctx.csrf or "",
+    }
 
-    # --- NRS path (또는 미확정) ---
-    if plan in ("", "NRS", "FREE", "RS"):  # RS여도 NRS로 데이터가 나오는 케이스가 있어 먼저 시도
-        # 1) blockSummary2
-        st, summ = await xhr(
-            page,
-            f"{API}/api/v1/rs/blockSummary2",
-            method="POST",
-            data={
-                "prod_seq": ctx.prodSeq,
-                "sd_seq": ctx.sdSeq,
-                "chnl_cd": ctx.chnlCd,
-                "csrfToken": ctx.csrf or "",
-            },
-            headers=headers,
-        )
+    blk = once(lambda: xhr(page, f"{API}/api/v1/rs/blockSummary2", method="POST", data=form, headers=headers))
+
+    # --- NRS 후보 ---
+    async def _nrs_block():
+        st, summ = await blk()
         dbg("blockSummary2(NRS)", {"prod_seq": ctx.prodSeq, "sd_seq": ctx.sdSeq}, "->", st,
             (list(summ.keys())[:5] if isinstance(summ, dict) else type(summ)))
         if st == 200 and isinstance(summ, dict):
@@ -832,22 +883,11 @@ async def summarize_seats(ctx: Ctx, page: Page) -> Tuple[Optional[int], Optional
             total = _pull_int(summ, "admissionTotalPersonCnt", "saleSeatCnt", "rendrSeatCnt")
             if total <= 0 and avail > 0:
                 total = avail
-            if total > 0 or avail > 0:
-                return total or None, avail or None, "NRS"
-
-        # 2) tickettype fallback
-        st, tk = await xhr(
-            page,
-            f"{API}/api/v1/rs/tickettype",
-            method="POST",
-            data={
-                "prod_seq": ctx.prodSeq,
-                "sd_seq": ctx.sdSeq,
-                "chnl_cd": ctx.chnlCd,
-                "csrfToken": ctx.csrf or "",
-            },
-            headers=headers,
-        )
+            return total, avail, "NRS"
+        return None
+
+    async def _nrs_tickettype():
+        st, tk = await xhr(page, f"{API}/api/v1/rs/tickettype", method="POST", data=form, headers=headers)
         dbg("tickettype", {"prod_seq": ctx.prodSeq, "sd_seq": ctx.sdSeq}, "->", st,
             (list(tk.keys())[:5] if isinstance(tk, dict) else type(tk)))
         if st == 200 and isinstance(tk, (dict, list)):
@@ -870,63 +910,53 @@ async def summarize_seats(ctx: Ctx, page: Page) -> Tuple[Optional[int], Optional
                         ttl = avail + sold
                     total = max(total, ttl)
                     remain = max(remain, avail)
-            if total or remain:
-                return total or None, remain or None, "NRS"
-
-    # --- RS path ---
-    # 1) 좌석 리스트로 정확 집계
-    st, lst = await xhr(
-        page,
-        f"{API}/api/v1/seat/GetRsSeatStatusList",
-        method="POST",
-        data={
-            "prod_seq": ctx.prodSeq,
-            "sd_seq": ctx.sdSeq,
-            "chnl_cd": ctx.chnlCd,
-            "timeStemp": "",
-            "csrfToken": ctx.csrf or "",
-        },
-        headers=headers,
-    )
-    dbg("GetRsSeatStatusList", {"prod_seq": ctx.prodSeq, "sd_seq": ctx.sdSeq}, "->", st, (type(lst)))
-    total = 0
-    remain = 0
-    if st == 200 and isinstance(lst, (list, dict)):
-        items = lst if isinstance(lst, list) else lst.get("data", [])
-        if isinstance(items, list):
-            for s in items:
-                if not isinstance(s, dict):
-                    continue
-                total += 1
-                code = str(s.get("seatSts") or s.get("status") or "").upper()
-                # 사용 가능 코드
-                if code in ("N", "A", "AVAIL", "Y", "ABLE"):
-                    remain += 1
-        if total or remain:
-            return total or None, remain or None, "RS"
-
-    # 2) 존 합계 폴백 (seatStatusList 실패 시)
-    st, z = await xhr(
-        page,
-        f"{API}/api/v1/rs/blockSummary2",
-        method="POST",
-        data={
-            "prod_seq": ctx.prodSeq,
-            "sd_seq": ctx.sdSeq,
-            "chnl_cd": ctx.chnlCd,
-            "csrfToken": ctx.csrf or "",
-        },
-        headers=headers,
-    )
-    dbg("blockSummary2(RS-fallback)", {"prod_seq": ctx.prodSeq, "sd_seq": ctx.sdSeq}, "->", st,
-        (list(z.keys())[:5] if isinstance(z, dict) else type(z)))
-    if st == 200 and isinstance(z, dict):
-        total = _pull_int(z, "saleSeatCnt", "rendrSeatCnt", "admissionTotalPersonCnt")
-        remain = _pull_int(z, "admissionAvailPersonCnt", "restSeatCnt")
-        if total or remain:
-            return total or None, remain or None, "RS"
-
-    return None, None, plan or ""
+            return total, remain, "NRS"
+        return None
+
+    # --- RS 후보 ---
+    async def _rs_status():
+        # 좌석 리스트로 정확 집계
+        st, lst = await xhr(page, f"{API}/api/v1/seat/GetRsSeatStatusList", method="POST",
+                            data={**form, "timeStemp": ""}, headers=headers)
+        dbg("GetRsSeatStatusList", {"prod_seq": ctx.prodSeq, "sd_seq": ctx.sdSeq}, "->", st, (type(lst)))
+        total = 0
+        remain = 0
+        if st == 200 and isinstance(lst, (list, dict)):
+            items = lst if isinstance(lst, list) else lst.get("data", [])
+            if isinstance(items, list):
+                for s in items:
+                    if not isinstance(s, dict):
+                        continue
+                    total += 1
+                    code = str(s.get("seatSts") or s.get("status") or "").upper()
+                    # 사용 가능 코드
+                    if code in ("N", "A", "AVAIL", "Y", "ABLE"):
+                        remain += 1
+            return total, remain, "RS"
+        return None
+
+    async def _rs_block():
+        # 존 합계 폴백 (seatStatusList 실패 시)
+        st, z = await blk()
+        dbg("blockSummary2(RS-fallback)", {"prod_seq": ctx.prodSeq, "sd_seq": ctx.sdSeq}, "->", st,
+            (list(z.keys())[:5] if isinstance(z, dict) else type(z)))
+        if st == 200 and isinstance(z, dict):
+            total = _pull_int(z, "saleSeatCnt", "rendrSeatCnt", "admissionTotalPersonCnt")
+            remain = _pull_int(z, "admissionAvailPersonCnt", "restSeatCnt")
+            return total, remain, "RS"
+        return None
+
+    cands = []
+    if plan in ("", "NRS", "FREE", "RS"):  # RS여도 NRS로 데이터가 나오는 케이스가 있어 먼저 시도
+        cands += [("nrs.blockSummary2", _nrs_block), ("nrs.tickettype", _nrs_tickettype)]
+    cands += [("rs.statusList", _rs_status), ("rs.blockSummary2", _rs_block)]
+
+    label, res = await first_valid(cands, lambda r: bool(r[0] or r[1]), name="summarize_seats")
+    if label is None:
+        return None, None, plan or ""
+    dbg(f"summarize_seats ← {label}")
+    total, remain, used = res
+    return total or None, remain or None, used
 
 
 
@@ -1030,6 +1060,7 @@ async def proceed_booking(ctx: Ctx, page: Page, plan_used: str) -> Tuple[str, st
 # ---------- Emit log ----------
 
 def emit_line(ctx: Ctx):
+    note_snapshot({"plan": ctx.plan_type, "total": ctx.total, "remain": ctx.remain}, ctx.sd)  # 스케줄러 재점수
     icon = icon_for(ctx.total, ctx.remain)
     sd = pad_field(ctx.sd, 3)
     title = pad_field(ellipsis(ctx.title or "", 22), 22)
@@ -1051,7 +1082,31 @@ def emit_line(ctx: Ctx):
 
 # ---------- Worker ----------
 
-async def handle_sd(sd: str, context: BrowserContext, headless: bool, info_only: bool) -> None:
+async def handle_sd_api(sd: str, api: "apisnap.ApiSession") -> None:
+    """--info-only 의 API 전용 경로: 페이지/네비게이션 없이 같은 한 줄 요약.
+    prodSeq/sdSeq/메타는 filmapi prodList, CSRF 는 export 된 세션 토큰 (만료 시 api 가 페이지 빌려 갱신)."""
+    ctx = Ctx(sd=sd, csrf=api.csrf, referer=f"{ALT_SITE}/")
+    if not await _map_sd_via_filmapi(ctx, api, FILMAPI):
+        raise RuntimeError(f"filmapi 에 sdCode={sd} 없음")
+    ctx.csrf = api.csrf or ctx.csrf
+    if ctx.csrf:
+        data = {"prodSeq": str(ctx.prodSeq), "sdSeq": str(ctx.sdSeq), "chnlCd": ctx.chnlCd or "WEB", "csrfToken": ctx.csrf}
+        await WARM.once(api, "prodChk", ctx.prodSeq, ctx.sdSeq,
+                        lambda: xhr(api, f"{API}/api/v1/rs/prodChk", method="POST", data=data,
+                                    headers=build_api_headers(ctx)),
+                        ok=_xhr_ok)
+    plan = await detect_plan_type(ctx, api)
+    total, remain, plan_used = await summarize_seats(ctx, api)
+    ctx.total, ctx.remain = total, remain
+    ctx.plan_type = ctx.plan_type or plan_used or plan or "ALL"
+    ctx.action = ctx.status = ""
+    emit_line(ctx)
+
+
+async def handle_sd(sd: str, context: BrowserContext, headless: bool, info_only: bool,
+                    api: "apisnap.ApiSession | None" = None) -> None:
+    if info_only and api is not None:
+        return await handle_sd_api(sd, api)
     page = await context.new_page()
     ctx = Ctx(sd=sd)
 
@@ -1102,6 +1157,8 @@ async def handle_sd(sd: str, context: BrowserContext, headless: bool, info_only:
 async def main():
     # 전역에 반영
     global PAY_HOLD_SEC, DEBUG
+    LAG.start()   # LOOPLAG_ENABLE=1 일 때만
+    metrics.serve()   # 127.0.0.1:METRICS_PORT/metrics (METRICS=1)
     try:
         PAY_HOLD_SEC = int(getattr(RUNTIME, "STAY_SEC", 600))
     except Exception:
@@ -1109,14 +1166,15 @@ async def main():
     DEBUG = bool(getattr(RUNTIME, "DEBUG", False))
 
     async with async_playwright() as p:
-        browser: Browser = await p.chromium.launch(
+        browser: Browser = await p.chromium.launch(**standin.launch_kwargs(
             headless=bool(RUNTIME.HEADLESS),
             args=["--disable-web-security", "--disable-site-isolation-trials"]
-        )
+        ))
         context: BrowserContext = await browser.new_context(
             ignore_https_errors=True,
             viewport={"width": 1200, "height": 900},
         )
+        await standin.attach(context)   # STANDIN 있을 때만: maketicket 요청 → 로컬 스탠드인
 
         # 1) 로그인
         page = await context.new_page()
@@ -1142,32 +1200,45 @@ async def main():
             if DEBUG: print(f"[WARMUP] ALT_SITE skip: {e}", flush=True)
 
         try:
+            await RL.acquire(f"{FILMAPI}/api/v1/prodList", method="GET")
             r = await context.request.get(f"{FILMAPI}/api/v1/prodList",
                                           params={"_": "warmup"})
             if DEBUG: print(f"[WARMUP] FILMAPI {r.status}", flush=True)
         except Exception as e:
             if DEBUG: print(f"[WARMUP] FILMAPI skip: {e}", flush=True)
 
+        # 1.7) 정보 조회만이면 세션(쿠키+CSRF) export → 회차별 페이지 없이 HTTP 로만 (APISNAP=0 이면 기존 경로)
+        api = None
+        if RUNTIME.INFO_ONLY and apisnap.APISNAP:
+            try:
+                refresh = apisnap.page_refresher(context, _harvest_csrf_any, [f"{ALT_SITE}/", f"{ALT_SITE}/ko/booking"])
+                api = await apisnap.export_session(context, page=page, refresh=refresh)
+                print(f"✅ API 전용 조회 (csrf={'ok' if api.csrf else '-'})", flush=True)
+            except Exception as e:
+                print(f"⚠ API 세션 export 실패 → 페이지 경로: {e}", flush=True)
+                api = None
+
         # 2) 동시 처리 (하드코딩된 SDCODES 사용)
-        sem = asyncio.Semaphore(max(1, int(RUNTIME.CONCURRENCY)))
+        sem = shows_limiter(max(1, int(RUNTIME.CONCURRENCY)))   # Semaphore 대체(AIMD)
 
         async def run_one(code: str):
-            async with sem:
-                try:
-                    await handle_sd(code, context, bool(RUNTIME.HEADLESS), bool(RUNTIME.INFO_ONLY))
-                except Exception as e:
-                    if DEBUG:
-                        import sys, traceback
-                        print(f"[ERR] {code}: {e.__class__.__name__}: {e}", file=sys.stderr, flush=True)
-                        traceback.print_exc()
-                    # 최소 요약 라인 유지
-                    ctx = Ctx(sd=code, title="", venue="?", dt="", plan_type="?", total=None, remain=None, action="", status="?")
-                    print(
-                        f"⚪ {pad_field(code,3)} | {pad_field('',22)} | {pad_field('?',14)} | "
-                        f"{pad_field('??-?? ??:??',11)} | {pad_field('?',3)} | "
-                        f"T/R={zpad4(None)}/{zpad4(None)} | ?",
-                        flush=True
-                    )
+            metrics.set_sd(code)
+            # 회차 슬롯(sem)은 스케줄러가 잡음 (sched.run limiter=)
+            try:
+                await PROF.run(code, handle_sd(code, context, bool(RUNTIME.HEADLESS), bool(RUNTIME.INFO_ONLY), api))
+            except Exception as e:
+                if DEBUG:
+                    import sys, traceback
+                    print(f"[ERR] {code}: {e.__class__.__name__}: {e}", file=sys.stderr, flush=True)
+                    traceback.print_exc()
+                # 최소 요약 라인 유지
+                ctx = Ctx(sd=code, title="", venue="?", dt="", plan_type="?", total=None, remain=None, action="", status="?")
+                print(
+                    f"⚪ {pad_field(code,3)} | {pad_field('',22)} | {pad_field('?',14)} | "
+                    f"{pad_field('??-?? ??:??',11)} | {pad_field('?',3)} | "
+                    f"T/R={zpad4(None)}/{zpad4(None)} | ?",
+                    flush=True
+                )
 
         # SDCODES 비었으면 바로 종료
         sd_list = list(getattr(RUNTIME, "SDCODES", [])) or []
@@ -1176,7 +1247,26 @@ async def main():
             await context.close(); await browser.close()
             return
 
-        await asyncio.gather(*(run_one(sd) for sd in sd_list))
+        sched = SdScheduler(sd_list, sem.hi, name="BT")   # 실제 동시 수는 sem(AIMD)이 결정
+        print(sched.describe(), flush=True)
+        await sched.run(run_one, limiter=sem)
+        if RL_REPORT:
+            for line in RL.report():
+                print(line, flush=True)
+            print(sem.report(), flush=True)
+            print(AIMD_API.report(), flush=True)
+            print(WARM.report(), flush=True)
+            print(offload.report(), flush=True)
+            for line in schema_report():
+                print(line, flush=True)
+        for line in LAG.report():
+            print(line, flush=True)
+        LAG.stop()
+        for line in PROF.report():
+            print(line, flush=True)
+        if api is not None:
+            print(api.report(), flush=True)
+            await api.close()
 
         # 3) 정리 — handle_sd 내부에서 결제 HOLD 대기 후 반환됨
         await context.close()
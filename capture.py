@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# 디버그 캡처: 평소엔 가벼운 DOM 지문만 메모리 링에, HTML/PNG 는 실패·느린 회차만
+# - 기존: Tracer.dump_html/dump_png, bf._save_snap(full-page PNG), snapshot_state 가 흐름 중간에
+#         page.content()/screenshot(path=...) 를 동기로 떠서 바로 파일 기록 → debug/ 누적
+# - 여기:
+#     note(scope, tag)   : 지문(url/title/노드 수/본문 길이·해시/보이는 버튼) 1회 evaluate → 회차별 deque(CAPTURE_RING)
+#     begin(sd) / ok(sd) / await end(sd, page)
+#                        : 실패(ok 안 불림) 또는 begin~ok 가 CAPTURE_SLOW_SEC 초과면 그때 HTML/PNG + 지문 링 JSON 저장
+#                          (느림은 ok 시점에 잼 — 결제창 유지(hold_at_payment) 시간은 포함 안 됨)
+#     dump(page, label)  : 직접 덤프 (Tracer.dump_* 가 이걸 씀)
+#   파일 쓰기는 스레드에서 (screenshot 은 bytes 로 받고 기록만 넘김), 실행당 CAPTURE_MAX_MB 넘으면 건너뜀
+#   저장 위치: CAPTURE_DIR/cap-YYYYmmdd-HHMMSS/
+# ENV: CAPTURE=1, CAPTURE_DIR=./debug, CAPTURE_RING=8, CAPTURE_SLOW_SEC=60, CAPTURE_MAX_MB=40, CAPTURE_PNG=1
+
+import asyncio, json, os, re, time
+from collections import Counter, deque
+from pathlib import Path
+
+import metrics
+
+CAPTURE = os.getenv("CAPTURE", "1") == "1"
+CAPTURE_DIR = Path(os.getenv("CAPTURE_DIR", "./debug"))
+CAPTURE_RING = int(os.getenv("CAPTURE_RING", "8"))
+CAPTURE_SLOW_SEC = float(os.getenv("CAPTURE_SLOW_SEC", "60"))
+CAPTURE_MAX_MB = float(os.getenv("CAPTURE_MAX_MB", "40"))
+CAPTURE_PNG = os.getenv("CAPTURE_PNG", "1") == "1"
+
+_FP_JS = r"""() => {
+  const b = document.body, t = (b && b.innerText) || '';
+  let h = 0; for (let i = 0; i < Math.min(t.length, 4000); i++) h = (h * 31 + t.charCodeAt(i)) | 0;
+  const btn = [...document.querySelectorAll("button,[role=button],a.btn,input[type=submit]")]
+    .filter(e => e.offsetParent).slice(0, 8).map(e => (e.innerText || e.value || '').trim().slice(0, 20));
+  return {url: location.href, title: document.title, nodes: document.getElementsByTagName('*').length,
+          text: t.length, hash: h, frames: window.frames.length, buttons: btn};
+}"""
+
+
+def _safe(label: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", label)[:80]
+
+
+class Capture:
+    def __init__(self):
+        self.dir = CAPTURE_DIR / f"cap-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.rings: dict[str, deque] = {}
+        self.t0: dict[str, float] = {}
+        self.good: dict[str, float] = {}     # sd → begin~ok 경과(초)
+        self.bytes = 0
+        self.pending: set = set()
+        self.stats = Counter()     # note / dump / write / skipped_cap / fail
+
+    # ---------- 지문 ----------
+    async def note(self, scope, tag: str, sd: str | None = None):
+        if not CAPTURE: return
+        sd = sd if sd is not None else metrics.SD.get()
+        try:
+            fp = await asyncio.wait_for(scope.evaluate(_FP_JS), 1.0)
+        except Exception as e:
+            fp = {"url": getattr(scope, "url", ""), "err": str(e)[:80]}
+        ring = self.rings.setdefault(sd, deque(maxlen=CAPTURE_RING))
+        ring.append({"t": round(time.time(), 3), "tag": tag, **(fp or {})})
+        self.stats["note"] += 1
+
+    # ---------- 회차 단위 ----------
+    def begin(self, sd: str):
+        self.t0[sd] = time.monotonic()
+        self.good.pop(sd, None)
+
+    def ok(self, sd: str):
+        t0 = self.t0.get(sd)
+        self.good[sd] = time.monotonic() - t0 if t0 is not None else 0.0
+
+    async def end(self, sd: str, page, reason: str = ""):
+        """회차 끝 (page 닫기 전). 실패/느림이면 덤프, 아니면 지문 링만 버림."""
+        t0 = self.t0.pop(sd, None)
+        ring = self.rings.pop(sd, None)
+        if not CAPTURE:
+            return
+        took = self.good.pop(sd, None)
+        ok = took is not None
+        slow = ok and took > CAPTURE_SLOW_SEC
+        if ok and not slow:
+            return
+        why = reason or ("slow" if ok else "fail")
+        await self.dump(page, f"{sd}_{why}", ring=ring)
+
+    # ---------- 덤프 ----------
+    async def dump(self, page, label: str, *, ring=None, html: bool = True, png: bool = CAPTURE_PNG,
+                   full_page: bool = False):
+        """page 에서 HTML/PNG 를 bytes 로 받아오고 파일 기록은 백그라운드 스레드로. 저장 경로 목록 반환."""
+        if not CAPTURE or page is None:
+            return []
+        label = _safe(label)
+        blobs = []
+        if ring:
+            blobs.append((f"{label}.ring.json", json.dumps(list(ring), ensure_ascii=False, indent=1).encode("utf-8")))
+        try:
+            if page.is_closed():
+                png = html = False
+        except Exception:
+            pass
+        if html:
+            try: blobs.append((f"{label}.html", (await page.content()).encode("utf-8")))
+            except Exception: self.stats["fail"] += 1
+        if png:
+            try: blobs.append((f"{label}.png", await page.screenshot(full_page=full_page)))
+            except Exception: self.stats["fail"] += 1
+        self.stats["dump"] += 1
+        cap = CAPTURE_MAX_MB * 1024 * 1024
+        out = []
+        for name, data in blobs:
+            if self.bytes + len(data) > cap:
+                self.stats["skipped_cap"] += 1
+                continue
+            self.bytes += len(data)
+            p = self.dir / name
+            out.append(p)
+            t = asyncio.create_task(asyncio.to_thread(self._write, p, data))
+            self.pending.add(t); t.add_done_callback(self.pending.discard)
+        return out
+
+    def _write(self, p: Path, data: bytes):
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(data)
+        self.stats["write"] += 1
+
+    async def drain(self):
+        if self.pending:
+            await asyncio.gather(*list(self.pending), return_exceptions=True)
+
+    def report(self) -> str:
+        st = self.stats
+        return (f"[CAPTURE] notes={st['note']} dumps={st['dump']} files={st['write']} "
+                f"{self.bytes / 1048576:.1f}MB/{CAPTURE_MAX_MB:.0f}MB"
+                + (f" skipped(cap)={st['skipped_cap']}" if st['skipped_cap'] else "")
+                + (f" → {self.dir}" if st['write'] else ""))
+
+
+CAP = Capture()
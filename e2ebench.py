@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# 러너 4종 end-to-end 단계 도달 시간 벤치마크 (로컬 스탠드인 대상)
+# - biff_patched / bf / bt / unified(biff_autobook_unified) 를 같은 조건에서 실행해 비교:
+#     회차 수(--shows) × 동시성(--conc, SHOWS_CONCURRENCY) × 반복(--repeat)
+#   각 실행마다 새 StandIn(회차 N개) 을 띄우고 러너를 서브프로세스로 (STANDIN=<주소>, 작업 폴더 _bench/work/<러너>)
+# - 단계 시각은 스탠드인 서버가 기록 (러너 로그 형식과 무관): summary / price / payment
+#   기준 시각 = 러너 프로세스 시작 → 회차별 도달 시간(초) p50/p95/max, 도달 회차 수
+#   요청 수: 전체 / page / api / static / unmatched(스탠드인이 모르는 경로) / 회차당, 엔드포인트 상위
+# - 종료 조건: 러너 종료 / 모든 회차 payment 도달 / E2E_IDLE_SEC 동안 요청 없음 / E2E_TIMEOUT_SEC
+#   (결제창 HOLD 로 안 끝나는 러너는 여기서 정리)
+# - 결과: _bench/e2e-<시각>-<커밋>.json (+ 러너 출력 로그), --compare 로 이전 결과 대비 p50 변화
+# 사용:
+#   python e2ebench.py                                   # 4종 × shows 2,6 × conc 1,4
+#   python e2ebench.py --runners bf,bt --shows 4 --conc 2 --repeat 3
+#   python e2ebench.py --compare _bench/e2e-20251001-120000-abc123.json
+# 참고: unified 는 회차를 순차 처리 (SHOWS_CONCURRENCY 영향 없음)
+# ENV: E2E_TIMEOUT_SEC=300, E2E_IDLE_SEC=30, E2E_DIR=./_bench  (+ standin.py 의 STANDIN_* 지연/비율)
+
+import json, os, subprocess, sys, time
+from pathlib import Path
+
+from standin import StandIn
+
+HERE = Path(__file__).resolve().parent
+E2E_TIMEOUT_SEC = float(os.getenv("E2E_TIMEOUT_SEC", "300"))
+E2E_IDLE_SEC = float(os.getenv("E2E_IDLE_SEC", "30"))
+E2E_DIR = Path(os.getenv("E2E_DIR", "./_bench"))
+
+STAGES = ("summary", "price", "payment")
+DUMMY = {"BF_ID": "bench", "BF_PW": "bench", "BIFF_ID": "bench", "BIFF_PW": "bench"}
+
+
+# 러너 → (명령, 추가 ENV)
+def _biff_patched(codes):
+    return ["biff_patched.py"], {"SD_CODES": ",".join(codes), "PAY_STAY": "0", "KEEP_OPEN_ON_SUCCESS": "0"}
+
+def _bf(codes):
+    return ["bf.py", *codes], {}
+
+def _bt(codes):
+    return ["bt.py"], {"SD_CODES": ",".join(codes), "BT_INFO_ONLY": "0"}
+
+def _unified(codes):
+    return ["biff_autobook_unified.py", *[a for c in codes for a in ("--sd", c)]], {"HEADLESS": "1"}
+
+RUNNERS = {"biff_patched": _biff_patched, "bf": _bf, "bt": _bt, "unified": _unified}
+
+
+def _pct(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))] if xs else None
+
+
+def _rev() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=HERE,
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ("+dirty" if dirty else "")
+    except Exception:
+        return "?"
+
+
+def run_one(runner: str, shows: int, conc: int, log_dir: Path) -> dict:
+    si = StandIn(shows).start()
+    codes = list(si.shows)
+    args, extra = RUNNERS[runner](codes)
+    work = E2E_DIR / "work" / runner
+    work.mkdir(parents=True, exist_ok=True)
+    env = {**os.environ, **DUMMY, **extra, "STANDIN": si.url, "SHOWS_CONCURRENCY": str(conc),
+           "METRICS": "0", "PYTHONIOENCODING": "utf-8", "PYTHONUNBUFFERED": "1"}
+    log = log_dir / f"{runner}-s{shows}-c{conc}-{time.strftime('%H%M%S')}.log"
+    t0 = time.time()
+    with open(log, "wb") as fo:
+        proc = subprocess.Popen([sys.executable, str(HERE / args[0]), *args[1:]], cwd=work, env=env,
+                                stdin=subprocess.DEVNULL, stdout=fo, stderr=subprocess.STDOUT)
+        stop = "timeout"
+        while time.time() - t0 < E2E_TIMEOUT_SEC:
+            time.sleep(0.2)
+            if proc.poll() is not None:
+                stop = "exit"; break
+            if si.reached("payment") >= shows:
+                stop = "done"; break
+            last = si.last_event_t() or t0
+            if time.time() - last > E2E_IDLE_SEC:
+                stop = "idle"; break
+        wall = time.time() - t0
+        if proc.poll() is None:
+            proc.terminate()
+            try: proc.wait(10)
+            except subprocess.TimeoutExpired: proc.kill(); proc.wait()
+    si.stop()
+    return _summarize(si, runner, shows, conc, t0, wall, stop, proc.returncode, log)
+
+
+def _summarize(si: StandIn, runner, shows, conc, t0, wall, stop, code, log) -> dict:
+    per_show = {sd: {st: round(t - t0, 3) for st, t in m.items()} for sd, m in si.marks.items()}
+    stages = {}
+    for st in STAGES:
+        xs = [m[st] for m in per_show.values() if st in m]
+        stages[st] = {"reached": len(xs), "p50": _pct(xs, .5), "p95": _pct(xs, .95), "max": max(xs) if xs else None}
+    ev = si.events
+    kinds, eps, unmatched = {}, {}, {}
+    for e in ev:
+        kinds[e["kind"]] = kinds.get(e["kind"], 0) + 1
+        if e["kind"] != "static":
+            eps[e["ep"]] = eps.get(e["ep"], 0) + 1
+        if not e["matched"]:
+            unmatched[e["path"]] = unmatched.get(e["path"], 0) + 1
+    return {"runner": runner, "shows": shows, "conc": conc, "stop": stop, "exit": code, "wall_s": round(wall, 2),
+            "first_req_s": round(ev[0]["t"] - t0, 3) if ev else None,
+            "stages": stages, "per_show": per_show,
+            "requests": {"total": len(ev), **kinds, "unmatched": sum(unmatched.values()),
+                         "per_show": round(len(ev) / max(1, shows), 1),
+                         "by_ep": dict(sorted(eps.items(), key=lambda kv: -kv[1])[:15]),
+                         "unmatched_paths": dict(sorted(unmatched.items(), key=lambda kv: -kv[1])[:10])},
+            "log": str(log)}
+
+
+def _fmt(v):
+    return f"{v:.1f}s" if isinstance(v, (int, float)) else "-"
+
+
+def format_report(runs: list[dict], prev: list[dict] | None = None) -> list[str]:
+    ref = {(r["runner"], r["shows"], r["conc"]): r for r in (prev or [])}
+    out = [f"  {'runner':<13}{'N':>3}{'C':>3}  " + "  ".join(f"{st + ' p50/p95':^17}" for st in STAGES)
+           + f"  {'reach':>7} {'req':>5} {'/show':>6}  stop"]
+    for r in runs:
+        sts = "  ".join(f"{_fmt(r['stages'][st]['p50']) + '/' + _fmt(r['stages'][st]['p95']):^17}" for st in STAGES)
+        reach = f"{r['stages']['payment']['reached']}/{r['shows']}"
+        ln = (f"  {r['runner']:<13}{r['shows']:>3}{r['conc']:>3}  {sts}  {reach:>7} {r['requests']['total']:>5} "
+              f"{r['requests']['per_show']:>6}  {r['stop']}")
+        p = ref.get((r["runner"], r["shows"], r["conc"]))
+        if p:
+            d = [(st, r["stages"][st]["p50"], p["stages"][st]["p50"]) for st in STAGES]
+            ln += "  Δp50 " + " ".join(f"{st[:3]}={a - b:+.1f}s" for st, a, b in d if a is not None and b is not None)
+        out.append(ln)
+        if r["requests"]["unmatched"]:
+            out.append(f"      unmatched: " + ", ".join(f"{k}×{v}" for k, v in r["requests"]["unmatched_paths"].items()))
+    return out
+
+
+def main(argv=None) -> int:
+    a = list(sys.argv[1:] if argv is None else argv)
+    def opt(k, d):
+        if k not in a: return d
+        i = a.index(k); v = a[i + 1]; del a[i:i + 2]
+        return v
+    runners = [r for r in opt("--runners", ",".join(RUNNERS)).split(",") if r]
+    shows = [int(x) for x in opt("--shows", "2,6").split(",")]
+    concs = [int(x) for x in opt("--conc", "1,4").split(",")]
+    repeat = int(opt("--repeat", "1"))
+    cmp_path = opt("--compare", None)
+    bad = [r for r in runners if r not in RUNNERS]
+    if bad:
+        print(f"[E2E] 모르는 러너: {bad} (가능: {', '.join(RUNNERS)})")
+        return 2
+    stamp, rev = time.strftime("%Y%m%d-%H%M%S"), _rev()
+    log_dir = E2E_DIR / f"logs-{stamp}"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    runs = []
+    for runner in runners:
+        for n in shows:
+            for c in (concs if runner != "unified" else [1]):
+                for i in range(repeat):
+                    print(f"[E2E] {runner} shows={n} conc={c} #{i + 1}", flush=True)
+                    r = run_one(runner, n, c, log_dir)
+                    r["repeat"] = i
+                    runs.append(r)
+                    print(format_report([r])[1], flush=True)
+    prev = None
+    if cmp_path:
+        try: prev = json.loads(Path(cmp_path).read_text(encoding="utf-8"))["runs"]
+        except Exception as e: print(f"[E2E] compare 실패: {e}")
+    print(f"[E2E] rev={rev}")
+    for ln in format_report(runs, prev):
+        print(ln)
+    out = E2E_DIR / f"e2e-{stamp}-{rev.replace('+', '_')}.json"
+    out.write_text(json.dumps({"when": stamp, "rev": rev, "timeout_s": E2E_TIMEOUT_SEC, "idle_s": E2E_IDLE_SEC,
+                               "standin": {k: v for k, v in os.environ.items() if k.startswith("STANDIN_")},
+                               "runs": runs}, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"[E2E] → {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# HAR 요청 타이밍 기록 보조 + 엔드포인트별 지연 분포 분석
+# - 기록: ReqTiming 으로 한 요청의 구간을 monotonic 으로 찍고 HAR timings 로 변환
+#     queue   : 호출 시작 → 실제 전송 직전 (호스트 토큰버킷 + AIMD 슬롯 대기)  → timings.blocked
+#     wait    : 전송 → 응답 헤더 (TTFB)                                         → timings.wait
+#     receive : 헤더 → 본문 다 읽음                                             → timings.receive
+#       (Playwright APIRequestContext.fetch 는 본문까지 받은 뒤 반환 → wait ≈ TTFB+본문 전송, receive ≈ text 디코드)
+#     + 비표준 필드 _queue_ms / _rl_ms / _sd (HAR 1.2는 "_" 접두 필드 허용)
+# - 분석: python harstat.py [경로/글롭 ...]   (기본 _har/*.har)
+#     엔드포인트(method + path)별 건수 / 전체·wait·queue 분위수 / 평균 응답 크기 / status 분포
+#     bf 의 Playwright HAR(runs/*/network.har)도 그대로 읽힘 (queue 정보는 없음)
+#     time=0 인 예전 캡처는 "untimed" 로 따로 셈 (분포에서 제외)
+#     압축된 캡처: python harstat.py "archive:_har/*.har"  (artifacts.py pack 이후)
+# ENV: HARSTAT_TOP=30 (출력 엔드포인트 수)
+
+import datetime, glob, os, sys, time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+import artifacts
+
+HARSTAT_TOP = int(os.getenv("HARSTAT_TOP", "30"))
+
+
+def iso_ms(epoch: float) -> str:
+    """HAR startedDateTime (UTC, ms)."""
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class ReqTiming:
+    """t = ReqTiming(); (대기) t.rl(); (슬롯 획득) t.sent(); (fetch 반환) t.headers(); (text) t.done()"""
+    __slots__ = ("wall", "t0", "t_rl", "t_send", "t_hdr", "t_end")
+    def __init__(self):
+        self.wall = time.time()
+        self.t0 = time.monotonic()
+        self.t_rl = self.t_send = self.t_hdr = self.t_end = None
+
+    def rl(self):      self.t_rl = time.monotonic()
+    def sent(self):    self.t_send = time.monotonic()
+    def headers(self): self.t_hdr = time.monotonic()
+    def done(self):    self.t_end = time.monotonic()
+
+    def har(self) -> dict:
+        """HAR timings + 비표준 필드. 찍히지 않은 구간은 앞 지점으로 메움."""
+        ms = lambda a, b: round(max(0.0, (b - a) * 1000.0), 3)
+        send = self.t_send or self.t0
+        hdr = self.t_hdr or send
+        end = self.t_end or hdr
+        return {
+            "timings": {"blocked": ms(self.t0, send), "dns": -1, "connect": -1, "ssl": -1,
+                        "send": 0, "wait": ms(send, hdr), "receive": ms(hdr, end)},
+            "time": ms(self.t0, end),
+            "_queue_ms": ms(self.t0, send),
+            "_rl_ms": ms(self.t0, self.t_rl or self.t0),
+        }
+
+
+# ---------- 분석 ----------
+def _q(xs: list, q: float) -> float:
+    if not xs: return 0.0
+    i = min(len(xs) - 1, max(0, int(round(q * (len(xs) - 1)))))
+    return xs[i]
+
+
+def _endpoint(ent: dict) -> str:
+    req = ent.get("request") or {}
+    return f"{(req.get('method') or 'GET').upper()} {urlsplit(req.get('url') or '').path}"
+
+
+def analyze(paths) -> dict:
+    stats = defaultdict(lambda: {"time": [], "wait": [], "queue": [], "size": [], "status": Counter(), "untimed": 0})
+    files = 0
+    for p in paths:
+        try:
+            entries = artifacts.load_json(p)["log"]["entries"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[HARSTAT] skip {p}: {e}", file=sys.stderr)
+            continue
+        files += 1
+        for ent in entries:
+            st = stats[_endpoint(ent)]
+            resp = ent.get("response") or {}
+            st["status"][int(resp.get("status") or 0)] += 1
+            t = float(ent.get("time") or 0)
+            if t <= 0:
+                st["untimed"] += 1
+                continue
+            tm = ent.get("timings") or {}
+            st["time"].append(t)
+            st["wait"].append(max(0.0, float(tm.get("wait") or 0)))
+            q = ent.get("_queue_ms", tm.get("blocked"))
+            if q is not None and float(q) >= 0:
+                st["queue"].append(float(q))
+            size = (resp.get("content") or {}).get("size", resp.get("bodySize"))
+            if size is not None and int(size) >= 0:
+                st["size"].append(int(size))
+    for st in stats.values():
+        for k in ("time", "wait", "queue"):
+            st[k].sort()
+    return {"files": files, "endpoints": dict(stats)}
+
+
+def format_report(res: dict, top: int = HARSTAT_TOP) -> list[str]:
+    eps = res["endpoints"]
+    untimed = sum(s["untimed"] for s in eps.values())
+    timed = sum(len(s["time"]) for s in eps.values())
+    out = [f"[HARSTAT] files={res['files']} entries={timed + untimed} timed={timed} untimed={untimed}"]
+    if not timed:
+        out.append("  (타이밍 있는 항목 없음 — time=0 캡처는 분포에서 제외)")
+    hdr = f"  {'endpoint':<36} {'n':>5} {'p50':>7} {'p90':>7} {'p99':>7} {'max':>7} {'wait50':>7} {'q50':>6} {'q95':>6} {'KB':>6}  status"
+    out.append(hdr)
+    rank = sorted(eps.items(), key=lambda kv: -(sum(kv[1]["time"]) or kv[1]["untimed"] * 1e-9))
+    for ep, s in rank[:top]:
+        t, w, q = s["time"], s["wait"], s["queue"]
+        kb = (sum(s["size"]) / len(s["size"]) / 1024.0) if s["size"] else 0.0
+        sts = ",".join(f"{k}:{v}" for k, v in sorted(s["status"].items()))
+        n = f"{len(t)}" + (f"+{s['untimed']}" if s["untimed"] else "")
+        out.append(f"  {ep[:36]:<36} {n:>5} {_q(t, .5):>7.0f} {_q(t, .9):>7.0f} {_q(t, .99):>7.0f} "
+                   f"{(t[-1] if t else 0):>7.0f} {_q(w, .5):>7.0f} {_q(q, .5):>6.0f} {_q(q, .95):>6.0f} {kb:>6.1f}  {sts}")
+    return out
+
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv) or ["_har/*.har"]
+    paths = sorted({p for a in args
+                    for p in (artifacts.glob(a) if a.startswith(artifacts.PREFIX)
+                              else glob.glob(a) or ([a] if os.path.exists(a) else []))})
+    if not paths:
+        print(f"[HARSTAT] 파일 없음: {' '.join(args)}")
+        return 1
+    for ln in format_report(analyze(paths)):
+        print(ln)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# import 시간 예산 검사 — 러너 모듈을 import 만 했을 때의 비용과 부작용 측정
+# - 빈 임시 폴더에서 `python -X importtime -c "import <모듈>"` 를 IMPORT_BUDGET_REPEAT 번 → 최소값 사용
+#     total    : 모듈 누적 import 시간
+#     3rd      : site-packages 패키지(playwright 등) 누적 — 우리 코드로 줄일 수 없는 몫
+#     own      : total − 3rd  ← 예산(IMPORT_BUDGET_MS)은 이 값 기준
+#   상위 self 시간 모듈 목록 (어디서 시간이 드는지)
+# - 부작용: import 만으로 생긴 파일/폴더 (debug/, _har/, trace_*.jsonl, runs/ …)
+#          미리 불러오면 안 되는 모듈(IMPORT_LAZY)이 sys.modules 에 올라왔는지
+# - 재시도 루프(ask_retry → 재실행)와 parsebench/stagebench 같은 도구가 이 import 비용을 매번 냄
+# 사용:
+#   python importbudget.py                     # biff_patched
+#   python importbudget.py bf bt --check       # 예산 초과/부작용이면 exit 1
+#   python importbudget.py --all --json
+# ENV: IMPORT_BUDGET_MS=120, IMPORT_BUDGET_REPEAT=3, IMPORT_LAZY=httpx,http.server,concurrent.futures.process
+
+import json, os, subprocess, sys, tempfile
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "120"))
+IMPORT_BUDGET_REPEAT = int(os.getenv("IMPORT_BUDGET_REPEAT", "3"))
+IMPORT_LAZY = [s.strip() for s in os.getenv("IMPORT_LAZY", "httpx,http.server,concurrent.futures.process").split(",") if s.strip()]
+
+RUNNERS = ("biff_patched", "bf", "bt", "biff_autobook_unified")
+MARK = "@@IMPORTBUDGET@@"
+
+_CHILD = f"""
+import sys, json
+sys.argv = [{{mod!r}}]
+import {{mod}}
+print({MARK!r} + json.dumps({{{{k: getattr(v, "__file__", None) for k, v in list(sys.modules.items())}}}}))
+"""
+
+
+def _parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """'import time: self | cumulative | name' → [(name, depth, self_us, cum_us)] (출력 순서 = 후위 순회)."""
+    rows = []
+    for ln in stderr.splitlines():
+        if not ln.startswith("import time:") or "[us]" in ln:
+            continue
+        try:
+            head, cum, raw = ln.split("|", 2)
+            self_us, cum = int(head.split(":")[1]), int(cum)
+        except ValueError:
+            continue
+        stripped = raw.lstrip()
+        depth = (len(raw) - len(stripped) - 1) // 2
+        rows.append((stripped, depth, self_us, cum))
+    return rows
+
+
+def _third_party(files: dict) -> set:
+    return {k.split(".")[0] for k, f in files.items() if f and "site-packages" in f}
+
+
+def measure_once(mod: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix="impbudget-") as tmp:
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(HERE), os.environ.get("PYTHONPATH")])),
+               "PYTHONDONTWRITEBYTECODE": "1", "METRICS": "0"}
+        p = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD.format(mod=mod)], cwd=tmp, env=env,
+                           capture_output=True, text=True, encoding="utf-8", errors="replace", timeout=120)
+        created = sorted(str(q.relative_to(tmp)) for q in Path(tmp).rglob("*") if "__pycache__" not in q.parts)
+    line = next((l for l in p.stdout.splitlines() if l.startswith(MARK)), None)
+    if p.returncode != 0 or line is None:
+        return {"mod": mod, "error": (p.stderr.strip().splitlines() or ["?"])[-1]}
+    files = json.loads(line[len(MARK):])
+    rows = _parse_importtime(p.stderr)
+    third = _third_party(files)
+    total = next((cum for name, d, _, cum in rows if name == mod and d == 0), 0)
+    # 3rd-party: 부모가 3rd-party 가 아닌 3rd-party 줄의 누적 합 (후위 순회 → 부모는 뒤에 오는 depth-1 줄)
+    tp, stack = 0, []          # stack[d] = depth d 의 현재 부모가 3rd-party 인가
+    for name, d, _, cum in reversed(rows):
+        is_tp = name.split(".")[0] in third
+        del stack[d:]
+        parent_tp = bool(stack) and stack[-1]
+        if is_tp and not parent_tp:
+            tp += cum
+        stack.append(is_tp or parent_tp)
+    top = sorted(((name, s) for name, _, s, _ in rows if name.split(".")[0] not in third), key=lambda x: -x[1])[:8]
+    lazy = [m for m in IMPORT_LAZY if m in files]
+    return {"mod": mod, "total_ms": total / 1000, "third_ms": tp / 1000, "own_ms": (total - tp) / 1000,
+            "top_self": [(n, round(s / 1000, 2)) for n, s in top], "created": created, "eager": lazy,
+            "third_party": sorted(third)}
+
+
+def measure(mod: str, repeat: int = IMPORT_BUDGET_REPEAT) -> dict:
+    runs = [measure_once(mod) for _ in range(max(1, repeat))]
+    ok = [r for r in runs if "error" not in r]
+    if not ok:
+        return runs[0]
+    best = min(ok, key=lambda r: r["own_ms"])
+    best["runs"] = [round(r["own_ms"], 1) for r in ok]
+    best["over"] = best["own_ms"] > IMPORT_BUDGET_MS
+    return best
+
+
+def format_report(results: list[dict]) -> list[str]:
+    out = [f"[IMPORT] budget own ≤ {IMPORT_BUDGET_MS:.0f}ms (min of {IMPORT_BUDGET_REPEAT})"]
+    for r in results:
+        if "error" in r:
+            out.append(f"  {r['mod']:<24} import 실패: {r['error']}")
+            continue
+        flag = "OVER" if r["over"] else "ok"
+        out.append(f"  {r['mod']:<24} own={r['own_ms']:6.1f}ms  3rd={r['third_ms']:6.1f}ms  "
+                   f"total={r['total_ms']:6.1f}ms  {flag}")
+        out.append("      self top: " + ", ".join(f"{n} {s:.1f}" for n, s in r["top_self"][:5]))
+        if r["created"]:
+            out.append("      ⚠ import 만으로 생성: " + ", ".join(r["created"][:8]) + (" …" if len(r["created"]) > 8 else ""))
+        if r["eager"]:
+            out.append("      ⚠ 지연 대상인데 로드됨: " + ", ".join(r["eager"]))
+    return out
+
+
+def main(argv=None) -> int:
+    a = list(sys.argv[1:] if argv is None else argv)
+    check, as_json = "--check" in a, "--json" in a
+    mods = [x for x in a if not x.startswith("--")] or (list(RUNNERS) if "--all" in a else ["biff_patched"])
+    results = [measure(m) for m in mods]
+    if as_json:
+        print(json.dumps(results, ensure_ascii=False, indent=1))
+    else:
+        for ln in format_report(results):
+            print(ln)
+    bad = [r for r in results if "error" in r or r["over"] or r["created"] or r["eager"]]
+    return 1 if (check and bad) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# 이벤트 루프 지연(lag) / 블로킹 호출 탐지기
+# - 샘플러: LOOPLAG_PERIOD_MS 마다 sleep → 예정 대비 늦게 깬 만큼 = lag → 히스토그램
+# - 워치독 스레드: 루프 심장박동이 LOOPLAG_MS 이상 멈추면 그 순간 루프 스레드의 스택을 떠 둠
+#   (블로킹 중인 코드 = 지금 실행 중인 프레임). 샘플러가 lag를 확인하면 그 스택에 lag ms 귀속
+# - 실행 끝에 report(): 히스토그램 + 누적 lag 큰 순 상위 호출 지점(파일:줄 함수 / 태스크 이름)
+# 사용:
+#   LAG.start()                # 루프 안에서 (main 시작부) — 꺼져 있으면 아무것도 안 함
+#   for ln in LAG.report(): print(ln)
+#   LAG.stop()                 # 요약 출력 뒤 (샘플러 태스크 취소 + 워치독 종료, 재시도 루프에서 다시 start 가능)
+#   LAG.start(need=True); LAG.recent_max(3.0)   # aimd: 꺼져 있어도 샘플러만 돌려 최근 창 최대 lag 읽기
+# ENV: LOOPLAG_ENABLE=0, LOOPLAG_MS=100, LOOPLAG_PERIOD_MS=20, LOOPLAG_TOP=8
+
+import asyncio, os, sys, threading, time, traceback
+from collections import deque
+
+LOOPLAG_ENABLE = os.getenv("LOOPLAG_ENABLE", "0") == "1"
+LOOPLAG_MS = float(os.getenv("LOOPLAG_MS", "100"))
+LOOPLAG_PERIOD_MS = float(os.getenv("LOOPLAG_PERIOD_MS", "20"))
+LOOPLAG_TOP = int(os.getenv("LOOPLAG_TOP", "8"))
+
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000)   # ms 상한, 마지막 칸은 그 이상
+
+_SKIP_FILES = ("asyncio", "looplag.py", "selectors.py", "threading.py")
+
+
+def _our_frames(frame, depth: int = 4) -> list[str]:
+    """블로킹 지점 스택에서 asyncio 내부 프레임을 뺀 위쪽 depth개 ("파일:줄 함수")."""
+    out = []
+    for fs in reversed(traceback.extract_stack(frame)):
+        fn = fs.filename.replace("\\", "/")
+        if any(s in fn for s in _SKIP_FILES):
+            continue
+        out.append(f"{os.path.basename(fn)}:{fs.lineno} {fs.name}")
+        if len(out) >= depth:
+            break
+    return out
+
+
+class LoopLag:
+    def __init__(self):
+        self.hist = [0] * (len(BUCKETS) + 1)
+        self.samples = 0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=4096)   # (t, lag ms) — aimd 창 판단용
+        self.offenders: dict = {}      # 스택 시그니처 → [횟수, 합계ms, 최대ms, {태스크명}]
+        self._beat = 0.0
+        self._caught = None            # (beat, stack, task) — 워치독이 잡은 현재 정지 구간
+        self._loop = None
+        self._tid = None
+        self._task = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def start(self, *, need: bool = False):
+        """need=True: LOOPLAG_ENABLE=0 이어도 샘플러는 돌림 (aimd 가 lag 를 읽음). 워치독/리포트는 켜졌을 때만."""
+        if not (LOOPLAG_ENABLE or need):
+            return
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop, self._tid = loop, threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = loop.create_task(self._sample(), name="looplag")
+        if LOOPLAG_ENABLE and (self._watcher is None or not self._watcher.is_alive()):
+            self._stop = threading.Event()
+            self._watcher = threading.Thread(target=self._watch, args=(self._stop,), name="looplag-watch", daemon=True)
+            self._watcher.start()
+
+    async def _sample(self):
+        period = LOOPLAG_PERIOD_MS / 1000.0
+        while True:
+            t0 = self._beat = time.monotonic()
+            await asyncio.sleep(period)
+            lag = max(0.0, (time.monotonic() - t0 - period) * 1000.0)
+            self._record(lag, t0)
+
+    def _record(self, lag: float, beat: float):
+        self.recent.append((time.monotonic(), lag))
+        self.samples += 1
+        self.max_ms = max(self.max_ms, lag)
+        i = 0
+        while i < len(BUCKETS) and lag >= BUCKETS[i]:
+            i += 1
+        self.hist[i] += 1
+        if lag < LOOPLAG_MS:
+            return
+        c = self._caught
+        stack, task = (c[1], c[2]) if c and c[0] == beat else (["(스택 못 잡음: 워치독 주기보다 짧은 정지)"], "?")
+        o = self.offenders.setdefault(tuple(stack), [0, 0.0, 0.0, set()])
+        o[0] += 1; o[1] += lag; o[2] = max(o[2], lag); o[3].add(task)
+
+    def _watch(self, stop: threading.Event):
+        tick = max(0.005, LOOPLAG_MS / 2000.0)
+        while not stop.wait(tick):
+            beat = self._beat
+            stalled = (time.monotonic() - beat) * 1000.0 - LOOPLAG_PERIOD_MS
+            if stalled < LOOPLAG_MS or (self._caught and self._caught[0] == beat):
+                continue
+            frame = sys._current_frames().get(self._tid)
+            if frame is None:
+                continue
+            task = "?"
+            try:
+                # 공개 API 로 조회 (3.12+ C 구현은 asyncio.tasks._current_tasks 를 채우지 않음)
+                t = asyncio.current_task(self._loop) if self._loop is not None else None
+                if t is not None: task = t.get_name()
+            except Exception:
+                pass
+            self._caught = (beat, _our_frames(frame), task)
+
+    def recent_max(self, window_sec: float) -> float:
+        lo = time.monotonic() - window_sec
+        return max((ms for t, ms in reversed(self.recent) if t >= lo), default=0.0)
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._loop = None
+
+    def report(self) -> list[str]:
+        if not LOOPLAG_ENABLE or not self.samples:
+            return []
+        labels = [f"<{b}" for b in BUCKETS] + [f"≥{BUCKETS[-1]}"]
+        hist = " ".join(f"{l}:{n}" for l, n in zip(labels, self.hist) if n)
+        out = [f"[LOOPLAG] samples={self.samples} max={self.max_ms:.0f}ms | {hist}"]
+        top = sorted(self.offenders.items(), key=lambda kv: -kv[1][1])[:LOOPLAG_TOP]
+        for stack, (n, tot, mx, tasks) in top:
+            out.append(f"  ⏱ {tot:.0f}ms 합계 ({n}회, 최대 {mx:.0f}ms) task={','.join(sorted(tasks))[:60]}")
+            for ln in stack:
+                out.append(f"      {ln}")
+        return out
+
+
+LAG = LoopLag()
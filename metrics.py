@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+# 프로세스 내 메트릭 레지스트리 + 로컬 /metrics (Prometheus 텍스트) + 종료 시 JSON 덤프
+# - counter / gauge / histogram(HDR식 로그-선형 버킷: 2배마다 8칸, 상대오차 ~9%)
+# - 라벨: endpoint(path), method, status, sd(현재 회차 — contextvar, set_sd로 지정), stage 등
+# - 요청 계측: with request(url, method) as m: ...; m.status = resp.status
+#     → rs_request_ms{endpoint,method,status,sd} 히스토그램 + rs_requests_total + rs_inflight{endpoint}
+# - 스크레이프 시점 수집: aimd limiter(limit/inflight/대기열), 등록된 콜렉터
+# 조회:
+#   curl 127.0.0.1:9464/metrics            (Prometheus)
+#   curl 127.0.0.1:9464/metrics.json       (p50/p95/p99 포함)
+#   종료 시 ./_metrics/metrics-YYYYmmdd-HHMMSS.json
+# ENV: METRICS=1, METRICS_PORT=9464 (0이면 서버 안 띄움), METRICS_DIR=./_metrics
+
+import atexit, bisect, contextvars, json, math, os, pathlib, threading, time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+METRICS = os.getenv("METRICS", "1") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+METRICS_DIR = pathlib.Path(os.getenv("METRICS_DIR", "./_metrics"))
+
+SD: contextvars.ContextVar = contextvars.ContextVar("metrics_sd", default="")
+
+_SUB = 8                                   # 2배 구간당 버킷 수
+_EXPO_LE = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)   # /metrics 노출용 le
+
+
+def set_sd(sd: str):
+    """현재 태스크(와 그 자식 태스크)의 회차 라벨."""
+    return SD.set(str(sd or ""))
+
+
+def endpoint_of(url: str) -> str:
+    try:
+        return urlsplit(url).path or url
+    except Exception:
+        return str(url)
+
+
+class Hist:
+    __slots__ = ("b", "le", "n", "sum", "max")
+    def __init__(self):
+        self.b = {}
+        self.le = [0] * len(_EXPO_LE)     # 노출용 le 구간별 정확한 개수 (로그 버킷 경계는 le 와 안 맞음)
+        self.n = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _idx(v: float) -> int:
+        return -1 if v < 1.0 else int(math.log2(v) * _SUB)
+
+    @staticmethod
+    def _upper(i: int) -> float:
+        return 1.0 if i < 0 else 2 ** ((i + 1) / _SUB)
+
+    def add(self, v: float):
+        i = self._idx(v)
+        self.b[i] = self.b.get(i, 0) + 1
+        j = bisect.bisect_left(_EXPO_LE, v)      # v <= _EXPO_LE[j] 인 첫 칸
+        if j < len(self.le):
+            self.le[j] += 1
+        self.n += 1
+        self.sum += v
+        if v > self.max: self.max = v
+
+    def quantile(self, q: float) -> float:
+        if not self.n:
+            return 0.0
+        rank = q * self.n
+        acc = 0
+        for i in sorted(self.b):
+            acc += self.b[i]
+            if acc >= rank:
+                return min(self._upper(i), self.max)
+        return self.max
+
+    def le_counts(self, les=_EXPO_LE) -> list[int]:
+        """le 별 누적 개수 (값 <= le). _EXPO_LE 는 정확, 그 밖의 le 는 로그 버킷에서 근사."""
+        if tuple(les) == _EXPO_LE:
+            out, acc = [], 0
+            for c in self.le:
+                acc += c
+                out.append(acc)
+            return out
+        items = sorted(self.b.items())
+        return [sum(c for i, c in items if self._upper(i) <= le) for le in les]
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: dict = {}     # (name, labels) → float
+        self.gauges: dict = {}
+        self.hists: dict = {}
+        self.collectors = []         # () → [(kind, name, labels_dict, value)]
+        self.t0 = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, labels=None, v: float = 1.0):
+        if not METRICS: return
+        k = self._key(name, labels)
+        with self.lock:
+            self.counters[k] = self.counters.get(k, 0.0) + v
+
+    def gauge(self, name, labels=None, v: float = 0.0, *, add: bool = False):
+        if not METRICS: return
+        k = self._key(name, labels)
+        with self.lock:
+            self.gauges[k] = (self.gauges.get(k, 0.0) + v) if add else v
+
+    def observe(self, name, labels=None, v: float = 0.0):
+        if not METRICS: return
+        k = self._key(name, labels)
+        with self.lock:
+            h = self.hists.get(k)
+            if h is None:
+                h = self.hists[k] = Hist()
+            h.add(v)
+
+    def collector(self, fn):
+        self.collectors.append(fn)
+        return fn
+
+    # ---------- 출력 ----------
+    def _collected(self):
+        out = []
+        for fn in list(self.collectors):
+            try: out.extend(fn() or [])
+            except Exception: pass
+        return out
+
+    def prometheus(self) -> str:
+        def lab(t, extra=()):
+            items = list(t) + list(extra)
+            if not items: return ""
+            esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"')
+            return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+        lines, typed = [], set()
+        def typ(name, kind):
+            if name not in typed:
+                typed.add(name); lines.append(f"# TYPE {name} {kind}")
+        with self.lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            hists = sorted(self.hists.items(), key=lambda kv: kv[0])
+            snap = [(k, h.le_counts(_EXPO_LE), h.n, h.sum, [h.quantile(q) for q in (0.5, 0.95, 0.99)]) for k, h in hists]
+        for (name, t), v in counters:
+            typ(name, "counter"); lines.append(f"{name}{lab(t)} {v:g}")
+        for (name, t), v in gauges:
+            typ(name, "gauge"); lines.append(f"{name}{lab(t)} {v:g}")
+        for kind, name, labels, v in self._collected():
+            typ(name, kind); lines.append(f"{name}{lab(sorted(labels.items()))} {v:g}")
+        for (name, t), les, n, s, qs in snap:
+            typ(name, "histogram")
+            for le, c in zip(_EXPO_LE, les):
+                lines.append(f"{name}_bucket{lab(t, [('le', le)])} {c}")
+            lines.append(f"{name}_bucket{lab(t, [('le', '+Inf')])} {n}")
+            lines.append(f"{name}_sum{lab(t)} {s:.3f}")
+            lines.append(f"{name}_count{lab(t)} {n}")
+        for (name, t), les, n, s, qs in snap:
+            typ(f"{name}_quantile", "gauge")
+            for q, v in zip(("0.5", "0.95", "0.99"), qs):
+                lines.append(f"{name}_quantile{lab(t, [('quantile', q)])} {v:.1f}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> dict:
+        with self.lock:
+            d = {
+                "started": self.t0, "now": time.time(),
+                "counters": [{"name": n, "labels": dict(t), "value": v} for (n, t), v in self.counters.items()],
+                "gauges": [{"name": n, "labels": dict(t), "value": v} for (n, t), v in self.gauges.items()],
+                "histograms": [{"name": n, "labels": dict(t), "count": h.n, "sum": round(h.sum, 3),
+                                "max": round(h.max, 1), "p50": round(h.quantile(0.5), 1),
+                                "p95": round(h.quantile(0.95), 1), "p99": round(h.quantile(0.99), 1)}
+                               for (n, t), h in self.hists.items()],
+            }
+        d["collected"] = [{"kind": k, "name": n, "labels": l, "value": v} for k, n, l, v in self._collected()]
+        return d
+
+    def dump(self, path=None) -> str | None:
+        if not METRICS or not (self.counters or self.hists):
+            return None
+        try:
+            METRICS_DIR.mkdir(parents=True, exist_ok=True)
+            p = pathlib.Path(path or METRICS_DIR / f"metrics-{time.strftime('%Y%m%d-%H%M%S')}.json")
+            p.write_text(json.dumps(self.to_json(), ensure_ascii=False, indent=2), encoding="utf-8")
+            return str(p)
+        except Exception:
+            return None
+
+
+M = Registry()
+
+
+class _Req:
+    __slots__ = ("status",)
+    def __init__(self): self.status = "error"
+
+
+@contextmanager
+def request(url: str, method: str = "POST", sd: str | None = None):
+    """API 호출 한 번 계측. 블록 안에서 m.status = resp.status 지정 (예외면 status=exc 클래스명)."""
+    ep = endpoint_of(url)
+    m = _Req()
+    M.gauge("rs_inflight", {"endpoint": ep}, 1, add=True)
+    t0 = time.monotonic()
+    try:
+        yield m
+    except BaseException as e:
+        m.status = type(e).__name__
+        raise
+    finally:
+        ms = (time.monotonic() - t0) * 1000.0
+        M.gauge("rs_inflight", {"endpoint": ep}, -1, add=True)
+        lab = {"endpoint": ep, "method": method.upper(), "status": str(m.status), "sd": sd if sd is not None else SD.get()}
+        M.observe("rs_request_ms", lab, ms)
+        M.inc("rs_requests_total", lab)
+
+
+def stage_ms(stage: str, ms: float, **labels):
+    M.observe("stage_ms", {"stage": stage, "sd": SD.get(), **labels}, ms)
+
+
+@M.collector
+def _aimd_limiters():
+    import sys
+    aimd = sys.modules.get("aimd")
+    if aimd is None:
+        return []
+    out = []
+    for lim in list(getattr(aimd, "LIMITERS", ())):
+        l = {"limiter": lim.name}
+        out += [("gauge", "limiter_limit", l, int(lim.limit)),
+                ("gauge", "limiter_inflight", l, lim.inflight),
+                ("gauge", "limiter_queue", l, len(lim.waiters))]
+    return out
+
+
+# ---------- HTTP ----------
+# http.server 는 serve() 때만 import (러너/도구 import 비용에서 제외) → 핸들러 본문만 여기 두고 그때 합성
+class _Routes:
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ct = json.dumps(M.to_json(), ensure_ascii=False).encode("utf-8"), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ct = M.prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            self.send_response(404); self.end_headers(); return
+        self.send_response(200)
+        self.send_header("Content-Type", ct)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *a):
+        pass
+
+
+_SERVER = None
+
+def serve(port: int = METRICS_PORT):
+    """127.0.0.1:port 에서 /metrics 서빙 (데몬 스레드, asyncio.run 재호출과 무관). 중복 호출 무시."""
+    global _SERVER
+    if _SERVER is not None or not METRICS or not port:
+        return _SERVER
+    try:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        _H = type("_H", (_Routes, BaseHTTPRequestHandler), {})
+        _SERVER = ThreadingHTTPServer(("127.0.0.1", port), _H)
+        _SERVER.daemon_threads = True
+        threading.Thread(target=_SERVER.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"[METRICS] http://127.0.0.1:{port}/metrics", flush=True)
+    except OSError as e:
+        print(f"[METRICS] 포트 {port} 사용 불가 ({e}) → /metrics 비활성, 종료 시 JSON 덤프만", flush=True)
+        _SERVER = False
+    return _SERVER
+
+
+def _at_exit():
+    p = M.dump()
+    if p:
+        print(f"[METRICS] dump → {p}", flush=True)
+
+atexit.register(_at_exit)
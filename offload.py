@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# 큰 JSON 디코드 / 좌석 집계를 이벤트 루프 밖으로
+# - 디코드: orjson 있으면 사용 (없으면 json). 결과는 json.loads와 같은 dict/list
+#     C 디코더는 GIL을 안 놓으므로 스레드로 넘겨도 루프 정지는 그대로 → 스레드 모드 없음
+#     (20만 행 13MB 기준: json 290ms / orjson 195ms / 프로세스풀에서 받은 결과 복원 117ms)
+#     auto    : 인라인 + 빠른 백엔드
+#     process : OFFLOAD_MIN_BYTES 이상은 프로세스풀에서 디코드 → 메인은 pickle 복원만
+#     off     : 인라인
+# - 집계(run): 파이썬 루프라 스레드에서 돌리면 GIL 전환 틈마다 다른 회차 await가 진행됨
+#             → OFFLOAD_MIN_ROWS 이상이면 스레드풀 (off 제외)
+# 사용:
+#   js = await loads_async(txt)
+#   r  = await run(_aggregate, a, b, weight=n)
+# ENV: OFFLOAD=auto|process|off, OFFLOAD_MIN_BYTES=262144, OFFLOAD_MIN_ROWS=2000,
+#      OFFLOAD_WORKERS=2, JSON_BACKEND=auto|orjson|json
+
+import asyncio, json, os, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+OFFLOAD = os.getenv("OFFLOAD", "auto").lower()
+OFFLOAD_MIN_BYTES = int(os.getenv("OFFLOAD_MIN_BYTES", str(256 * 1024)))
+OFFLOAD_MIN_ROWS = int(os.getenv("OFFLOAD_MIN_ROWS", "2000"))
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "2"))
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+try:
+    if JSON_BACKEND == "json":
+        raise ImportError
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+STATS = Counter()      # inline / process / run_thread / fallback / ms_* (풀에서 보낸 시간)
+
+_THREADS = None
+_PROCS = None
+
+
+def loads(txt):
+    """json.loads 대체 (orjson 우선). str/bytes 모두 허용."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(txt)
+        except ValueError:
+            pass    # NaN/64bit 초과 정수 등 orjson이 거부하는 입력 → 표준 json으로 (결과 동일성 우선)
+    return json.loads(txt)
+
+
+def _threads() -> ThreadPoolExecutor:
+    global _THREADS
+    if _THREADS is None:
+        _THREADS = ThreadPoolExecutor(max_workers=max(1, OFFLOAD_WORKERS), thread_name_prefix="offload")
+    return _THREADS
+
+
+def _procs() -> "ProcessPoolExecutor":
+    global _PROCS
+    if _PROCS is None:
+        from concurrent.futures import ProcessPoolExecutor   # multiprocessing 은 process 모드에서만 로드
+        _PROCS = ProcessPoolExecutor(max_workers=max(1, OFFLOAD_WORKERS))
+    return _PROCS
+
+
+async def loads_async(txt):
+    if OFFLOAD != "process" or len(txt or "") < OFFLOAD_MIN_BYTES:
+        STATS["inline"] += 1
+        return loads(txt)
+    t0 = time.monotonic()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_procs(), loads, txt)
+    except (OSError, RuntimeError):      # 프로세스풀 생성 실패/BrokenProcessPool 등 → 인라인
+        STATS["fallback"] += 1
+        return loads(txt)
+    finally:
+        STATS["process"] += 1
+        STATS["ms_process"] += int((time.monotonic() - t0) * 1000)
+
+
+async def run(fn, *args, weight: int = 0):
+    """동기 집계 함수를 weight(행 수)가 크면 스레드에서, 아니면 인라인으로."""
+    if OFFLOAD == "off" or weight < OFFLOAD_MIN_ROWS:
+        return fn(*args)
+    t0 = time.monotonic()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_threads(), fn, *args)
+    finally:
+        STATS["run_thread"] += 1
+        STATS["ms_run"] += int((time.monotonic() - t0) * 1000)
+
+
+def report() -> str:
+    st = STATS
+    return (f"[OFFLOAD] mode={OFFLOAD} json={'orjson' if _orjson else 'json'} "
+            f"inline={st['inline']} process={st['process']} agg(thread)={st['run_thread']}"
+            + (f" fallback={st['fallback']}" if st['fallback'] else ""))
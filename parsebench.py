@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+# 파서/집계 함수 마이크로 벤치마크 + 동등성 검사 (파서 최적화 전 기준선·정확성 가드)
+# - 대상 (biff_patched): _count_seats, _count_status_items, _seat_type_tally, _collect_candidates_by_pref,
+#                        _sum_zone, _sum_nrs, _normalize_seat_list, parse_har_seats
+# - 픽스처
+#     실제: out/*.json, seatdiag/*/POST__*.json, _netlog/*_RESP.txt, _har/*.har 응답 본문
+#           + artifacts.py pack 으로 옮겨진 같은 경로(archive:…)
+#           (엔드포인트로 종류 분류, 같은 본문은 한 번만, 종류·엔드포인트당 PARSEBENCH_REAL_MAX 개)
+#     합성: 좌석 PARSEBENCH_SIZES 개(기본 1k/5k/20k) 규모의 statusList/집계 목록/블록·존 요약/HAR
+# - 측정: 함수 × 픽스처 묶음(real, syn-1k, ...) 마다 ops/s, µs/op, 호출당 최대 할당(tracemalloc peak)
+# - 동등성(--equiv): 기준 리비전(git show <rev>:biff_patched.py, 기본 HEAD) vs 작업 트리
+#     (--alt 모듈을 주면 그 모듈에 있는 같은 이름 함수로 대체) → 모든 픽스처에서 결과가 같아야 통과
+#     불일치 있으면 종료코드 1, 속도비(cand/base)도 같이 출력
+# 사용:
+#   python parsebench.py                          # 벤치마크
+#   python parsebench.py --json _bench/parsebench.json
+#   python parsebench.py --compare _bench/parsebench.json   # 저장해둔 결과 대비 속도비 (archive: 경로도 됨)
+#   (기준선은 ARCHIVE_SRC 밖(_bench/)에 — out/ 등에 두면 pack 때 아카이브로 옮겨짐)
+#   python parsebench.py --equiv [--baseline HEAD~1] [--alt fastparse] [--only _count_seats,_sum_nrs]
+# ENV: PARSEBENCH_SIZES=1000,5000,20000, PARSEBENCH_SEC=0.3, PARSEBENCH_REAL_MAX=20, PARSEBENCH_HAR_MAX=3
+
+import atexit, contextlib, glob, hashlib, importlib, importlib.util, io, json, os, random, shutil, subprocess, sys, tempfile, time, tracemalloc
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+if str(HERE) not in sys.path:
+    sys.path.insert(0, str(HERE))
+
+import artifacts
+
+PARSEBENCH_SIZES = [int(x) for x in os.getenv("PARSEBENCH_SIZES", "1000,5000,20000").split(",") if x.strip()]
+PARSEBENCH_SEC = float(os.getenv("PARSEBENCH_SEC", "0.3"))
+PARSEBENCH_REAL_MAX = int(os.getenv("PARSEBENCH_REAL_MAX", "20"))
+PARSEBENCH_HAR_MAX = int(os.getenv("PARSEBENCH_HAR_MAX", "3"))
+
+PREFS = ["WHEELCHAIR", "GENERAL"]
+
+
+def _quiet(fn, *a):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*a)
+
+
+# 함수명 → (픽스처 종류, 호출)
+TARGETS = {
+    "_count_seats":                ("items",  lambda f, x: f(x)),
+    "_count_status_items":         ("items",  lambda f, x: f(x)),
+    "_seat_type_tally":            ("status", lambda f, x: f(x)),
+    "_collect_candidates_by_pref": ("status", lambda f, x: f(x, PREFS)),
+    "_sum_zone":                   ("zone",   lambda f, x: f(x)),
+    "_sum_nrs":                    ("nrs",    lambda f, x: f(x)),
+    "_normalize_seat_list":        ("raw",    lambda f, x: f(x)),
+    "parse_har_seats":             ("har",    lambda f, x: _quiet(f, x, os.devnull)),
+}
+
+
+# ---------- 모듈 로드 (import 부수효과는 스크래치 cwd 로) ----------
+# 예전 리비전은 import 때 trace 파일 등을 열고 실행 내내 쥐고 있음 → with 임시 폴더면 Windows 에서 삭제 실패
+# → 프로세스 동안 유지하고 종료 때 정리
+@contextlib.contextmanager
+def _sandbox():
+    cwd, argv = os.getcwd(), sys.argv
+    tmp = tempfile.mkdtemp(prefix="parsebench-")
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    os.chdir(tmp); sys.argv = [argv[0]]
+    try:
+        yield Path(tmp)
+    finally:
+        os.chdir(cwd); sys.argv = argv
+
+
+def load_current():
+    with _sandbox():
+        return importlib.import_module("biff_patched")
+
+
+def load_rev(rev: str):
+    src = subprocess.run(["git", "show", f"{rev}:biff_patched.py"], cwd=HERE, capture_output=True, check=True).stdout
+    name = "biff_patched_base"
+    with _sandbox() as tmp:
+        p = tmp / f"{name}.py"
+        p.write_bytes(src)
+        spec = importlib.util.spec_from_file_location(name, p)
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod
+        spec.loader.exec_module(mod)
+    return mod
+
+
+# ---------- 실제 픽스처 ----------
+def _endpoint(url: str) -> str:
+    return (url or "").split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+
+
+_KINDS = {
+    "blockSummary2":         ("nrs", "zone"),
+    "GetRsSeatStatusList":   ("status", "items", "raw"),
+    "GetRsSeatBaseMap":      ("zone", "raw"),
+    "GetRsZoneSeatMapInfo":  ("zone", "raw"),
+    "GetRsZZoneSeatMapInfo": ("zone", "raw"),
+}
+
+
+def _first_list(js):
+    if isinstance(js, list):
+        return js
+    if isinstance(js, dict):
+        for v in js.values():
+            if isinstance(v, list):
+                return v
+        for v in js.values():
+            if isinstance(v, dict):
+                got = _first_list(v)
+                if got: return got
+    return []
+
+
+def _paths(pattern: str) -> list[str]:
+    """작업 폴더 + pack 된 아카이브(archive:) 양쪽. 같은 본문은 real_fixtures 가 해시로 걸러냄."""
+    return sorted(glob.glob(pattern)) + artifacts.glob(artifacts.PREFIX + pattern)
+
+
+def _text(p: str) -> str:
+    return artifacts.read_bytes(p).decode("utf-8", "ignore")
+
+
+def _real_bodies():
+    """(출처, url, 본문 텍스트) — 비어있지 않은 것만."""
+    for p in _paths("out/*.json"):
+        with contextlib.suppress(Exception):
+            d = json.loads(_text(p))
+            yield p, d.get("url", ""), d.get("text") or json.dumps(d.get("json"), ensure_ascii=False)
+    for p in _paths("seatdiag/*/POST__*.json"):
+        with contextlib.suppress(Exception):
+            d = json.loads(_text(p))
+            js = d.get("json")
+            if isinstance(js, dict) and set(js) == {"_raw"}:
+                js = js["_raw"]
+            yield p, (d.get("request") or {}).get("url", ""), js if isinstance(js, str) else json.dumps(js, ensure_ascii=False)
+    for p in _paths("_netlog/*_RESP.txt"):
+        with contextlib.suppress(Exception):
+            head, _, body = _text(p).partition("\n")
+            yield p, head.split(" ", 1)[-1].strip(), body.strip()
+    for p in _paths("_har/*.har"):
+        with contextlib.suppress(Exception):
+            for e in json.loads(_text(p))["log"]["entries"]:
+                yield p, (e.get("request") or {}).get("url", ""), ((e.get("response") or {}).get("content") or {}).get("text") or ""
+
+
+def real_fixtures(tmp: Path | None = None) -> list[dict]:
+    seen, per, out = set(), {}, []
+    for src, url, text in _real_bodies():
+        if not text or text in ("{}", "[]", "null", '""'):
+            continue
+        h = hashlib.sha1(text.encode("utf-8", "ignore")).digest()
+        if h in seen:
+            continue
+        seen.add(h)
+        ep = _endpoint(url)
+        try:
+            js = json.loads(text)
+        except ValueError:
+            js = None
+        for kind in _KINDS.get(ep, ("raw",)):
+            if per.get((kind, ep), 0) >= PARSEBENCH_REAL_MAX:
+                continue
+            if kind == "raw":
+                data = text
+            elif kind == "items":
+                data = _first_list(js)
+            elif isinstance(js, dict):
+                data = js
+            else:
+                continue
+            per[(kind, ep)] = per.get((kind, ep), 0) + 1
+            out.append({"group": "real", "kind": kind, "name": f"{Path(src).name}:{ep}", "data": data})
+    hars = sorted(_paths("_har/*.har"), key=artifacts.mtime, reverse=True)[:PARSEBENCH_HAR_MAX]
+    for p in hars:
+        path = Path(p).resolve() if not p.startswith(artifacts.PREFIX) else None
+        if path is None and tmp is not None:      # parse_har_seats 는 파일 경로를 받음 → 아카이브 HAR 은 풀어서
+            path = tmp / f"real-{Path(p).name}"
+            path.write_bytes(artifacts.read_bytes(p))
+        if path is not None:
+            out.append({"group": "real", "kind": "har", "name": Path(p).name, "data": str(path)})
+    return out
+
+
+# ---------- 합성 픽스처 ----------
+_TYPES = [("일반석", "S01"), ("일반석", "S01"), ("일반석", "S01"), ("휠체어석", "W01"), ("부산은행석", "BNK1"), ("시야제한석", "E01")]
+_STATUS = ["SS01000", "SS01000", "SS02000", "SS03000"]
+
+
+def _seats(n: int, rnd: random.Random) -> list[dict]:
+    out = []
+    for i in range(n):
+        nm, cd = _TYPES[rnd.randrange(len(_TYPES))]
+        st = _STATUS[rnd.randrange(len(_STATUS))]
+        out.append({"seatId": f"{i + 1:06d}", "seatNo": str(i % 40 + 1), "x": i % 40, "y": i // 40,
+                    "seatTypeNm": nm, "seatTypeCode": cd, "seatStatusCd": st, "seatCnt": 1,
+                    "useYn": "Y" if rnd.random() > .02 else "N",
+                    "saleYn": "Y" if st == "SS01000" else "N", "rsvYn": "Y" if rnd.random() < .05 else "N"})
+    return out
+
+
+def _blocks(seats: list[dict], size: int = 50) -> list[tuple[int, int]]:
+    return [(len(seats[i:i + size]), sum(1 for s in seats[i:i + size] if s["seatStatusCd"] == "SS01000"))
+            for i in range(0, len(seats), size)]
+
+
+def _har_doc(sd: str, seats: list[dict]) -> dict:
+    tot, rem = len(seats), sum(1 for s in seats if s["seatStatusCd"] == "SS01000")
+    ent = lambda url, js: {"request": {"method": "POST", "url": url},
+                           "response": {"status": 200, "content": {"mimeType": "application/json",
+                                                                   "text": json.dumps(js, ensure_ascii=False)}}}
+    api = "https://filmonestopapi.maketicket.co.kr/api/v1"
+    return {"log": {"version": "1.2", "entries": [
+        ent(f"{api}/rs/blockSummary2", {"summary": [{"sdSeq": sd, "admissionTotalPersonCnt": tot, "admissionAvailPersonCnt": rem}]}),
+        ent(f"{api}/seat/GetRsSeatStatusList", {"sdSeq": sd, "list": seats}),
+    ]}}
+
+
+def synthetic_fixtures(tmp: Path, sizes=PARSEBENCH_SIZES) -> list[dict]:
+    out = []
+    for n in sizes:
+        rnd = random.Random(n)
+        seats = _seats(n, rnd)
+        g = f"syn-{n // 1000}k" if n >= 1000 else f"syn-{n}"
+        blocks = _blocks(seats)
+        agg = {}
+        for s in seats:
+            agg[s["seatStatusCd"]] = agg.get(s["seatStatusCd"], 0) + 1
+        tot, rem = len(seats), agg.get("SS01000", 0)
+        mixed = [json.dumps(s, ensure_ascii=False) if i % 10 == 0 else s for i, s in enumerate(seats)]
+        har = tmp / f"{g}.har"
+        har.write_text(json.dumps(_har_doc("1", seats), ensure_ascii=False), encoding="utf-8")
+        out += [
+            {"group": g, "kind": "items",  "name": f"{g}:seat-rows", "data": seats},
+            {"group": g, "kind": "items",  "name": f"{g}:status-agg",
+             "data": [{"seatStatusCd": k, "seatCnt": str(v)} for k, v in agg.items()]},
+            {"group": g, "kind": "status", "name": f"{g}:seatList", "data": {"seatList": seats, "list": seats}},
+            {"group": g, "kind": "zone",   "name": f"{g}:blockSummary2",
+             "data": {"summary": {"totalSeatCnt": f"{tot:,}", "rmnSeatCnt": rem},
+                      "blockList": [{"totSeatCnt": t, "rmnSeatCnt": str(r)} for t, r in blocks]}},
+            {"group": g, "kind": "zone",   "name": f"{g}:baseMap",
+             "data": {"zoneList": [{"totalCnt": t, "remainCnt": r} for t, r in blocks]}},
+            {"group": g, "kind": "nrs",    "name": f"{g}:nrs",
+             "data": {"blockList": [{"total_cnt": t, "remain_cnt": r} for t, r in blocks],
+                      "summary": {"totalCnt": tot, "remainCnt": rem}}},
+            {"group": g, "kind": "raw",    "name": f"{g}:text", "data": json.dumps({"list": seats}, ensure_ascii=False)},
+            {"group": g, "kind": "raw",    "name": f"{g}:mixed", "data": mixed},
+            {"group": g, "kind": "har",    "name": f"{g}:har", "data": str(har)},
+        ]
+    return out
+
+
+# ---------- 측정 ----------
+def _ops(call, fn, batch) -> float:
+    for fx in batch:                       # 워밍업 (schemadec 학습 포함)
+        call(fn, fx["data"])
+    n, t0 = 0, time.perf_counter()
+    while True:
+        for fx in batch:
+            call(fn, fx["data"])
+        n += len(batch)
+        el = time.perf_counter() - t0
+        if el >= PARSEBENCH_SEC and n >= 3 * len(batch):
+            return n / el
+
+
+def _peak_kb(call, fn, batch) -> float:
+    peak = 0
+    tracemalloc.start()
+    try:
+        for fx in batch:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            call(fn, fx["data"])
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def _batches(fixtures, kind):
+    by = {}
+    for fx in fixtures:
+        if fx["kind"] == kind:
+            by.setdefault(fx["group"], []).append(fx)
+    return by
+
+
+def bench(mod, fixtures, only=None) -> list[dict]:
+    rows = []
+    for name, (kind, call) in TARGETS.items():
+        if only and name not in only: continue
+        fn = getattr(mod, name, None)
+        if fn is None: continue
+        for g, batch in _batches(fixtures, kind).items():
+            ops = _ops(call, fn, batch)
+            rows.append({"fn": name, "group": g, "fixtures": len(batch), "ops": round(ops, 1),
+                         "us": round(1e6 / ops, 1), "peak_kb": round(_peak_kb(call, fn, batch), 1)})
+    return rows
+
+
+def equiv(base, cand, fixtures, only=None) -> tuple[list[dict], list[str]]:
+    rows, bad = [], []
+    for name, (kind, call) in TARGETS.items():
+        if only and name not in only: continue
+        fb, fc = getattr(base, name, None), getattr(cand, name, None)
+        if fb is None or fc is None:
+            bad.append(f"{name}: 함수 없음 (base={fb is not None} cand={fc is not None})"); continue
+        for fx in fixtures:
+            if fx["kind"] != kind: continue
+            try: rb = call(fb, fx["data"])
+            except Exception as e: rb = f"ERR:{type(e).__name__}"
+            try: rc = call(fc, fx["data"])
+            except Exception as e: rc = f"ERR:{type(e).__name__}"
+            if rb != rc:
+                bad.append(f"{name} [{fx['name']}] base={str(rb)[:120]} cand={str(rc)[:120]}")
+        for g, batch in _batches(fixtures, kind).items():
+            ob, oc = _ops(call, fb, batch), _ops(call, fc, batch)
+            rows.append({"fn": name, "group": g, "base_us": round(1e6 / ob, 1), "cand_us": round(1e6 / oc, 1),
+                         "speedup": round(oc / ob, 2)})
+    return rows, bad
+
+
+def format_bench(rows, prev=None) -> list[str]:
+    ref = {(r["fn"], r["group"]): r for r in (prev or [])}
+    out = [f"  {'function':<28} {'group':<8} {'n':>4} {'ops/s':>11} {'µs/op':>10} {'peakKB':>9}" + ("  vs saved" if ref else "")]
+    for r in rows:
+        ln = f"  {r['fn']:<28} {r['group']:<8} {r['fixtures']:>4} {r['ops']:>11,.0f} {r['us']:>10,.1f} {r['peak_kb']:>9,.1f}"
+        p = ref.get((r["fn"], r["group"]))
+        if p:
+            ln += f"  x{r['ops'] / p['ops']:.2f}"
+        out.append(ln)
+    return out
+
+
+def main(argv=None) -> int:
+    a = list(sys.argv[1:] if argv is None else argv)
+    def opt(k, d=None):
+        if k not in a: return d
+        i = a.index(k); v = a[i + 1]; del a[i:i + 2]
+        return v
+    jpath, cmp_path, rev, alt = opt("--json"), opt("--compare"), opt("--baseline", "HEAD"), opt("--alt")
+    only = set((opt("--only") or "").split(",")) - {""}
+    with tempfile.TemporaryDirectory(prefix="parsebench-fx-") as tmp:
+        fixtures = real_fixtures(Path(tmp)) + synthetic_fixtures(Path(tmp))
+        kinds = {}
+        for fx in fixtures:
+            kinds[fx["kind"]] = kinds.get(fx["kind"], 0) + 1
+        print(f"[PARSEBENCH] fixtures={len(fixtures)} " + " ".join(f"{k}={v}" for k, v in sorted(kinds.items())))
+        cur = load_current()
+        if "--equiv" in a:
+            cand = cur
+            if alt:
+                cand = type(sys)("parsebench_cand")
+                cand.__dict__.update({n: getattr(cur, n) for n in TARGETS if hasattr(cur, n)})
+                cand.__dict__.update({n: f for n, f in vars(importlib.import_module(alt)).items() if n in TARGETS})
+            rows, bad = equiv(load_rev(rev), cand, fixtures, only)
+            print(f"[PARSEBENCH] equiv base={rev} cand={alt or 'working tree'}")
+            for r in rows:
+                print(f"  {r['fn']:<28} {r['group']:<8} base={r['base_us']:>10,.1f}µs cand={r['cand_us']:>10,.1f}µs x{r['speedup']:.2f}")
+            for b in bad[:40]:
+                print(f"  ✗ {b}")
+            print(f"[PARSEBENCH] equiv {'OK' if not bad else f'FAIL ({len(bad)})'}")
+            return 1 if bad else 0
+        rows = bench(cur, fixtures, only)
+    prev = None
+    if cmp_path:
+        with contextlib.suppress(Exception):
+            prev = artifacts.load_json(cmp_path)["rows"]     # 이미 pack 된 기준선은 archive:경로 로
+    for ln in format_bench(rows, prev):
+        print(ln)
+    if jpath:
+        top = Path(jpath).resolve().relative_to(Path.cwd()).parts[0] if Path(jpath).resolve().is_relative_to(Path.cwd()) else ""
+        if top in artifacts.ARCHIVE_SRC:
+            print(f"[PARSEBENCH] ⚠ {top}/ 는 artifacts pack 대상(ARCHIVE_SRC) — 기준선은 _bench/ 같은 곳에 두세요")
+        Path(jpath).parent.mkdir(parents=True, exist_ok=True)
+        Path(jpath).write_text(json.dumps({"when": time.strftime("%Y-%m-%dT%H:%M:%S"), "sizes": PARSEBENCH_SIZES,
+                                           "rows": rows}, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"[PARSEBENCH] → {jpath}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# 호스트 단위 토큰버킷 레이트리미터 (bf / bt / biff_patched / biff_autobook_unified 공용)
+# - 호스트마다 버킷 하나: rate(초당 토큰) + burst(최대 적립)
+# - 우선순위: BOOK(상태 변경) > WARM(세션 워밍업) > SNAP(읽기 전용 스냅샷)
+# - 대기열 시간(queue time) 통계: 호스트/우선순위별 count, avg, p95, max
+# 사용:
+#   from ratelimit import RL
+#   async with RL.slot(url):            # 우선순위는 URL/메서드로 자동 분류
+#       resp = await req.fetch(url, ...)
+# ENV:
+#   RL_ENABLE=1            0이면 통과(대기 없음, 통계만)
+#   RL_RATE=6              호스트당 초당 요청 수
+#   RL_BURST=3             순간 허용량
+#   RL_HOSTS="filmapi.maketicket.co.kr=2:2,filmonestopapi.maketicket.co.kr=6:3"  호스트별 오버라이드
+#   RL_REPORT=1            종료 요약에 통계 출력
+
+import asyncio, heapq, itertools, os, re, time
+from collections import deque
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+RL_ENABLE = os.getenv("RL_ENABLE", "1") == "1"
+RL_RATE   = float(os.getenv("RL_RATE", "6"))
+RL_BURST  = float(os.getenv("RL_BURST", "3"))
+RL_REPORT = os.getenv("RL_REPORT", "1") == "1"
+
+PRIO_BOOK, PRIO_WARM, PRIO_SNAP = 0, 1, 2
+PRIO_NAME = {PRIO_BOOK: "BOOK", PRIO_WARM: "WARM", PRIO_SNAP: "SNAP"}
+
+# 읽기 전용(스냅샷) / 세션 워밍업 경로 — 나머지 POST는 예매 진행(BOOK)으로 본다
+RX_SNAP = re.compile(r"(prodSummary|blockSummary2|GetRsSeatBaseMap|GetRsSeatStatusList|GetRsZoneSeatMapInfo"
+                     r"|tickettype|prodList|seatBaseMap|seatStatusList)", re.I)
+RX_WARM = re.compile(r"(/rs/prod$|/rs/prodChk|/rs/chkProdSdSeq|/rs/informLimit|/rs/prod\?)", re.I)
+
+
+def _parse_hosts(s: str) -> dict:
+    out = {}
+    for part in (s or "").split(","):
+        part = part.strip()
+        if "=" not in part: continue
+        host, spec = part.split("=", 1)
+        try:
+            r, _, b = spec.partition(":")
+            out[host.strip().lower()] = (float(r), float(b or r))
+        except Exception:
+            pass
+    return out
+
+RL_HOSTS = _parse_hosts(os.getenv("RL_HOSTS", ""))
+
+
+def host_of(url: str) -> str:
+    try:
+        return (urlsplit(url).hostname or "").lower()
+    except Exception:
+        return ""
+
+
+def classify(url: str, method: str = "POST") -> int:
+    """URL/메서드 → 우선순위 클래스. GET과 조회성 API는 SNAP."""
+    path = urlsplit(url or "").path or ""
+    if RX_SNAP.search(path):
+        return PRIO_SNAP
+    if RX_WARM.search(path):
+        return PRIO_WARM
+    if (method or "GET").upper() == "GET":
+        return PRIO_SNAP
+    return PRIO_BOOK
+
+
+class _Bucket:
+    def __init__(self, host: str, rate: float, burst: float):
+        self.host = host
+        self.rate = max(rate, 0.01)
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.t_last = time.monotonic()
+        self.waiters = []          # heap: (prio, seq, fut)
+        self.drain = None          # 대기열 처리 task
+        self.loop = None           # asyncio.run 재호출(재시도 루프) 대비
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.t_last) * self.rate)
+        self.t_last = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if not self.waiters and self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    async def _drain(self):
+        # 우선순위가 높은(숫자 작은) 대기자부터 토큰 배분
+        while self.waiters:
+            self._refill()
+            if self.tokens < 1.0:
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+                continue
+            _, _, fut = heapq.heappop(self.waiters)
+            if fut.done():         # 취소된 대기자
+                continue
+            self.tokens -= 1.0
+            fut.set_result(None)
+        self.drain = None
+
+
+class HostRateLimiter:
+    def __init__(self, rate: float = RL_RATE, burst: float = RL_BURST, overrides: dict | None = None):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = dict(overrides or {})
+        self.buckets: dict[str, _Bucket] = {}
+        self._seq = itertools.count()
+        # (host, prio) → 대기시간(ms) 최근 512개 + 누적
+        self.waits: dict[tuple, deque] = {}
+        self.totals: dict[tuple, list] = {}   # [count, sum_ms, max_ms]
+
+    def bucket(self, host: str) -> _Bucket:
+        b = self.buckets.get(host)
+        if b is None:
+            r, bu = self.overrides.get(host, (self.rate, self.burst))
+            b = self.buckets[host] = _Bucket(host, r, bu)
+        return b
+
+    def _record(self, host: str, prio: int, ms: float):
+        k = (host, prio)
+        self.waits.setdefault(k, deque(maxlen=512)).append(ms)
+        t = self.totals.setdefault(k, [0, 0.0, 0.0])
+        t[0] += 1; t[1] += ms; t[2] = max(t[2], ms)
+
+    async def acquire(self, url: str, prio: int | None = None, method: str = "POST") -> float:
+        """토큰 1개 획득까지 대기. 대기시간(ms) 반환."""
+        host = host_of(url)
+        if prio is None:
+            prio = classify(url, method)
+        t0 = time.monotonic()
+        if RL_ENABLE and host:
+            b = self.bucket(host)
+            loop = asyncio.get_running_loop()
+            if b.loop is not loop:
+                b.loop, b.waiters, b.drain = loop, [], None
+            if not b.try_take():
+                fut = loop.create_future()
+                heapq.heappush(b.waiters, (prio, next(self._seq), fut))
+                if b.drain is None or b.drain.done():
+                    b.drain = asyncio.create_task(b._drain())
+                await fut
+        ms = (time.monotonic() - t0) * 1000.0
+        self._record(host or "-", prio, ms)
+        return ms
+
+    @asynccontextmanager
+    async def slot(self, url: str, prio: int | None = None, method: str = "POST"):
+        await self.acquire(url, prio, method)
+        yield
+
+    def stats(self) -> dict:
+        out = {}
+        for (host, prio), t in sorted(self.totals.items()):
+            w = sorted(self.waits.get((host, prio)) or [0.0])
+            p95 = w[min(len(w) - 1, int(len(w) * 0.95))]
+            out.setdefault(host, {})[PRIO_NAME.get(prio, str(prio))] = {
+                "n": t[0], "avg_ms": round(t[1] / max(t[0], 1), 1),
+                "p95_ms": round(p95, 1), "max_ms": round(t[2], 1),
+            }
+        return out
+
+    def report(self) -> list[str]:
+        lines = []
+        for host, per in self.stats().items():
+            parts = [f"{k} n={v['n']} avg={v['avg_ms']}ms p95={v['p95_ms']}ms max={v['max_ms']}ms"
+                     for k, v in per.items()]
+            lines.append(f"[RL] {host}: " + " | ".join(parts))
+        return lines
+
+
+RL = HostRateLimiter(overrides=RL_HOSTS)
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+# 요청 기록 파이프라인 (한 번 캡처 → 상관 id → 싱크로 팬아웃)
+# - 기존: fetch_json 한 번에 _netlog_req/_netlog_resp(파일) + HAR.on_req/on_resp(메모리 HAR, 응답마다 전체 재기록)
+#         + trace_step(JSONL) + 컨텍스트 record_har_path 까지 같은 요청을 3~4번 직렬화, 서로 연결할 id 없음
+# - 여기: 호출 지점은 begin()/end() 로 Rec 하나만 만들고 큐에 넣음 → 백그라운드 스레드가 켜진 싱크에만 기록
+#         상관 id = "{RUN_ID}/{sdCode}/{seq}" (HAR _cid, NDJSON cid, netlog 파일명 seq 공통)
+# - 싱크 (REC_SINKS, 콤마 구분):
+#     har    : HAR_DIR/capture_{RUN_ID}.har (REC_FLUSH_SEC 마다 + 종료 시 기록, 실제 timings 포함)
+#     ndjson : REC_DIR/rec-{RUN_ID}.ndjson (요청당 한 줄: cid/상태/구간 ms/크기/오류)
+#     netlog : 기존 [NET] 콘솔 요약 + LOG_POST_DIR 에 REQ.json(가린 form + 호출 스택)/RESP.txt
+#              원문 본문은 LOG_POST_BODY_RAW=1 일 때만 (REQ.json raw_body + REQ.raw.txt)
+#     metrics: rs_queue_ms / rs_response_bytes 히스토그램 (지연·in-flight 는 metrics.request 가 이미 기록)
+#     pwhar  : 브라우저 컨텍스트 record_har_path (Playwright 자체 HAR, pw_har_kwargs() 로 적용)
+#   기본값은 이전 스위치를 따름: HAR_ENABLE=1 → har, LOG_POST_BODY=1 → netlog, + pwhar
+# 사용:
+#   rec = REC.begin(url, method, headers, body_text, timing)
+#   ...; REC.end(rec, status, resp_headers, text)   (예외면 REC.end(rec, 0, None, "", error=str(e)))
+# ENV: REC_SINKS, REC_DIR=./_rec, REC_FLUSH_SEC=5, REC_BODY_MAX=0 (ndjson 응답 본문 앞부분 글자 수)
+
+import atexit, json, os, pathlib, queue, threading, time, traceback, urllib.parse
+
+import metrics
+from harstat import iso_ms
+
+RUN_ID = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid() % 10000:04d}"
+
+_DEFAULT_SINKS = ",".join(s for s, on in (
+    ("har", os.getenv("HAR_ENABLE", "1") == "1"),
+    ("netlog", os.getenv("LOG_POST_BODY", "1") == "1"),
+    ("pwhar", True),
+) if on)
+REC_SINKS = {s.strip() for s in os.getenv("REC_SINKS", _DEFAULT_SINKS).split(",") if s.strip()}
+REC_DIR = os.getenv("REC_DIR", "./_rec")
+REC_FLUSH_SEC = float(os.getenv("REC_FLUSH_SEC", "5"))
+REC_BODY_MAX = int(os.getenv("REC_BODY_MAX", "0"))
+
+HAR_DIR = os.getenv("HAR_DIR", "./_har")
+NETLOG_RAW = os.getenv("LOG_POST_BODY_RAW", "0") == "1"
+NETLOG_DIR = os.getenv("LOG_POST_DIR", "./_netlog")
+NETLOG_SILENTOK = os.getenv("LOG_POST_SILENT_OK", "0") == "1"
+MASK_CSRF = False     # True면 X-CSRF-TOKEN / csrfToken 도 가림
+SENSITIVE_KEYS = {
+    "password", "pass", "pin", "card", "cardno",
+    "rrn", "resident", "birth", "mobileauth", "otp", "auth"
+}
+
+
+class Rec:
+    __slots__ = ("cid", "seq", "sd", "url", "method", "headers", "body", "timing", "stack",
+                 "status", "resp_headers", "text", "error")
+    def __init__(self, seq, sd, url, method, headers, body, timing, stack):
+        self.cid = f"{RUN_ID}/{sd or '-'}/{seq}"
+        self.seq, self.sd, self.url, self.method = seq, sd, url, method
+        self.headers, self.body, self.timing, self.stack = headers, body, timing, stack
+        self.status, self.resp_headers, self.text, self.error = 0, None, "", None
+
+
+def _short(s: str, n: int = 240) -> str:
+    s = s or ""
+    return s if len(s) <= n else s[:n] + "…"
+
+
+def _redact_form(form: dict) -> dict:
+    out = {}
+    for k, v in form.items():
+        lk = k.lower()
+        out[k] = "***" if lk in SENSITIVE_KEYS or (lk == "csrftoken" and MASK_CSRF) else v
+    return out
+
+
+def _as_form(r: "Rec") -> dict | None:
+    """요청 본문 → dict (form-urlencoded / JSON 객체). 아니면 None (원문은 NETLOG_RAW 일 때만 기록)."""
+    body = r.body or ""
+    if not body:
+        return None
+    ct = str((r.headers or {}).get("Content-Type") or "").lower()
+    if "json" in ct or body.lstrip().startswith("{"):
+        try:
+            d = json.loads(body)
+            return d if isinstance(d, dict) else None
+        except ValueError:
+            return None
+    if "=" in body:
+        return dict(urllib.parse.parse_qsl(body, keep_blank_values=True))
+    return None
+
+
+# ---------- 싱크 ----------
+class HarSink:
+    def __init__(self):
+        self.path = pathlib.Path(HAR_DIR) / f"capture_{RUN_ID}.har"
+        self.entries = []
+        self.t_flush = time.monotonic()
+        self.dirty = False
+
+    def write(self, r: Rec):
+        qs = urllib.parse.parse_qs(urllib.parse.urlparse(r.url).query or "")
+        rh = r.resp_headers or {}
+        size = len((r.text or "").encode("utf-8"))
+        ent = {
+            "startedDateTime": iso_ms(r.timing.wall if r.timing else time.time()),
+            "time": 0,
+            "request": {
+                "method": r.method, "url": r.url, "httpVersion": "HTTP/1.1",
+                "headers": [{"name": k, "value": str(v)} for k, v in (r.headers or {}).items()],
+                "queryString": [{"name": k, "value": (v[0] if v else "")} for k, v in qs.items()],
+                "headersSize": -1,
+                "bodySize": len((r.body or "").encode("utf-8")),
+            },
+            "response": {
+                "status": int(r.status or 0), "statusText": r.error or "", "httpVersion": "HTTP/1.1",
+                "headers": [{"name": k, "value": str(v)} for k, v in rh.items()], "cookies": [],
+                "content": {"size": size, "mimeType": rh.get("content-type", ""), "text": r.text or ""},
+                "redirectURL": "", "headersSize": -1, "bodySize": size,
+            },
+            "cache": {},
+            "timings": {"send": 0, "wait": 0, "receive": 0},
+            "_cid": r.cid, "_sd": r.sd,
+        }
+        if r.timing is not None:
+            ent.update(r.timing.har())
+        if r.body:
+            ent["request"]["postData"] = {
+                "mimeType": (r.headers or {}).get("Content-Type", "application/x-www-form-urlencoded"),
+                "text": r.body}
+        self.entries.append(ent)
+        self.dirty = True
+        if time.monotonic() - self.t_flush >= REC_FLUSH_SEC:
+            self.flush()
+
+    def flush(self):
+        if not self.dirty: return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        log = {"log": {"version": "1.2", "creator": {"name": "biff_har", "version": "1.1"},
+                       "entries": self.entries}}
+        tmp = self.path.with_suffix(".har.tmp")
+        tmp.write_text(json.dumps(log, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.t_flush, self.dirty = time.monotonic(), False
+
+    close = flush
+
+
+class NdjsonSink:
+    def __init__(self):
+        self.path = pathlib.Path(REC_DIR) / f"rec-{RUN_ID}.ndjson"
+        self.f = None
+
+    def write(self, r: Rec):
+        if self.f is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.f = self.path.open("a", encoding="utf-8")
+        d = {"cid": r.cid, "run": RUN_ID, "sd": r.sd, "seq": r.seq, "method": r.method, "url": r.url,
+             "status": r.status, "req_bytes": len((r.body or "").encode("utf-8")),
+             "resp_bytes": len((r.text or "").encode("utf-8"))}
+        if r.timing is not None:
+            h = r.timing.har()
+            d.update(ts=r.timing.wall, ms=h["time"], queue_ms=h["_queue_ms"], wait_ms=h["timings"]["wait"])
+        if r.error: d["error"] = r.error
+        if REC_BODY_MAX: d["body"] = (r.text or "")[:REC_BODY_MAX]
+        self.f.write(json.dumps(d, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        if self.f: self.f.flush()
+
+    def close(self):
+        if self.f: self.f.close(); self.f = None
+
+
+class NetlogSink:
+    """기존 NETLOG 출력 그대로 (콘솔 요약 + 요청/응답 파일)."""
+    def _file(self, fname: str, content: str):
+        try:
+            pathlib.Path(NETLOG_DIR).mkdir(parents=True, exist_ok=True)
+            with open(pathlib.Path(NETLOG_DIR) / fname, "w", encoding="utf-8") as f:
+                f.write(content)
+        except Exception as e:
+            print(f"[NET] file write fail: {e}")
+
+    def write(self, r: Rec):
+        h = r.headers or {}
+        ts = time.strftime("%Y%m%d-%H%M%S", time.localtime(r.timing.wall if r.timing else time.time()))
+        safe_hdr = {
+            "Content-Type": h.get("Content-Type"), "Origin": h.get("Origin"), "Referer": h.get("Referer"),
+            "X-Requested-With": h.get("X-Requested-With"),
+            "X-CSRF-TOKEN": ("***" if h.get("X-CSRF-TOKEN") and MASK_CSRF else h.get("X-CSRF-TOKEN")),
+        }
+        print(f"[NET] ↗️ {r.method} #{r.seq} {r.url}")
+        print(f"[NET]     headers: {json.dumps(safe_hdr, ensure_ascii=False)}")
+        form = _as_form(r)
+        if form is not None:
+            form = _redact_form(form)
+            print(f"[NET]     form: {json.dumps(form, ensure_ascii=False)}")
+        elif NETLOG_RAW:
+            print(f"[NET]     body: {_short(r.body)}")
+        payload = {"url": r.url, "headers": h, "form": form, "raw_body": r.body if NETLOG_RAW else None,
+                   "stack": r.stack or "", "ts": ts, "seq": r.seq, "cid": r.cid}
+        self._file(f"{ts}_{r.seq:04d}_REQ.json", json.dumps(payload, ensure_ascii=False, indent=2))
+        if NETLOG_RAW:
+            self._file(f"{ts}_{r.seq:04d}_REQ.raw.txt", r.body or "")
+        short = _short(r.text if not r.error else f"ERROR {r.error}", 500)
+        if r.status == 200 and NETLOG_SILENTOK:
+            print(f"[NET] ↘️ RESP #{r.seq} {r.status} {r.url}")
+        else:
+            print(f"[NET] ↘️ RESP #{r.seq} {r.status} {r.url} — {_short(short, 200)}")
+        self._file(f"{ts}_{r.seq:04d}_RESP.txt", f"{r.status} {r.url}\n\n{short}")
+
+    def flush(self): pass
+    close = flush
+
+
+class MetricsSink:
+    def write(self, r: Rec):
+        ep = metrics.endpoint_of(r.url)
+        metrics.M.observe("rs_response_bytes", {"endpoint": ep}, len((r.text or "").encode("utf-8")))
+        if r.timing is not None:
+            metrics.M.observe("rs_queue_ms", {"endpoint": ep, "sd": r.sd}, r.timing.har()["_queue_ms"])
+
+    def flush(self): pass
+    close = flush
+
+
+_SINK_TYPES = {"har": HarSink, "ndjson": NdjsonSink, "netlog": NetlogSink, "metrics": MetricsSink}
+
+
+# ---------- 파이프라인 ----------
+class Recorder:
+    def __init__(self, names=REC_SINKS):
+        self.names = set(names)
+        self.sinks = {n: _SINK_TYPES[n]() for n in _SINK_TYPES if n in self.names}
+        self.q = queue.SimpleQueue()
+        self.n = 0
+        self.thread = None
+        self.lock = threading.Lock()
+        self.errors = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self.sinks)
+
+    @property
+    def wants_body(self) -> bool:
+        """요청 본문 문자열이 필요한 싱크가 켜져 있나 (없으면 호출부에서 만들지 않음)."""
+        return "har" in self.sinks or "netlog" in self.sinks or "ndjson" in self.sinks
+
+    def begin(self, url, method, headers, body="", timing=None) -> Rec:
+        stack = "".join(traceback.format_stack(limit=14)) if "netlog" in self.sinks else None
+        self.n += 1
+        return Rec(self.n, metrics.SD.get(), url, method, headers, body, timing, stack)
+
+    def end(self, rec: Rec, status=0, headers=None, text="", error=None):
+        if not self.sinks:
+            return
+        rec.status, rec.resp_headers, rec.text, rec.error = status, headers, text, error
+        self._ensure_thread()
+        self.q.put(rec)
+
+    def _ensure_thread(self):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+                    self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                r = self.q.get(timeout=REC_FLUSH_SEC)
+            except queue.Empty:
+                self._each("flush")
+                continue
+            if r is None:
+                break
+            for n, s in self.sinks.items():
+                try:
+                    s.write(r)
+                except Exception as e:
+                    self.errors += 1
+                    if self.errors <= 3:
+                        print(f"[REC] {n} sink 실패: {e}", flush=True)
+
+    def _each(self, meth: str):
+        for s in self.sinks.values():
+            try: getattr(s, meth)()
+            except Exception: pass
+
+    def close(self):
+        if self.thread is not None:
+            self.q.put(None)
+            self.thread.join(timeout=10)
+        self._each("close")
+
+    def report(self) -> str:
+        return f"[REC] run={RUN_ID} sinks={','.join(self.sinks) or '-'} seq={self.n} errors={self.errors}"
+
+
+def pw_har_kwargs(path: str = "rs_trace.har") -> dict:
+    """new_context(**pw_har_kwargs()) — pwhar 싱크가 켜져 있을 때만 Playwright HAR 기록."""
+    if "pwhar" not in REC_SINKS:
+        return {}
+    return {"record_har_path": path, "record_har_omit_content": False}
+
+
+REC = Recorder()
+atexit.register(REC.close)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# 응답 스키마 학습 디코더 (snake/camel 변형 키 probing 제거)
+# - 기존: 행마다 d.get("total_cnt") or d.get("totalCnt") or d.get("plan_cnt") ... 를 매번 전부 탐색
+# - 여기: 엔드포인트별 디코더가 행에 실제 존재하는 후보 키 집합별로 추출 함수를 한 번 컴파일 → 이후 재사용
+#         캐시 키 = 후보 키 중 행에 있는 것 전체 (개수/일부만 보면 우선순위 높은 키가 새로 생긴 행에 옛 모양이 쓰임)
+# - 의미는 기존 `a or b or c` 체인과 동일 (없는 키는 None 취급이므로 존재하는 키만 남겨도 결과 같음)
+# 사용:
+#   NRS_BLOCK = fields("sum_nrs.block", total=("total_cnt", "totalCnt"), remain=("remain_cnt", "remainCnt"))
+#   for b in rows: t, r = NRS_BLOCK(b)
+#   STATUS_LIST = lister("statusList", ("rsSeatStatusList", "list"), nested=("data", "result"))
+#   rows = STATUS_LIST(payload)
+#   for k in present(d, ("a", "b", "c")): ...      # 키 순서 유지, d에 있는 것만
+#   report()  → 디코더별 학습 횟수/재사용 수/학습된 키
+# - offload 스레드에서도 같은 디코더를 씀 → 학습 결과는 한 번의 대입으로만 공개 (fns[keys] = fn, shape = 튜플)
+#   동시에 학습하면 같은 함수를 두 번 만들 뿐 잘못된 추출 함수가 쓰이지는 않음
+# ENV: SCHEMA_LEARN=1 (0이면 매번 전체 키 탐색 = 기존 동작, 비교용)
+
+import os
+
+SCHEMA_LEARN = os.getenv("SCHEMA_LEARN", "1") == "1"
+
+REGISTRY: dict = {}     # name → Fields | Lister
+
+
+class Fields:
+    """dict 행 → 필드 튜플. 필드마다 후보 키 목록(우선순위 순)."""
+    def __init__(self, name: str, spec: dict):
+        self.name = name
+        self.names = tuple(spec)
+        self.cands = tuple(tuple(v) for v in spec.values())
+        self.shape = None          # 마지막으로 학습한 키들 (report 용)
+        self.fns: dict = {}        # 행에 있는 후보 키 튜플 → 추출 함수
+        self.learns = self.hits = 0
+        self.slow = self._build([c for c in self.cands])
+
+    def _build(self, present) -> "callable":
+        exprs = []
+        for cand, ks in zip(self.cands, present):
+            if not ks:
+                exprs.append("None")
+                continue
+            e = " or ".join(f"d.get({k!r})" for k in ks)
+            if ks[-1] != cand[-1]:
+                e += " or None"    # 원래 체인의 마지막 키가 없으면 falsy 값 대신 None (기존과 동일)
+            exprs.append(f"({e})")
+        src = f"def _x(d):\n    return ({', '.join(exprs)}{',' if len(exprs) == 1 else ''})\n"
+        ns = {}
+        exec(src, ns)
+        return ns["_x"]
+
+    def learn(self, d: dict, keys: tuple):
+        present = [tuple(k for k in cand if k in d) for cand in self.cands]
+        fn = self.fns[keys] = self._build(present)
+        self.shape = keys
+        self.learns += 1
+        return fn
+
+    def __call__(self, d):
+        if not isinstance(d, dict):
+            return (None,) * len(self.cands)
+        if not SCHEMA_LEARN:
+            return self.slow(d)
+        keys = tuple(k for cand in self.cands for k in cand if k in d)
+        fn = self.fns.get(keys)
+        if fn is None:
+            fn = self.learn(d, keys)
+        else:
+            self.hits += 1
+        return fn(d)
+
+
+class Lister:
+    """응답 어디에 있는 list를 꺼내는 경로 학습. keys 중 첫 list, 없으면 nested[*].list."""
+    def __init__(self, name: str, keys, nested=(), inner: str = "list"):
+        self.name = name
+        self.keys = tuple(keys)
+        self.nested = tuple(nested)
+        self.inner = inner
+        self.shape = None          # (len, ("k",) 또는 ("data", "list"), 그보다 앞선 keys)
+        self.learns = self.hits = 0
+
+    def _probe(self, p: dict):
+        for k in self.keys:
+            if isinstance(p.get(k), list):
+                return (k,)
+        for k in self.nested:
+            v = p.get(k)
+            if isinstance(v, dict) and isinstance(v.get(self.inner), list):
+                return (k, self.inner)
+        return None
+
+    @staticmethod
+    def _walk(p, path):
+        for k in path:
+            p = p.get(k) if isinstance(p, dict) else None
+        return p
+
+    def __call__(self, payload) -> list:
+        if not isinstance(payload, dict):
+            return []
+        sh = self.shape
+        if SCHEMA_LEARN and sh and sh[0] == len(payload):
+            path, before = sh[1], sh[2]
+            v = self._walk(payload, path)
+            # 학습된 키보다 우선순위 높은 키에 list 가 생겼으면 재탐색
+            if isinstance(v, list) and not any(isinstance(payload.get(k), list) for k in before):
+                self.hits += 1
+                return v
+        path = self._probe(payload)
+        if path is None:
+            return []
+        before = self.keys[:self.keys.index(path[0])] if path[0] in self.keys else self.keys
+        self.shape = (len(payload), path, before)
+        self.learns += 1
+        return self._walk(payload, path)
+
+
+def fields(name: str, /, **spec) -> Fields:
+    # name 은 위치 전용 → 필드 이름으로 name=(...) 도 쓸 수 있음 (seat.label, tickettype.row 등)
+    d = REGISTRY.get(name)
+    if d is None:
+        d = REGISTRY[name] = Fields(name, spec)
+    return d
+
+
+def lister(name: str, keys, nested=(), inner: str = "list") -> Lister:
+    d = REGISTRY.get(name)
+    if d is None:
+        d = REGISTRY[name] = Lister(name, keys, nested, inner)
+    return d
+
+
+def present(d: dict, keys: tuple) -> tuple:
+    """keys 중 d에 있는 것만 (순서 유지).
+    (예전엔 keys 별 모양 캐시를 뒀지만, 올바르게 하려면 후보를 전부 확인해야 해서 캐시 이득이 없음)"""
+    if not isinstance(d, dict):
+        return ()
+    return tuple(k for k in keys if k in d)
+
+
+def report() -> list[str]:
+    out = []
+    for name in sorted(REGISTRY):
+        dec = REGISTRY[name]
+        if not (dec.learns or dec.hits): continue
+        sh = dec.shape or ()
+        keys = sh[1] if isinstance(dec, Lister) and sh else sh
+        out.append(f"[SCHEMA] {name}: learn={dec.learns} hit={dec.hits} keys={list(keys)}")
+    return out
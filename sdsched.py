@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# sdCode 작업 큐 우선순위 스케줄러 (Semaphore FIFO 대체)
+# - 최근 스냅샷(잔여/좌석종류/plan) + 사용자 우선순위로 점수 → 높은 점수부터 슬롯 배정
+# - 잔여 0으로 확인된 회차는 low lane: 메인 lane이 빌 때만 실행
+# - note_snapshot()으로 새 스냅샷이 들어오면 대기 중인 항목 재점수
+# 사용:
+#   sched = SdScheduler(codes, concurrency)
+#   results = await sched.run(worker, on_result=None)   # on_result(sd, r) → True면 재투입
+#   results = await sched.run(worker, limiter=SHOWS)    # aimd.AdaptiveLimiter로 슬롯 수 가변
+# ENV:
+#   SD_PRIORITY="001=10,911=5"   사용자 우선순위(클수록 먼저)
+#   SEAT_PREF="GENERAL,WHEELCHAIR,BNK"
+#   SCHED_USE_STORE=1            시작 시 snapstore(SQLite) 최신값으로 점수 시드
+
+import asyncio, heapq, itertools, json, os, weakref
+
+SEAT_PREF = [s.strip().upper() for s in os.getenv("SEAT_PREF", "GENERAL,WHEELCHAIR,BNK").split(",") if s.strip()]
+SCHED_USE_STORE = os.getenv("SCHED_USE_STORE", "1") == "1"
+
+def _parse_prio(s: str) -> dict:
+    out = {}
+    for kv in (s or "").split(","):
+        if "=" in kv:
+            k, v = kv.split("=", 1)
+            try: out[k.strip()] = float(v)
+            except: pass
+    return out
+
+SD_PRIORITY = _parse_prio(os.getenv("SD_PRIORITY", ""))
+
+LANE_MAIN, LANE_LOW = 0, 1
+
+# sdCode → {"plan","total","remain","bySeatType"}
+LATEST: dict[str, dict] = {}
+_ACTIVE: "weakref.WeakSet[SdScheduler]" = weakref.WeakSet()
+
+
+def _toi(x):
+    try: return int(x)
+    except: return None
+
+
+def note_snapshot(snap: dict | None, sd: str | None = None):
+    """스냅샷(snapshot_sd / force_snapshot_and_hold / seat_stats 결과 등)을 점수표에 반영."""
+    if not isinstance(snap, dict):
+        return
+    sd = str(sd or snap.get("sdCode") or "")
+    if not sd or snap.get("__error__"):
+        return
+    LATEST[sd] = {
+        "plan": str(snap.get("plan") or "").upper(),
+        "total": _toi(snap.get("total")),
+        "remain": _toi(snap.get("remain")),
+        "bySeatType": snap.get("bySeatType") or {},
+    }
+    for s in list(_ACTIVE):
+        s.rescore(sd)
+
+
+def seed_from_store():
+    try:
+        from snapstore import SNAPSHOT_DB, SnapStore
+        if not os.path.exists(SNAPSHOT_DB):
+            return      # 읽기만 하려는데 빈 DB 를 만들지 않음
+        st = SnapStore()
+        try:
+            for r in st.latest():
+                if r["sdCode"] not in LATEST:
+                    note_snapshot(json.loads(r["body"]))
+        finally:
+            st.close()
+    except Exception:
+        pass
+
+
+def score(sd: str) -> tuple[int, float]:
+    """(lane, score). 스냅샷 없으면 중립 점수."""
+    user = SD_PRIORITY.get(sd, 0.0) * 100
+    s = LATEST.get(sd)
+    if not s or s.get("remain") is None:
+        return LANE_MAIN, user + 40
+    remain = s["remain"]
+    if remain <= 0:
+        return LANE_LOW, user
+    sc = user + 50 + min(remain, 50) * 0.5
+    by = s.get("bySeatType") or {}
+    for w, k in zip((20, 12, 6), SEAT_PREF):
+        if _toi(by.get(k)) and _toi(by.get(k)) > 0:
+            sc += w
+    if s.get("plan") == "NRS":
+        sc += 10     # 자유석은 좌석 선택이 없어 결제단계까지 짧다
+    return LANE_MAIN, sc
+
+
+class SdScheduler:
+    def __init__(self, codes, concurrency: int, *, name: str = "SCHED"):
+        if SCHED_USE_STORE and not LATEST:
+            seed_from_store()
+        self.name = name
+        self.concurrency = max(1, int(concurrency or 1))
+        self.heap = []
+        self.ver: dict[str, int] = {}     # 대기 중인 sd → 유효 엔트리 버전
+        self.back: set[str] = set()       # 재투입분: 같은 lane 안에서 맨 뒤
+        self._seq = itertools.count()
+        for sd in dict.fromkeys(codes):     # 중복 sd 는 한 번만 실행 (순서 유지)
+            self.push(sd)
+        _ACTIVE.add(self)
+
+    def push(self, sd: str, *, back: bool = False):
+        if back:
+            self.back.add(sd)
+        lane, sc = score(sd)
+        if sd in self.back:
+            sc -= 1e6
+        v = self.ver[sd] = next(self._seq)
+        heapq.heappush(self.heap, (lane, -sc, v, sd))
+
+    def rescore(self, sd: str):
+        if sd in self.ver:       # 아직 대기 중일 때만 (옛 엔트리는 버전 불일치로 무시)
+            self.push(sd)
+
+    def pop(self) -> str | None:
+        while self.heap:
+            lane, nsc, v, sd = heapq.heappop(self.heap)
+            if self.ver.get(sd) != v:
+                continue
+            del self.ver[sd]
+            return sd
+        return None
+
+    def order(self) -> list[tuple]:
+        live = sorted(e for e in self.heap if self.ver.get(e[3]) == e[2])
+        return [(sd, lane, -nsc) for lane, nsc, _, sd in live]
+
+    def describe(self) -> str:
+        main = [f"{sd}({sc:.0f})" for sd, lane, sc in self.order() if lane == LANE_MAIN]
+        low  = [sd for sd, lane, _ in self.order() if lane == LANE_LOW]
+        return f"[{self.name}] 순서: {' '.join(main) or '-'}" + (f" | low: {' '.join(low)}" if low else "")
+
+    async def run(self, fn, on_result=None, limiter=None) -> list:
+        """워커가 매번 최고 점수 sd를 꺼내 fn(sd) 실행. 완료 순서대로 결과 반환.
+        limiter가 있으면 워커 수=limiter.hi, 슬롯 획득 '후'에 pop (대기 중 재점수 반영)."""
+        results = []
+        async def worker():
+            while True:
+                if limiter is not None:
+                    await limiter.acquire()
+                try:
+                    sd = self.pop()
+                    if sd is None:
+                        return
+                    r = await fn(sd)
+                finally:
+                    if limiter is not None:
+                        limiter.release()
+                if on_result is not None and on_result(sd, r):
+                    self.push(sd, back=True)   # 재투입: 같은 lane 맨 뒤
+                    continue
+                results.append(r)
+        n = limiter.hi if limiter is not None else self.concurrency
+        n = min(n, max(1, len(self.ver)))
+        await asyncio.gather(*(worker() for _ in range(n)))
+        return results
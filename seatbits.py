@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# 좌석 단위 잔여 비트셋 (지정석 SEAT/ALL 전용)
+# - GetRsSeatBaseMap 좌석 순서를 회차별로 캐시 → 비트 i = i번째 좌석 판매가능
+# - 두 폴링 비교: XOR + popcount (released = 새로 풀린 좌석, taken = 팔린 좌석)
+# - 히스토리: ./_seatbits/{prodSeq}_{sdSeq}.jsonl 한 줄당 {"ts","n","rle"} (RLE+varint → base64)
+#             좌석 순서는 같은 이름의 .order.json (append-only라 과거 비트와 정렬 유지)
+# CLI:
+#   python seatbits.py ls
+#   python seatbits.py diff 3000000708_1 [--ids]
+# ENV: SEATBITS=1, SEATBITS_DIR=./_seatbits
+
+import base64, json, os, pathlib, sys, threading, time
+
+SEATBITS = os.getenv("SEATBITS", "1") == "1"
+SEATBITS_DIR = pathlib.Path(os.getenv("SEATBITS_DIR", "./_seatbits"))
+
+SEAT_ID_KEYS = ("seat_id", "seatId", "seat_id_seq", "seatIdSeq")
+AVAILABLE_CODES = {"SS01000", "SS02000", "SS03000", "AVAILABLE", "OK"}
+
+# (prodSeq, sdSeq) → {"ids": [...], "pos": {id: i}}
+SEAT_ORDER_CACHE: dict[tuple, dict] = {}
+# record()는 offload 스레드에서도 불림 → 순서 캐시 갱신 + 파일 append 를 한 덩어리로
+_LOCK = threading.Lock()
+
+
+def _seat_id(d: dict):
+    for k in SEAT_ID_KEYS:
+        v = d.get(k)
+        if v not in (None, ""):
+            return str(v)
+    return None
+
+
+def _seat_rows(js) -> list[dict]:
+    """응답 어디에 있든 '좌석 id를 가진 dict' 리스트를 찾아 반환 (첫 매치)."""
+    if isinstance(js, list):
+        rows = [x for x in js if isinstance(x, dict)]
+        if rows and any(_seat_id(x) for x in rows[:8]):
+            return rows
+        for x in rows:
+            got = _seat_rows(x)
+            if got: return got
+        return []
+    if isinstance(js, dict):
+        for v in js.values():
+            if isinstance(v, (dict, list)):
+                got = _seat_rows(v)
+                if got: return got
+    return []
+
+
+def seat_avail(s: dict) -> bool:
+    toY = lambda v: str(v or "").strip().upper() == "Y"
+    if any(k in s for k in ("sale_yn", "saleYn")):
+        sale = toY(s.get("sale_yn") or s.get("saleYn"))
+        rsv = toY(s.get("rsv_yn") or s.get("rsvYn") or s.get("reserveYn"))
+        if "soldYn" in s: sale = sale and not toY(s.get("soldYn"))
+        return sale and not rsv
+    cd = str(s.get("seatStatusCd") or s.get("seat_status_cd") or s.get("statusCd") or s.get("status") or "").upper()
+    return cd in AVAILABLE_CODES
+
+
+# ---------- 좌석 순서 ----------
+def _order_path(key: tuple) -> pathlib.Path:
+    return SEATBITS_DIR / f"{key[0]}_{key[1]}.order.json"
+
+
+def seat_order(prodSeq, sdSeq, baseMap=None) -> dict:
+    """캐시된 좌석 순서. baseMap에서 새 좌석이 보이면 뒤에만 붙인다(기존 비트 위치 고정)."""
+    key = (str(prodSeq), str(sdSeq))
+    od = SEAT_ORDER_CACHE.get(key)
+    if od is None:
+        ids = []
+        try:
+            ids = json.loads(_order_path(key).read_text(encoding="utf-8"))
+        except Exception:
+            pass
+        od = SEAT_ORDER_CACHE[key] = {"ids": ids, "pos": {k: i for i, k in enumerate(ids)}, "dirty": False}
+    if baseMap:
+        extend_order(od, (_seat_id(r) for r in _seat_rows(baseMap)))
+    return od
+
+
+def extend_order(od: dict, ids):
+    for sid in ids:
+        if sid and sid not in od["pos"]:
+            od["pos"][sid] = len(od["ids"])
+            od["ids"].append(sid)
+            od["dirty"] = True
+
+
+# ---------- 비트셋 ----------
+def encode(od: dict, statusList) -> int:
+    rows = _seat_rows(statusList)
+    extend_order(od, (_seat_id(r) for r in rows))   # baseMap에 없던 좌석도 정렬 유지
+    bits = 0
+    pos = od["pos"]
+    for r in rows:
+        sid = _seat_id(r)
+        if sid and seat_avail(r):
+            bits |= 1 << pos[sid]
+    return bits
+
+
+def popcount(x: int) -> int:
+    return x.bit_count()
+
+
+def diff(a: int, b: int) -> dict:
+    x = a ^ b
+    return {"changed": popcount(x), "released": b & x, "taken": a & x}
+
+
+def bit_ids(bits: int, od: dict) -> list[str]:
+    ids, out, i = od["ids"], [], 0
+    while bits:
+        if bits & 1 and i < len(ids): out.append(ids[i])
+        bits >>= 1; i += 1
+    return out
+
+
+# ---------- RLE (0-run부터 시작하는 교대 run 길이, LEB128 varint) ----------
+def _varint(n: int, out: bytearray):
+    while True:
+        b = n & 0x7F; n >>= 7
+        out.append(b | 0x80 if n else b)
+        if not n: return
+
+
+def rle_pack(bits: int, n: int) -> str:
+    out = bytearray()
+    cur, run = 0, 0
+    for i in range(n):
+        v = (bits >> i) & 1
+        if v == cur:
+            run += 1
+        else:
+            _varint(run, out); cur, run = v, 1
+    _varint(run, out)
+    return base64.b64encode(bytes(out)).decode("ascii")
+
+
+def rle_unpack(s: str) -> int:
+    raw = base64.b64decode(s)
+    bits, i, cur, pos = 0, 0, 0, 0
+    while i < len(raw):
+        n = shift = 0
+        while True:
+            b = raw[i]; i += 1
+            n |= (b & 0x7F) << shift; shift += 7
+            if not b & 0x80: break
+        if cur:
+            bits |= ((1 << n) - 1) << pos
+        pos += n; cur ^= 1
+    return bits
+
+
+# ---------- 기록 ----------
+def _hist_path(key: tuple) -> pathlib.Path:
+    return SEATBITS_DIR / f"{key[0]}_{key[1]}.jsonl"
+
+
+def record(prodSeq, sdSeq, baseMap, statusList, *, ts: float | None = None) -> dict | None:
+    """한 번의 폴링을 비트셋으로 히스토리에 추가. 직전 폴링 대비 diff 요약 반환."""
+    if not SEATBITS or not (prodSeq and sdSeq):
+        return None
+    if not _seat_rows(statusList):
+        return None    # 좌석 단위가 아닌 집계형 응답(statusCd별 seatCnt)은 대상 아님
+    with _LOCK:
+        return _record(prodSeq, sdSeq, baseMap, statusList, ts)
+
+
+def _record(prodSeq, sdSeq, baseMap, statusList, ts) -> dict:
+    od = seat_order(prodSeq, sdSeq, baseMap)
+    bits = encode(od, statusList)
+    key = (str(prodSeq), str(sdSeq))
+    SEATBITS_DIR.mkdir(parents=True, exist_ok=True)
+    if od.get("dirty"):
+        _order_path(key).write_text(json.dumps(od["ids"], ensure_ascii=False), encoding="utf-8")
+        od["dirty"] = False
+    prev = od.get("last")
+    n = len(od["ids"])
+    with _hist_path(key).open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"ts": round(ts or time.time(), 3), "n": n, "rle": rle_pack(bits, n)}) + "\n")
+    od["last"] = bits
+    out = {"n": n, "avail": popcount(bits)}
+    if prev is not None:
+        d = diff(prev, bits)
+        out.update(released=popcount(d["released"]), taken=popcount(d["taken"]))
+    return out
+
+
+def load_history(name: str) -> tuple[list[str], list[tuple]]:
+    base = SEATBITS_DIR / name
+    ids = json.loads(base.with_suffix(".order.json").read_text(encoding="utf-8"))
+    rows = []
+    with base.with_suffix(".jsonl").open("r", encoding="utf-8") as f:
+        for ln in f:
+            try:
+                d = json.loads(ln); rows.append((d["ts"], d["n"], rle_unpack(d["rle"])))
+            except Exception:
+                pass
+    return ids, rows
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] == "ls":
+        for p in sorted(SEATBITS_DIR.glob("*.jsonl")):
+            print(f"{p.stem}  {p.stat().st_size}B  polls={sum(1 for _ in p.open(encoding='utf-8'))}")
+        return 0
+    if argv[0] == "diff" and len(argv) > 1:
+        ids, rows = load_history(argv[1])
+        od = {"ids": ids}
+        prev = None
+        for ts, n, bits in rows:
+            t = time.strftime("%m-%d %H:%M:%S", time.localtime(ts))
+            line = f"{t} n={n} avail={popcount(bits)}"
+            if prev is not None:
+                d = diff(prev, bits)
+                line += f" released={popcount(d['released'])} taken={popcount(d['taken'])}"
+                if "--ids" in argv and d["changed"]:
+                    line += f" +{bit_ids(d['released'], od)} -{bit_ids(d['taken'], od)}"
+            print(line)
+            prev = bits
+        return 0
+    print("usage: seatbits.py ls | diff <prodSeq_sdSeq> [--ids]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# 회차(show)별 asyncio 인지 프로파일러 — 느린 회차의 시간이 Python CPU 인지 브라우저/네트워크 대기인지 분리
+# - cProfile / 샘플러는 스레드 단위라 동시에 도는 회차들이 한데 섞임 → 여기서는 회차 코루틴을 직접 한 스텝씩 구동
+#     스텝(send/throw ~ 다음 await 까지) = 이 회차가 루프 스레드에서 CPU 를 쓰는 구간
+#       → thread_time 합 = 회차 CPU, 나머지(wall − CPU) = 대기 (브라우저/네트워크/슬롯/sleep)
+#       → 회차 전용 cProfile 을 스텝 동안만 enable → prof-<sd>.pstats
+#     스텝 사이 대기는 await 체인의 가장 안쪽 "우리 코드" 위치로 귀속 (예: bf.py:146 request_json 6.1s)
+#     샘플러 스레드(SHOWPROF_HZ)가 스텝 중인 회차의 스택을 떠서 collapsed 스택 → prof-<sd>.collapsed
+#       (flamegraph.pl / speedscope 로 바로 열림; 대기는 "[wait];<await 위치>" 프레임으로 같이 표시)
+# - 사용:  result = await PROF.run(sd, process_one(ctx, sd))    # SHOWPROF=0 이면 그냥 await
+#          PROF.dir = RUN_DIR / "prof"  (선택, 기본 SHOWPROF_DIR/<RUN_ID>)
+#          for ln in PROF.report(): print(ln)
+#   오프로드 스레드(offload)에서 쓴 CPU 는 루프 밖이라 대기 쪽으로 잡힘
+# ENV: SHOWPROF=0, SHOWPROF_DIR=./_prof, SHOWPROF_HZ=100, SHOWPROF_TOP=5
+
+import cProfile, json, os, sys, threading, time
+from collections import Counter
+from pathlib import Path
+
+from recorder import RUN_ID
+
+SHOWPROF = os.getenv("SHOWPROF", "0") == "1"
+SHOWPROF_DIR = Path(os.getenv("SHOWPROF_DIR", "./_prof"))
+SHOWPROF_HZ = float(os.getenv("SHOWPROF_HZ", "100"))
+SHOWPROF_TOP = int(os.getenv("SHOWPROF_TOP", "5"))
+
+HERE = str(Path(__file__).resolve().parent)
+_LIB = ("site-packages", "asyncio", os.sep + "lib" + os.sep + "python")
+
+
+def _ours(filename: str) -> bool:
+    return filename.startswith(HERE) and not any(k in filename for k in _LIB)
+
+
+def _label(filename: str, line: int, name: str) -> str:
+    return f"{os.path.basename(filename)}:{name}:{line}"
+
+
+def _await_chain(coro) -> list[str]:
+    """코루틴의 await 체인 (바깥 → 안쪽) 중 우리 코드 프레임만."""
+    out, obj = [], coro
+    for _ in range(64):
+        if obj is None:
+            break
+        code = getattr(obj, "cr_code", None) or getattr(obj, "gi_code", None) or getattr(obj, "ag_code", None)
+        fr = getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None) or getattr(obj, "ag_frame", None)
+        if code is not None and _ours(code.co_filename):
+            out.append(_label(code.co_filename, fr.f_lineno if fr else code.co_firstlineno, code.co_name))
+        obj = getattr(obj, "cr_await", None) or getattr(obj, "gi_yieldfrom", None) or getattr(obj, "ag_await", None)
+    return out
+
+
+class _Show:
+    __slots__ = ("sd", "prof", "cpu", "t0", "wall", "steps", "waits", "stacks", "err")
+
+    def __init__(self, sd: str):
+        self.sd = sd
+        self.prof = cProfile.Profile()
+        self.cpu = 0.0
+        self.t0 = time.perf_counter()
+        self.wall = 0.0
+        self.steps = 0
+        self.waits: Counter = Counter()      # "a;b;c" (await 체인) → 초
+        self.stacks: Counter = Counter()     # collapsed 스택 → 샘플 수
+        self.err = ""
+
+
+class _Stepper:
+    """코루틴을 한 스텝씩 구동하면서 스텝 CPU/프로파일, 스텝 사이 대기를 회차에 기록."""
+    def __init__(self, owner: "ShowProfiler", sh: _Show, coro):
+        self.owner, self.sh, self.coro = owner, sh, coro
+
+    def __await__(self):
+        sh, coro, owner = self.sh, self.coro, self.owner
+        val, exc = None, None
+        while True:
+            owner.current = sh
+            c0 = time.thread_time()
+            sh.prof.enable()
+            try:
+                fut = coro.send(val) if exc is None else coro.throw(exc)
+            except StopIteration as e:
+                return e.value
+            finally:
+                sh.prof.disable()
+                sh.cpu += time.thread_time() - c0
+                sh.steps += 1
+                owner.current = None
+            chain = ";".join(_await_chain(coro)) or "(loop)"
+            w0 = time.perf_counter()
+            try:
+                val, exc = (yield fut), None
+            except BaseException as e:       # 취소/타임아웃도 코루틴 안으로 그대로 전달
+                val, exc = None, e
+            sh.waits[chain] += time.perf_counter() - w0
+
+
+class ShowProfiler:
+    def __init__(self):
+        self.dir: Path | None = None
+        self.shows: list[_Show] = []
+        self.current: _Show | None = None
+        self.loop_tid = None
+        self.sampler = None
+
+    async def run(self, sd: str, coro):
+        if not SHOWPROF:
+            return await coro
+        self._start_sampler()
+        n = sum(1 for x in self.shows if x.sd.split("#")[0] == str(sd))
+        sh = _Show(str(sd) if not n else f"{sd}#{n + 1}")    # 재투입된 회차는 별도 파일
+        self.shows.append(sh)
+        try:
+            return await _Stepper(self, sh, coro)
+        except BaseException as e:
+            sh.err = type(e).__name__
+            raise
+        finally:
+            sh.wall = time.perf_counter() - sh.t0
+            self._write(sh)
+
+    # ---------- 샘플러 ----------
+    def _start_sampler(self):
+        if self.sampler is not None or SHOWPROF_HZ <= 0:
+            return
+        self.loop_tid = threading.get_ident()
+        self.sampler = threading.Thread(target=self._sample, name="showprof", daemon=True)
+        self.sampler.start()
+
+    def _sample(self):
+        dt = 1.0 / SHOWPROF_HZ
+        while True:
+            time.sleep(dt)
+            sh = self.current
+            if sh is None:
+                continue
+            fr = sys._current_frames().get(self.loop_tid)
+            stack = []
+            while fr is not None:
+                co = fr.f_code
+                stack.append(_label(co.co_filename, fr.f_lineno, co.co_name))
+                fr = fr.f_back
+            # 루프/스테퍼 바깥 프레임은 잘라냄 (Stepper.__await__ 위쪽만)
+            for i, s in enumerate(stack):
+                if s.startswith("showprof.py:__await__"):
+                    stack = stack[:i]
+                    break
+            if self.current is sh and stack:
+                sh.stacks[";".join(reversed(stack))] += 1
+
+    # ---------- 출력 ----------
+    def _out_dir(self) -> Path:
+        d = self.dir or (SHOWPROF_DIR / RUN_ID)
+        Path(d).mkdir(parents=True, exist_ok=True)
+        return Path(d)
+
+    def _write(self, sh: _Show):
+        try:
+            d = self._out_dir()
+            sh.prof.dump_stats(str(d / f"prof-{sh.sd}.pstats"))
+            lines = [f"{sh.sd};{k} {v}" for k, v in sh.stacks.items()]
+            if SHOWPROF_HZ > 0:      # 대기도 같은 단위(샘플 수)로 → flamegraph 에서 CPU 대 대기 비율이 보임
+                lines += [f"{sh.sd};[wait];{k} {round(v * SHOWPROF_HZ)}" for k, v in sh.waits.items()
+                          if round(v * SHOWPROF_HZ) > 0]
+            (d / f"prof-{sh.sd}.collapsed").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        except Exception as e:
+            print(f"[PROF] {sh.sd} 저장 실패: {e}", flush=True)
+
+    def summary(self) -> list[dict]:
+        out = []
+        for sh in self.shows:
+            wait = max(0.0, sh.wall - sh.cpu)
+            top = sorted(sh.waits.items(), key=lambda kv: -kv[1])[:SHOWPROF_TOP]
+            out.append({"sd": sh.sd, "wall_s": round(sh.wall, 3), "cpu_s": round(sh.cpu, 3), "wait_s": round(wait, 3),
+                        "cpu_pct": round(100 * sh.cpu / sh.wall, 1) if sh.wall else 0.0, "steps": sh.steps,
+                        "err": sh.err, "wait_top": [(k.rsplit(";", 1)[-1], round(v, 3)) for k, v in top]})
+        return out
+
+    def report(self) -> list[str]:
+        if not (SHOWPROF and self.shows):
+            return []
+        rows = self.summary()
+        d = self._out_dir()
+        with open(d / "prof-summary.json", "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=1)
+        out = [f"[PROF] shows={len(rows)} → {d}"]
+        for r in sorted(rows, key=lambda r: -r["wall_s"]):
+            top = ", ".join(f"{k} {v:.1f}s" for k, v in r["wait_top"][:3])
+            out.append(f"[PROF] {r['sd']}: wall={r['wall_s']:.1f}s cpu={r['cpu_s']:.2f}s ({r['cpu_pct']:.0f}%) "
+                       f"wait={r['wait_s']:.1f}s steps={r['steps']}" + (f" err={r['err']}" if r["err"] else "")
+                       + (f" | {top}" if top else ""))
+        return out
+
+
+PROF = ShowProfiler()
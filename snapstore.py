@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# 스냅샷 시계열 저장소 (SQLite + WAL)
+# - snapshot_sd() 결과를 (sdCode, ts) 키로 누적 → 회차별 잔여 변화 추적
+# - run 단위(= 한 번의 snapshot_many 호출)로 묶어서 run 간 delta 계산
+# - export: 기존 snapshots-*.json 과 같은 모양(list[dict])으로 되돌림
+# - run id: YYYYmmdd-HHMMSS.mmm (밀리초까지 — 같은 초에 시작한 두 run 이 한 run 으로 합쳐지지 않게)
+# CLI:
+#   python snapstore.py latest [--sd 001]
+#   python snapstore.py history 001 [--limit 50]
+#   python snapstore.py delta [--a RUN] [--b RUN]        (기본: 직전 두 run)
+#   python snapstore.py export [--run RUN] [-o out.json]
+#   python snapstore.py import snapshots-*.json          (기존 JSON 적재)
+#   python snapstore.py runs
+# ENV: SNAPSHOT_DB=./snapshots.db
+
+import argparse, json, os, sqlite3, sys, time
+
+SNAPSHOT_DB = os.getenv("SNAPSHOT_DB", "./snapshots.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snap (
+  sdCode  TEXT NOT NULL,
+  ts      REAL NOT NULL,
+  run     TEXT NOT NULL,
+  prodSeq TEXT, sdSeq TEXT, plan TEXT,
+  total   INTEGER, remain INTEGER,
+  body    TEXT NOT NULL,
+  PRIMARY KEY (sdCode, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snap_run ON snap(run);
+"""
+
+
+_last_run = ""
+
+
+def run_id(ts: float | None = None) -> str:
+    """run id (밀리초 해상도). 같은 프로세스에서 같은 ms 면 1ms 씩 밀어서 겹치지 않게."""
+    global _last_run
+    ts = time.time() if ts is None else ts
+    ms = int(round(ts * 1000))
+    while True:
+        rid = time.strftime("%Y%m%d-%H%M%S", time.localtime(ms // 1000)) + f".{ms % 1000:03d}"
+        if rid > _last_run:
+            _last_run = rid
+            return rid
+        ms += 1
+
+
+def _toi(x):
+    try: return int(x)
+    except: return None
+
+
+class SnapStore:
+    def __init__(self, path: str = SNAPSHOT_DB):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        try: self.db.close()
+        except: pass
+
+    # ---------- write ----------
+    def append(self, snaps: list, *, ts: float | None = None, run: str | None = None) -> str:
+        """snapshot_sd 결과 리스트를 한 run으로 적재. run id 반환."""
+        ts = time.time() if ts is None else ts
+        run = run or run_id(ts)
+        rows = []
+        for i, s in enumerate(snaps or []):
+            if isinstance(s, tuple): _, s = s
+            if not isinstance(s, dict) or not s.get("sdCode"):
+                continue
+            # 같은 run 안에서 sdCode가 중복돼도 키 충돌 안 나게 미세 오프셋
+            rows.append((str(s["sdCode"]), ts + i * 1e-6, run,
+                         str(s.get("prodSeq") or ""), str(s.get("sdSeq") or ""), s.get("plan"),
+                         _toi(s.get("total")), _toi(s.get("remain")),
+                         json.dumps(s, ensure_ascii=False, separators=(",", ":"))))
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO snap VALUES (?,?,?,?,?,?,?,?,?)", rows)
+        return run
+
+    # ---------- read ----------
+    def runs(self, limit: int = 20) -> list[tuple]:
+        cur = self.db.execute(
+            "SELECT run, MIN(ts) t, COUNT(*) n FROM snap GROUP BY run ORDER BY t DESC LIMIT ?", (limit,))
+        return [(r["run"], r["t"], r["n"]) for r in cur]
+
+    def latest(self, sdCode: str | None = None) -> list[dict]:
+        q = ("SELECT s.* FROM snap s JOIN (SELECT sdCode, MAX(ts) ts FROM snap GROUP BY sdCode) m "
+             "ON s.sdCode=m.sdCode AND s.ts=m.ts")
+        args = ()
+        if sdCode:
+            q += " WHERE s.sdCode=?"; args = (sdCode,)
+        return [dict(r) for r in self.db.execute(q + " ORDER BY s.sdCode", args)]
+
+    def history(self, sdCode: str, limit: int = 100) -> list[dict]:
+        cur = self.db.execute("SELECT * FROM snap WHERE sdCode=? ORDER BY ts DESC LIMIT ?", (sdCode, limit))
+        return [dict(r) for r in cur][::-1]
+
+    def by_run(self, run: str) -> list[dict]:
+        return [dict(r) for r in self.db.execute("SELECT * FROM snap WHERE run=? ORDER BY ts", (run,))]
+
+    def delta(self, run_a: str | None = None, run_b: str | None = None) -> list[dict]:
+        """run_a → run_b 사이 sdCode별 total/remain 변화. 기본은 직전 두 run."""
+        if not (run_a and run_b):
+            rs = self.runs(2)
+            if len(rs) < 2:
+                return []
+            run_b, run_a = rs[0][0], rs[1][0]
+        a = {r["sdCode"]: r for r in self.by_run(run_a)}
+        b = {r["sdCode"]: r for r in self.by_run(run_b)}
+        out = []
+        for sd in sorted(set(a) | set(b)):
+            ra, rb = a.get(sd) or {}, b.get(sd) or {}
+            ma, mb = ra.get("remain"), rb.get("remain")
+            out.append({"sdCode": sd, "a": run_a, "b": run_b,
+                        "remain_a": ma, "remain_b": mb,
+                        "d_remain": (mb - ma) if (ma is not None and mb is not None) else None,
+                        "total_a": ra.get("total"), "total_b": rb.get("total")})
+        return out
+
+    def export(self, run: str | None = None) -> list[dict]:
+        """기존 snapshots-*.json 모양으로 복원 (run 미지정 시 회차별 최신)."""
+        rows = self.by_run(run) if run else self.latest()
+        return [json.loads(r["body"]) for r in rows]
+
+    def import_json(self, path: str) -> str:
+        import re
+        with open(path, "r", encoding="utf-8") as f:
+            snaps = json.load(f)
+        m = re.search(r"(\d{8}-\d{6})(\.\d{3})?", os.path.basename(path))
+        run = m.group(0) if m else None
+        ts = (time.mktime(time.strptime(m.group(1), "%Y%m%d-%H%M%S")) + float(m.group(2) or 0)) if m \
+            else os.path.getmtime(path)
+        return self.append(snaps, ts=ts, run=run)
+
+
+def _fmt_row(r: dict) -> str:
+    t = time.strftime("%m-%d %H:%M:%S", time.localtime(r["ts"]))
+    return f"[{r['sdCode']}] {t} run={r['run']} plan={r.get('plan') or '-'} 총={r.get('total')} 잔여={r.get('remain')}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="snapshot 시계열 조회")
+    ap.add_argument("--db", default=SNAPSHOT_DB)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("latest"); p.add_argument("--sd")
+    p = sub.add_parser("history"); p.add_argument("sd"); p.add_argument("--limit", type=int, default=50)
+    p = sub.add_parser("delta"); p.add_argument("--a"); p.add_argument("--b")
+    p = sub.add_parser("export"); p.add_argument("--run"); p.add_argument("-o", "--out")
+    p = sub.add_parser("import"); p.add_argument("files", nargs="+")
+    p = sub.add_parser("runs"); p.add_argument("--limit", type=int, default=20)
+    a = ap.parse_args(argv)
+
+    st = SnapStore(a.db)
+    try:
+        if a.cmd == "latest":
+            for r in st.latest(a.sd): print(_fmt_row(r))
+        elif a.cmd == "history":
+            for r in st.history(a.sd, a.limit): print(_fmt_row(r))
+        elif a.cmd == "delta":
+            for d in st.delta(a.a, a.b):
+                dd = d["d_remain"]
+                sign = "-" if dd is None else (f"+{dd}" if dd > 0 else str(dd))
+                print(f"[{d['sdCode']}] {d['a']} → {d['b']} 잔여 {d['remain_a']} → {d['remain_b']} ({sign})")
+        elif a.cmd == "export":
+            js = json.dumps(st.export(a.run), ensure_ascii=False, indent=2)
+            if a.out:
+                with open(a.out, "w", encoding="utf-8") as f: f.write(js)
+                print(f"📝 exported → {a.out}")
+            else:
+                print(js)
+        elif a.cmd == "import":
+            for fn in a.files:
+                print(f"[import] {fn} → run={st.import_json(fn)}")
+        elif a.cmd == "runs":
+            for run, t, n in st.runs(a.limit):
+                print(f"{run}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))}  n={n}")
+    finally:
+        st.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
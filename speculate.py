@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# 폴백 체인 투기 실행기
+# - 기존: A 실패/0 → B → C 순차 (주 소스가 0을 주면 왕복 3~4배)
+# - 여기: 후보를 최대 SPEC_FANOUT 개 동시에 띄우고, 검증 통과한 첫 결과 반환 + 나머지 취소
+#         (fanout보다 후보가 많으면 앞선 후보가 불합격으로 끝날 때마다 다음 후보 투입)
+# 사용:
+#   label, res = await first_valid([("blk", lambda: f1()), ("prod", lambda: f2())],
+#                                  valid=lambda r: r[0] > 0 or r[1] > 0, name="rs_block_summary")
+#   label이 None이면 전부 불합격 → res는 후보 순서대로의 결과 리스트(예외는 None)
+# ENV: SPEC_FANOUT=3 (1이면 기존처럼 순차)
+
+import asyncio, os, time
+from collections import Counter
+
+SPEC_FANOUT = int(os.getenv("SPEC_FANOUT", "3"))
+
+SPEC_STATS: Counter = Counter()   # (name, label) → 채택 횟수
+
+
+async def first_valid(cands, valid, *, fanout: int | None = None, name: str = "spec"):
+    fanout = max(1, int(fanout or SPEC_FANOUT))
+    cands = list(cands)
+    results = [None] * len(cands)
+    running: dict[asyncio.Task, int] = {}
+    nxt = 0
+    t0 = time.monotonic()
+
+    def _launch():
+        nonlocal nxt
+        while nxt < len(cands) and len(running) < fanout:
+            label, factory = cands[nxt]
+            running[asyncio.ensure_future(factory())] = nxt
+            nxt += 1
+
+    _launch()
+    try:
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            # 같은 틱에 여러 개 끝나면 후보 순서(우선순위) 빠른 쪽부터 판정
+            for t in sorted(done, key=lambda x: running[x]):
+                i = running.pop(t)
+                try:
+                    r = t.result()
+                except Exception:
+                    r = None
+                results[i] = r
+                ok = False
+                try: ok = r is not None and bool(valid(r))
+                except Exception: ok = False
+                if ok:
+                    label = cands[i][0]
+                    SPEC_STATS[(name, label)] += 1
+                    return label, r
+            _launch()
+    finally:
+        for t in running:
+            t.cancel()
+    SPEC_STATS[(name, None)] += 1
+    return None, results
+
+
+def once(factory):
+    """같은 요청을 여러 후보가 공유할 때: 첫 호출에서만 실행하고 이후엔 같은 task를 기다림."""
+    box = {}
+    async def _get():
+        if "t" not in box:
+            box["t"] = asyncio.ensure_future(factory())
+        return await asyncio.shield(box["t"])
+    return _get
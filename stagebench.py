@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# 오프라인 단계 판별 벤치마크 (라이브 판매 없이 판별 정확도/속도 측정·회귀)
+# - 캡처된 HTML(debug/*.html, debug/cap-*/*.html, archive:debug/*.html)을 로컬 headless 페이지에 올림
+#     page.route 로 원래 URL 요청을 파일 내용으로 응답 → location.pathname 기반 판별도 그대로 동작
+#     하위 리소스(js/css/img)는 차단, 페이지 스크립트는 기본 꺼둠(STAGEBENCH_JS=1 로 켬) → 결정적
+# - 판별 함수 전부 실행: biff_patched(is_seat_page, is_price_page, is_zone_page, detect_phase,
+#     reached_payment, is_true_booking_page) + bf.detect_stage
+#   함수별 결과와 지연(ms, 반복 측정 p50/p95) / 기대값 일치율 / 같은 단계를 보는 판별끼리 불일치 목록
+# - 픽스처 메타 (선택): <이름>.meta.json  {"url": "...", "expect": {"is_seat_page": true, "detect_phase": "좌석선택"}}
+#   없으면 capture 가 남긴 <이름>.ring.json 마지막 지문의 url, 그것도 없으면 STAGEBENCH_URL
+# 사용:
+#   python stagebench.py                         # 기본 픽스처
+#   python stagebench.py debug/x.html --repeat 10 --json out/stagebench.json
+# ENV: STAGEBENCH_URL=https://filmonestop.maketicket.co.kr/ko/onestop/rs, STAGEBENCH_JS=0,
+#      STAGEBENCH_PAY_TIMEOUT_MS=300 (reached_payment 대기 한도)
+
+import asyncio, atexit, contextlib, glob, json, logging, os, shutil, statistics, sys, tempfile, time
+from pathlib import Path
+
+import artifacts
+
+STAGEBENCH_URL = os.getenv("STAGEBENCH_URL", "https://filmonestop.maketicket.co.kr/ko/onestop/rs")
+STAGEBENCH_JS = os.getenv("STAGEBENCH_JS", "0") == "1"
+STAGEBENCH_PAY_TIMEOUT_MS = int(os.getenv("STAGEBENCH_PAY_TIMEOUT_MS", "300"))
+
+DEFAULT_FIXTURES = ("debug/*.html", "debug/cap-*/*.html")
+
+# 같은 "단계"를 보는 판별끼리 묶음 → 결과가 갈리면 불일치로 보고
+GROUPS = {
+    "payment": {"reached_payment": lambda v: bool(v), "is_true_booking_page": lambda v: bool(v),
+                "detect_phase": lambda v: v == "결제창", "detect_stage": lambda v: v in ("CHECKOUT", "PG")},
+    "seat":    {"is_seat_page": lambda v: bool(v), "detect_phase": lambda v: v == "좌석선택",
+                "detect_stage": lambda v: v == "SEAT"},
+}
+
+
+def _cleanup_scratch(tmp: str):
+    """스크래치 폴더 안 파일을 잡고 있는 로그 핸들러를 닫고 삭제."""
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        if isinstance(h, logging.FileHandler) and os.path.realpath(h.baseFilename).startswith(os.path.realpath(tmp)):
+            root.removeHandler(h); h.close()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _import_runners():
+    """판별 함수 로드. bf 는 import 시 runs/<id>/ 와 로그 파일(FileHandler)을 만들므로 스크래치 cwd 에서 import.
+    bf 가 실행 내내 그 로그 파일을 열어두기 때문에 with 블록 임시 폴더는 못 씀 (Windows 는 삭제 실패,
+    그 밖에선 지워진 폴더에 계속 기록) → 프로세스 종료 때 정리."""
+    cwd = os.getcwd()
+    argv = sys.argv
+    tmp = tempfile.mkdtemp(prefix="stagebench-")
+    atexit.register(_cleanup_scratch, tmp)
+    os.chdir(tmp)
+    sys.argv = [argv[0]]
+    try:
+        import biff_patched as bp
+        import bf
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+    return {
+        "is_seat_page":         bp.is_seat_page,
+        "is_price_page":        bp.is_price_page,
+        "is_zone_page":         bp.is_zone_page,
+        "detect_phase":         bp.detect_phase,
+        "reached_payment":      lambda p: bp.reached_payment(p, timeout_ms=STAGEBENCH_PAY_TIMEOUT_MS),
+        "is_true_booking_page": bp.is_true_booking_page,
+        "detect_stage":         bf.detect_stage,
+    }
+
+
+def _fixtures(args) -> list[dict]:
+    out = []
+    for a in (args or DEFAULT_FIXTURES):
+        paths = artifacts.glob(a) if a.startswith(artifacts.PREFIX) else sorted(glob.glob(a)) or ([a] if os.path.exists(a) else [])
+        for p in paths:
+            if not str(p).endswith(".html"):
+                continue
+            stem = str(p)[:-len(".html")]
+            meta = {}
+            for side in (stem + ".meta.json", stem + ".ring.json"):
+                with contextlib.suppress(Exception):
+                    m = artifacts.load_json(side)
+                    meta = m if isinstance(m, dict) else {"url": (m[-1] or {}).get("url")} if m else {}
+                    break
+            out.append({"path": str(p), "name": Path(stem).name, "url": meta.get("url") or STAGEBENCH_URL,
+                        "expect": meta.get("expect") or {}, "html": artifacts.read_bytes(p)})
+    return out
+
+
+def _pct(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))] if xs else 0.0
+
+
+async def _load(ctx, fx):
+    page = await ctx.new_page()
+    doc = fx["url"].split("#")[0]
+
+    async def _route(route):
+        if route.request.url.split("#")[0] == doc:
+            await route.fulfill(status=200, body=fx["html"], headers={"content-type": "text/html; charset=utf-8"})
+        else:
+            await route.abort()     # 오프라인: 하위 리소스/네트워크 차단
+    await page.route("**/*", _route)
+    await page.goto(fx["url"], wait_until="domcontentloaded", timeout=10000)
+    return page
+
+
+async def run(fixtures, repeat: int = 5) -> dict:
+    from playwright.async_api import async_playwright
+    preds = _import_runners()
+    rows = []
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        ctx = await browser.new_context(java_script_enabled=STAGEBENCH_JS, locale="ko-KR")
+        for fx in fixtures:
+            try:
+                page = await _load(ctx, fx)
+            except Exception as e:
+                rows.append({"fixture": fx["name"], "url": fx["url"], "error": f"load: {e}"})
+                continue
+            res, lat = {}, {}
+            for name, fn in preds.items():
+                ms = []
+                for i in range(max(1, repeat)):
+                    t0 = time.perf_counter()
+                    try:
+                        v = await fn(page)
+                    except Exception as e:
+                        v = f"ERR:{type(e).__name__}"
+                    ms.append((time.perf_counter() - t0) * 1000.0)
+                    if i == 0:
+                        res[name] = v if isinstance(v, (bool, str, int, float, type(None))) else bool(v)
+                lat[name] = ms
+            with contextlib.suppress(Exception):
+                await page.close()
+            rows.append({"fixture": fx["name"], "url": fx["url"], "expect": fx["expect"], "result": res, "ms": lat})
+        await ctx.close()
+        await browser.close()
+    return _summarize(rows, list(preds))
+
+
+def _summarize(rows, names) -> dict:
+    per = {}
+    for n in names:
+        ms = [x for r in rows if "ms" in r for x in r["ms"][n]]
+        labeled = [r for r in rows if "result" in r and n in r["expect"]]
+        hit = sum(1 for r in labeled if r["result"][n] == r["expect"][n])
+        per[n] = {"p50_ms": round(_pct(ms, .5), 2), "p95_ms": round(_pct(ms, .95), 2),
+                  "mean_ms": round(statistics.fmean(ms), 2) if ms else 0.0,
+                  "labeled": len(labeled), "agree": hit}
+    conflicts = []
+    for r in rows:
+        if "result" not in r: continue
+        for g, members in GROUPS.items():
+            votes = {n: f(r["result"][n]) for n, f in members.items() if not str(r["result"][n]).startswith("ERR")}
+            if len(set(votes.values())) > 1:
+                conflicts.append({"fixture": r["fixture"], "group": g, "votes": votes})
+    return {"when": time.strftime("%Y-%m-%dT%H:%M:%S"), "js": STAGEBENCH_JS,
+            "fixtures": rows, "predicates": per, "conflicts": conflicts}
+
+
+def format_report(rep: dict) -> list[str]:
+    rows = rep["fixtures"]
+    out = [f"[STAGEBENCH] fixtures={len(rows)} js={'on' if rep['js'] else 'off'}"]
+    out.append(f"  {'predicate':<22} {'p50':>8} {'p95':>8} {'mean':>8}  agree")
+    for n, s in rep["predicates"].items():
+        ag = f"{s['agree']}/{s['labeled']}" if s["labeled"] else "-"
+        out.append(f"  {n:<22} {s['p50_ms']:>7.1f}ms {s['p95_ms']:>7.1f}ms {s['mean_ms']:>7.1f}ms  {ag}")
+    for r in rows:
+        if "error" in r:
+            out.append(f"  ⚠ {r['fixture']}: {r['error']}"); continue
+        out.append(f"  • {r['fixture']}: " + " ".join(f"{k}={v}" for k, v in r["result"].items()))
+    for c in rep["conflicts"]:
+        out.append(f"  ≠ {c['fixture']} [{c['group']}] " + " ".join(f"{k}={'Y' if v else 'N'}" for k, v in c["votes"].items()))
+    return out
+
+
+def main(argv=None) -> int:
+    a = list(sys.argv[1:] if argv is None else argv)
+    repeat, jpath = 5, None
+    if "--repeat" in a:
+        i = a.index("--repeat"); repeat = int(a[i + 1]); del a[i:i + 2]
+    if "--json" in a:
+        i = a.index("--json"); jpath = a[i + 1]; del a[i:i + 2]
+    fx = _fixtures(a)
+    if not fx:
+        print("[STAGEBENCH] 픽스처 없음 (debug/*.html)")
+        return 1
+    rep = asyncio.run(run(fx, repeat))
+    for ln in format_report(rep):
+        print(ln)
+    if jpath:
+        Path(jpath).parent.mkdir(parents=True, exist_ok=True)
+        Path(jpath).write_text(json.dumps(rep, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"[STAGEBENCH] → {jpath}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+# 로컬 스탠드인 (maketicket 페이지/API 흉내) — 러너 end-to-end 벤치마크(e2ebench)용
+# - StandIn(shows=N).start() → http://127.0.0.1:<port>   (스레드 HTTP 서버, 표준 라이브러리만)
+#     요청 경로는 "/<원래 호스트><원래 경로>" 형식 (biff./filmonestop./filmonestopapi./filmapi. 구분)
+#     로그인(폼 자동 제출 = 사람이 로그인하는 흉내) / 홈 / resMain / onestop booking → rs(가격·수량) / rs/seat(좌석맵)
+#     / 결제창(/booking, /payment, /order) 페이지와 filmapi·rs·seat JSON API, 정적 파일은 빈 응답
+#     회차 카탈로그: sdCode 001..N, SEAT/NRS 는 STANDIN_SEAT_RATIO 비율, 지연은 STANDIN_API_MS/PAGE_MS(±JITTER)
+# - 서버가 회차별 단계 도달 시각을 기록 (러너 로그와 무관하게 같은 기준으로 비교):
+#     summary = 좌석/블록 요약 API(prodSummary, blockSummary2, GetRsSeat*) 첫 응답
+#     price   = 가격·수량 페이지 또는 tickettype 첫 응답
+#     payment = 결제창 페이지 첫 응답
+#   + 요청 수 (page/api/static, 엔드포인트별), 모르는 경로는 unmatched 로 따로 셈 (스탠드인 보강 대상)
+# - 러너 쪽 연결 (STANDIN 환경변수 있을 때만, 없으면 아무 것도 안 함):
+#     browser = await pw.chromium.launch(**standin.launch_kwargs(channel="chrome", headless=False, args=[...]))
+#     ctx = await browser.new_context(...); await standin.attach(ctx)
+#   attach: *.maketicket.co.kr 요청을 route.fetch 로 스탠드인에 넘겨 응답 (페이지 URL/쿠키 도메인은 원래 그대로)
+#           ctx.request(APIRequestContext)는 route 를 안 타므로 URL 만 스탠드인으로 바꿔서 보냄
+# ENV: STANDIN=(러너용, http://127.0.0.1:port), STANDIN_HEADLESS=1, STANDIN_API_MS=40, STANDIN_PAGE_MS=80,
+#      STANDIN_JITTER=0.3, STANDIN_SEAT_RATIO=0.5, STANDIN_LOGIN_MS=300, STANDIN_SEATS=400
+
+import html, json, os, random, re, threading, time, urllib.parse
+
+STANDIN = os.getenv("STANDIN", "").rstrip("/")
+STANDIN_HEADLESS = os.getenv("STANDIN_HEADLESS", "1") == "1"
+STANDIN_API_MS = float(os.getenv("STANDIN_API_MS", "40"))
+STANDIN_PAGE_MS = float(os.getenv("STANDIN_PAGE_MS", "80"))
+STANDIN_JITTER = float(os.getenv("STANDIN_JITTER", "0.3"))
+STANDIN_SEAT_RATIO = float(os.getenv("STANDIN_SEAT_RATIO", "0.5"))
+STANDIN_LOGIN_MS = int(os.getenv("STANDIN_LOGIN_MS", "300"))
+STANDIN_SEATS = int(os.getenv("STANDIN_SEATS", "400"))
+
+HOST_RX = re.compile(r"^https?://((?:[\w-]+\.)*maketicket\.co\.kr)(/[^?#]*)?(\?[^#]*)?", re.I)
+ONESTOP = "https://filmonestop.maketicket.co.kr"
+API_HOST = "https://filmonestopapi.maketicket.co.kr"
+CSRF = "standin-csrf-0000"
+
+SUMMARY_EPS = {"prodsummary", "blocksummary2", "getrsseatbasemap", "getrsseatstatuslist", "getrszoneseatmapinfo"}
+STATIC_RX = re.compile(r"\.(js|css|png|jpe?g|gif|svg|ico|woff2?|ttf|map|webp)$", re.I)
+
+
+# ---------- 러너 쪽 ----------
+def rewrite(url: str) -> str:
+    m = HOST_RX.match(url or "")
+    if not (STANDIN and m):
+        return url
+    return f"{STANDIN}/{m.group(1).lower()}{m.group(2) or '/'}{m.group(3) or ''}"
+
+
+def launch_kwargs(**kw) -> dict:
+    """chromium.launch 인자. 스탠드인 모드면 번들 Chromium + headless 로 통일."""
+    if STANDIN:
+        kw.pop("channel", None)
+        kw["headless"] = STANDIN_HEADLESS
+        kw["args"] = [a for a in kw.get("args") or [] if not a.startswith("--headless")]
+    return kw
+
+
+def _patch_request_context():
+    from playwright.async_api import APIRequestContext
+    if getattr(APIRequestContext, "_standin", False):
+        return
+    for name in ("fetch", "get", "post", "put", "patch", "delete", "head"):
+        orig = getattr(APIRequestContext, name, None)
+        if orig is None:
+            continue
+        async def wrap(self, url_or_request, *a, _orig=orig, **kw):
+            if isinstance(url_or_request, str) and HOST_RX.match(url_or_request):
+                url_or_request = rewrite(url_or_request)
+                kw["headers"] = {**(kw.get("headers") or {}), "x-standin-direct": "1"}
+            return await _orig(self, url_or_request, *a, **kw)
+        setattr(APIRequestContext, name, wrap)
+    APIRequestContext._standin = True
+
+
+async def attach(ctx):
+    if not STANDIN:
+        return
+    _patch_request_context()
+
+    async def _handler(route):
+        req = route.request
+        try:
+            hdrs = await req.all_headers()
+        except Exception:
+            hdrs = dict(req.headers)
+        hdrs = {k: v for k, v in hdrs.items() if not k.startswith(":") and k.lower() != "host"}
+        try:
+            resp = await route.fetch(url=rewrite(req.url), headers=hdrs, max_redirects=0)
+            await route.fulfill(response=resp)
+        except Exception:
+            await route.abort()
+    await ctx.route(HOST_RX, _handler)
+    print(f"[STANDIN] *.maketicket.co.kr → {STANDIN}", flush=True)
+
+
+# ---------- 카탈로그 ----------
+def _catalog(n: int, seed: int = 7) -> dict:
+    rnd = random.Random(seed)
+    out = {}
+    for i in range(n):
+        sd = f"{i + 1:03d}"
+        total = rnd.choice([120, 180, 240, 300, 400])
+        out[sd] = {"sdCode": sd, "prodSeq": str(3000000700 + i + 1), "sdSeq": "1", "perfDate": "20251001",
+                   "sdTime": f"{10 + i % 12:02d}:00", "title": f"스탠드인 상영 {sd}", "venue": "스탠드인관",
+                   "plan": "SEAT" if rnd.random() < STANDIN_SEAT_RATIO else "NRS",
+                   "total": total, "remain": rnd.randint(1, total)}
+    return out
+
+
+class StandIn:
+    def __init__(self, shows: int = 4, port: int = 0):
+        self.shows = _catalog(shows)
+        self.by_prod = {s["prodSeq"]: sd for sd, s in self.shows.items()}
+        self.port = port
+        self.events: list[dict] = []
+        self.marks: dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "StandIn":
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        owner = self
+
+        class _H(_Handler, BaseHTTPRequestHandler):
+            srv = owner
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", self.port), _H)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, name="standin", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    # ---------- 기록 ----------
+    def record(self, ev: dict, stage: str | None):
+        with self.lock:
+            self.events.append(ev)
+            sd = ev.get("sd")
+            if stage and sd:
+                self.marks.setdefault(sd, {}).setdefault(stage, ev["t"])
+
+    def last_event_t(self) -> float:
+        with self.lock:
+            return self.events[-1]["t"] if self.events else 0.0
+
+    def reached(self, stage: str) -> int:
+        with self.lock:
+            return sum(1 for m in self.marks.values() if stage in m)
+
+    def sd_of(self, q: dict, body: dict, referer: str) -> str | None:
+        for d in (q, body):
+            sd = d.get("sdCode") or d.get("sd_code")
+            if sd in self.shows: return sd
+            p = d.get("prodSeq") or d.get("prod_seq")
+            if p and str(p) in self.by_prod: return self.by_prod[str(p)]
+        if referer:
+            rq = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(referer).query))
+            if rq:
+                return self.sd_of(rq, {}, "")
+        return None
+
+
+# ---------- 페이지 ----------
+def _page(title: str, body: str, show: dict | None = None, logged: bool = True) -> str:
+    hidden = ""
+    if show:
+        hidden = (f'<input type="hidden" id="prodSeq" name="prodSeq" value="{show["prodSeq"]}">'
+                  f'<input type="hidden" id="sdSeq" name="sdSeq" value="{show["sdSeq"]}">'
+                  f'<input type="hidden" id="sdCode" name="sdCode" value="{show["sdCode"]}">')
+    nav = ('<a href="/ko/logout" class="logout">로그아웃</a> <a href="/ko/mypage/tickets/list">마이페이지</a>' if logged
+           else '<a href="/ko/login" class="login">로그인</a>')
+    return (f'<!doctype html><html lang="ko"><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<meta name="csrf-token" content="{CSRF}"></head><body>'
+            f'<header><nav>{nav}</nav></header><input type="hidden" id="csrfToken" name="csrfToken" value="{CSRF}">'
+            f'{hidden}<main>{body}</main></body></html>')
+
+
+def _qs(show: dict, **extra) -> str:
+    return urllib.parse.urlencode({"prodSeq": show["prodSeq"], "sdSeq": show["sdSeq"], "sdCode": show["sdCode"], **extra})
+
+
+def _login_page() -> str:
+    return _page("로그인", f"""
+<form id="loginForm" name="loginForm" method="post" action="/ko/login">
+  <input type="text" id="id" name="id" placeholder="아이디" autocomplete="username">
+  <input type="password" id="pw" name="pw" placeholder="비밀번호" autocomplete="current-password">
+  <button type="submit" id="btnLogin" class="btn-login">로그인</button>
+</form>
+<script>setTimeout(() => {{ const f = document.getElementById('loginForm'); if (f) f.submit(); }}, {STANDIN_LOGIN_MS});</script>
+""", logged=False)
+
+
+def _resmain(show: dict) -> str:
+    return _page(show["title"], f"""
+<h2 class="tit">{html.escape(show["title"])}</h2>
+<dl class="info"><dt>장소</dt><dd class="venue">{show["venue"]}</dd><dt>일시</dt><dd class="date">2025.10.01 {show["sdTime"]}</dd></dl>
+<a class="btn-reserve" href="{ONESTOP}/ko/onestop/booking?{_qs(show)}" target="_blank">예매하기</a>
+<script>var prodSeq = "{show["prodSeq"]}", sdSeq = "{show["sdSeq"]}";</script>
+""", show)
+
+
+def _api_js(show: dict, *eps: str) -> str:
+    """실제 onestop 페이지처럼 로드 직후 API 몇 개를 부름 (요청 부하 재현)."""
+    calls = "".join(
+        f'fetch("{API_HOST}/api/v1{ep}", {{method: "POST", credentials: "include", '
+        f'headers: {{"Content-Type": "application/json"}}, body: JSON.stringify({{prodSeq: "{show["prodSeq"]}", '
+        f'sdSeq: "{show["sdSeq"]}", csrfToken: "{CSRF}"}})}}).catch(() => 0);' for ep in eps)
+    return f"<script>{calls}</script>"
+
+
+def _price_page(show: dict, seat: str = "") -> str:
+    opts = "".join(f'<option value="{i}">{i}</option>' for i in range(0, 5))
+    return _page(f"{show['title']} - 가격", f"""
+<div class="rs-wrap price-wrap">
+  <h3>티켓수량 선택</h3>
+  <p class="price">일반 7,000원 · 청소년 5,000원</p>
+  <form id="rsForm" method="get" action="/booking">
+    <input type="hidden" name="prodSeq" value="{show["prodSeq"]}"><input type="hidden" name="sdSeq" value="{show["sdSeq"]}">
+    <input type="hidden" name="sdCode" value="{show["sdCode"]}"><input type="hidden" name="seat" value="{html.escape(seat)}">
+    <input type="hidden" name="step" value="pay">
+    <label>매수 <select name="rsVolume" id="rsVolume">{opts}</select></label>
+    <button type="submit" class="next btn-next">다음</button>
+  </form>
+</div>
+{_api_js(show, "/rs/tickettype", "/rs/blockSummary2")}
+""", show)
+
+
+def _seat_page(show: dict) -> str:
+    rnd = random.Random(int(show["prodSeq"]))
+    cells = []
+    for i in range(min(show["total"], 120)):
+        ok = rnd.random() < show["remain"] / max(1, show["total"])
+        cells.append(f'<button type="button" class="seat {"available" if ok else "sold"}" '
+                     f'data-seat-id="S{i + 1:04d}" data-seat-available="{"Y" if ok else "N"}">{i + 1}</button>')
+    return _page(f"{show['title']} - 좌석선택", f"""
+<div class="seat-wrap">
+  <h3>좌석선택</h3>
+  <div id="seatMap" class="seat-map">{"".join(cells)}</div>
+  <form id="seatForm" method="get" action="/ko/onestop/rs">
+    <input type="hidden" name="prodSeq" value="{show["prodSeq"]}"><input type="hidden" name="sdSeq" value="{show["sdSeq"]}">
+    <input type="hidden" name="sdCode" value="{show["sdCode"]}"><input type="hidden" id="seat" name="seat" value="">
+    <button type="submit" class="next btn-next">다음</button>
+  </form>
+</div>
+<script>
+document.querySelectorAll('#seatMap .seat.available').forEach(b => b.addEventListener('click', () => {{
+  document.getElementById('seat').value = b.dataset.seatId; b.classList.add('selected'); }}));
+document.getElementById('seatForm').addEventListener('submit', () => {{
+  const s = document.getElementById('seat'); if (!s.value) {{ const f = document.querySelector('#seatMap .seat.available'); if (f) s.value = f.dataset.seatId; }} }});
+</script>
+{_api_js(show, "/seat/GetRsSeatBaseMap", "/seat/GetRsSeatStatusList")}
+""", show)
+
+
+def _payment_page(show: dict | None) -> str:
+    return _page("주문서", """
+<h2>주문서</h2>
+<div id="payment">
+  <h3>결제수단</h3>
+  <div id="paymentMethod" class="payment-method payment-list">
+    <label><input type="radio" name="payMethod" value="CARD" checked> 카드결제</label>
+    <label><input type="radio" name="payMethod" value="BANK"> 무통장입금</label>
+  </div>
+  <form id="payForm" name="paymentForm" method="post" action="/payment">
+    <label><input type="checkbox" name="agree"> 약관 동의 (전체동의)</label>
+    <p>최종 결제금액 7,000원</p>
+    <button type="button" id="btnPay">결제하기</button>
+  </form>
+</div>
+""", show)
+
+
+# ---------- API ----------
+def _seats(show: dict) -> list[dict]:
+    rnd = random.Random(int(show["prodSeq"]))
+    n = min(show["total"], STANDIN_SEATS)
+    p = show["remain"] / max(1, show["total"])
+    out = []
+    for i in range(n):
+        ok = rnd.random() < p
+        nm = "휠체어석" if i % 50 == 49 else "일반석"
+        out.append({"seatId": f"S{i + 1:04d}", "seat_id": f"S{i + 1:04d}", "seatNo": str(i % 20 + 1),
+                    "x": i % 20, "y": i // 20, "seatTypeNm": nm, "seatStatusCd": "SS01000" if ok else "SS02000",
+                    "seatCnt": 1, "useYn": "Y", "saleYn": "Y" if ok else "N", "rsvYn": "N"})
+    return out
+
+
+def _api(ep: str, show: dict | None, shows: dict, q: dict) -> tuple[object, str | None]:
+    """엔드포인트(소문자) → (JSON, 단계)."""
+    ok = {"resultCode": "0000", "result": "OK", "csrfToken": CSRF}
+    if ep == "prodlist":
+        sel = [shows[q["sdCode"]]] if q.get("sdCode") in shows else list(shows.values())
+        return {"prodList": [{"prodSeq": int(s["prodSeq"]), "prodTycd": "NORMAL", "sdSeq": int(s["sdSeq"]),
+                              "sdCode": s["sdCode"], "sdDate": "2025.10.01 (수)", "sdTime": s["sdTime"],
+                              "perfDate": s["perfDate"], "perfMainNm": s["title"], "venueNm": s["venue"]}
+                             for s in sel]}, None
+    if show is None:
+        return ok, None
+    if ep == "prod":
+        return {**ok, "prod": {"prodSeq": show["prodSeq"], "prodNm": show["title"], "planType": show["plan"]},
+                "listSch": [{"sdSeq": show["sdSeq"], "sdCode": show["sdCode"], "perfDate": show["perfDate"],
+                             "remainCnt": show["remain"], "seatRemainCnt": show["remain"]}]}, None
+    if ep == "prodsummary":
+        return {**ok, "planType": show["plan"],
+                "summary": {"prodSeq": show["prodSeq"], "sdSeq": show["sdSeq"], "planType": show["plan"],
+                            "perfMainNm": show["title"], "venueNm": show["venue"], "perfDate": show["perfDate"],
+                            "sdTime": show["sdTime"]}}, "summary"
+    if ep == "blocksummary2":
+        t, r = show["total"], show["remain"]
+        return {**ok, "summary": [{"sdSeq": show["sdSeq"], "admissionTotalPersonCnt": t, "admissionAvailPersonCnt": r,
+                                   "saleSeatCnt": t, "restSeatCnt": r, "totalCnt": t, "remainCnt": r}],
+                "blockList": [{"blockNm": "A", "total_cnt": t, "remain_cnt": r, "totSeatCnt": t, "rmnSeatCnt": r}]}, "summary"
+    if ep == "tickettype":
+        return {**ok, "ticketTypeList": [{"tkttypNm": "일반", "tkttypSeq": 1, "seatClassSeq": 1, "price": 7000},
+                                         {"tkttypNm": "청소년", "tkttypSeq": 2, "seatClassSeq": 1, "price": 5000}]}, "price"
+    if ep == "getrsseatbasemap":
+        zl = [{"zoneNm": "A", "totalSeatCnt": show["total"], "rmnSeatCnt": show["remain"]}] if show["plan"] == "SEAT" else []
+        return {**ok, "planType": show["plan"], "zoneList": zl}, "summary"
+    if ep in ("getrsseatstatuslist", "getrszoneseatmapinfo"):
+        seats = _seats(show) if show["plan"] == "SEAT" else []
+        return {**ok, "sdSeq": show["sdSeq"], "list": seats, "seatList": seats}, "summary"
+    return ok, None
+
+
+# ---------- 핸들러 ----------
+class _Handler:     # BaseHTTPRequestHandler 는 StandIn.start 에서 합성 (러너는 http.server 없이 import)
+    srv: StandIn = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *a):
+        pass
+
+    def do_GET(self): self._serve()
+    def do_POST(self): self._serve()
+    def do_PUT(self): self._serve()
+    def do_HEAD(self): self._serve()
+
+    def do_OPTIONS(self):
+        self._send(204, b"", "text/plain", cors=True)
+
+    def _send(self, status: int, body: bytes, ctype: str, headers: dict | None = None, cors: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        if cors:
+            self.send_header("Access-Control-Allow-Origin", self.headers.get("Origin") or "*")
+            self.send_header("Access-Control-Allow-Credentials", "true")
+            self.send_header("Access-Control-Allow-Headers", self.headers.get("Access-Control-Request-Headers") or "*")
+            self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _sleep(self, ms: float):
+        if ms > 0:
+            time.sleep(ms * (1 + random.uniform(-STANDIN_JITTER, STANDIN_JITTER)) / 1000.0)
+
+    def _redirect(self, host: str, path: str):
+        direct = self.headers.get("x-standin-direct") == "1"
+        loc = f"{self.srv.url}/{host}{path}" if direct else f"https://{host}{path}"
+        return 302, b"", "text/html; charset=utf-8", {"Location": loc}
+
+    def _serve(self):
+        t = time.time()
+        parts = urllib.parse.urlsplit(self.path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        path = "/" + path
+        q = dict(urllib.parse.parse_qsl(parts.query))
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0)) if self.command in ("POST", "PUT") else b""
+        body = {}
+        if raw:
+            try:
+                body = json.loads(raw)
+                body = body if isinstance(body, dict) else {}
+            except ValueError:
+                body = dict(urllib.parse.parse_qsl(raw.decode("utf-8", "ignore")))
+        srv = self.srv
+        sd = srv.sd_of(q, body, self.headers.get("Referer") or "")
+        show = srv.shows.get(sd) if sd else None
+        logged = "SESSION=" in (self.headers.get("Cookie") or "")
+        lp = path.lower().rstrip("/") or "/"
+        ep = lp.rsplit("/", 1)[-1]
+        kind, stage, matched, extra = "page", None, True, None
+
+        if STATIC_RX.search(lp):
+            kind = "static"
+            status, out, ctype = 200, b"", "application/octet-stream"
+        elif host.startswith(("filmonestopapi.", "filmapi.")) or "/api/" in lp or \
+                (self.command == "POST" and ("/rs/" in lp or "/seat/" in lp)):
+            kind = "api"
+            self._sleep(STANDIN_API_MS)
+            js, stage = _api(ep, show, srv.shows, q)
+            matched = ep in ("prodlist", "prod", "prodsummary", "blocksummary2", "tickettype", "getrsseatbasemap",
+                             "getrsseatstatuslist", "getrszoneseatmapinfo", "chkprodsdseq", "prodchk",
+                             "informlimit", "produnlock", "seatstateinfo")
+            status, out, ctype = 200, json.dumps(js, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+        else:
+            self._sleep(STANDIN_PAGE_MS)
+            status, ctype = 200, "text/html; charset=utf-8"
+            if "login" in lp and self.command == "POST":
+                status, out, ctype, extra = self._redirect(host, "/ko")
+                extra["Set-Cookie"] = "SESSION=standin; Path=/; Domain=.maketicket.co.kr; SameSite=None; Secure"
+            elif "login" in lp:
+                out = _login_page()
+            elif lp.endswith("/logout"):
+                status, out, ctype, extra = self._redirect(host, "/ko/login")
+                extra["Set-Cookie"] = "SESSION=; Path=/; Domain=.maketicket.co.kr; Max-Age=0"
+            elif lp.endswith("/resmain") and show:
+                out = _resmain(show)
+            elif lp in ("/booking", "/payment", "/order") or lp.endswith(("/payment", "/order")):
+                if lp == "/booking" and q.get("step") != "pay" and show:
+                    status, out, ctype, extra = self._redirect(host, f"/ko/onestop/rs?{_qs(show)}")
+                else:
+                    out, stage = _payment_page(show), "payment"
+            elif lp.endswith("/booking") and show:
+                status, out, ctype, extra = self._redirect("filmonestop.maketicket.co.kr", f"/ko/onestop/rs?{_qs(show)}")
+            elif lp.endswith("/rs/seat") and show:
+                out = _seat_page(show)
+            elif (lp.endswith("/rs") or lp.endswith("/rs/price")) and show:
+                if show["plan"] == "SEAT" and not q.get("seat") and not lp.endswith("/price"):
+                    status, out, ctype, extra = self._redirect(host, f"/ko/onestop/rs/seat?{_qs(show)}")
+                else:
+                    out, stage = _price_page(show, q.get("seat", "")), "price"
+            else:
+                matched = lp in ("/", "/ko", "/kor")
+                out = _page("BIFF", '<h2>스탠드인</h2><a href="/ko/login">로그인</a>' if not logged else "<h2>스탠드인</h2>")
+            out = out.encode("utf-8") if isinstance(out, str) else out
+        srv.record({"t": t, "host": host, "path": path, "method": self.command, "kind": kind, "ep": ep,
+                    "sd": sd, "status": status, "matched": matched}, stage)
+        self._send(status, out, ctype, extra, cors=(kind == "api"))
+
+
+if __name__ == "__main__":
+    import sys
+    s = StandIn(int(sys.argv[1]) if len(sys.argv) > 1 else 4).start()
+    print(f"[STANDIN] {s.url}  (STANDIN={s.url} python bf.py 001 002 ...)  Ctrl+C 로 종료")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        s.stop()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# 실패/느린 회차만 남기는 Playwright trace 청크 링
+# - 기존(bf): 컨텍스트 전체·실행 전체에 tracing.start(screenshots, snapshots, sources) → 끝에 trace.zip 하나
+# - 여기: tracing 은 켜두되 TRACE_CHUNK_SEC 마다 stop_chunk/start_chunk 로 청크를 끊음
+#     한 컨텍스트에서 회차들이 동시에 돌기 때문에 청크는 "회차별"이 아니라 "시간 구간별"
+#     청크를 닫을 때 그 구간에 걸친 회차를 보고 결정:
+#       - 실패/SLO 초과로 끝난 회차가 있으면 → RUN_DIR/trace-<sd>-<n>.zip 로 바로 저장
+#       - 아직 진행 중인 회차가 있으면     → 링(임시 폴더, 최대 TRACE_RING 개)에 보관 (결과 나오면 승격/삭제)
+#       - 걸친 회차가 전부 끝났고 정상·빠름 → stop_chunk() 경로 없이 닫음 = 그 청크는 디스크 I/O 없음
+#   한계: 회차가 동시에 돌면 거의 모든 청크에 진행 중 회차가 걸림 → 대부분 임시 링에는 한 번 기록됨
+#         (정상 회차 청크는 결과가 나오면 지워질 뿐, 쓰기 자체는 일어남) / 기록 비용은 tracing 이 켜져 있는 동안 계속
+#     → ring 모드는 기록량을 줄여서 시작: DOM 스냅샷 끔(TRACE_RING_SNAPSHOTS=0), 스크린샷만(TRACE_RING_SHOTS=1)
+#       전체 DOM 스냅샷까지 필요하면 TRACE_RING_SNAPSHOTS=1 또는 TRACE_MODE=full
+# 사용:
+#   TR = TraceRing(ctx, RUN_DIR); await TR.start()
+#   async with TR.show(sd) as sh:  ...  (실패 시 sh.failed = True)
+#   또는 sh = TR.begin(sd) ... TR.end(sh, failed=...)   (예외를 안에서 삼키는 흐름용)
+#   await TR.stop()
+# ENV: TRACE_MODE=ring|full|off, TRACE_CHUNK_SEC=15, TRACE_RING=8, TRACE_SLO_SEC=90,
+#      TRACE_RING_SNAPSHOTS=0, TRACE_RING_SHOTS=1
+
+import asyncio, contextlib, os, shutil, tempfile, time
+from pathlib import Path
+
+TRACE_MODE = os.getenv("TRACE_MODE", "ring").lower()
+TRACE_CHUNK_SEC = float(os.getenv("TRACE_CHUNK_SEC", "15"))
+TRACE_RING = int(os.getenv("TRACE_RING", "8"))
+TRACE_SLO_SEC = float(os.getenv("TRACE_SLO_SEC", "90"))
+TRACE_RING_SNAPSHOTS = os.getenv("TRACE_RING_SNAPSHOTS", "0") == "1"
+TRACE_RING_SHOTS = os.getenv("TRACE_RING_SHOTS", "1") == "1"
+
+
+class _Show:
+    __slots__ = ("sd", "t0", "t1", "failed")
+    def __init__(self, sd):
+        self.sd, self.t0, self.t1, self.failed = sd, time.monotonic(), None, False
+
+    @property
+    def keep(self) -> bool:
+        return self.failed or (self.t1 is not None and self.t1 - self.t0 > TRACE_SLO_SEC)
+
+
+class TraceRing:
+    def __init__(self, ctx, run_dir: Path, mode: str = TRACE_MODE):
+        self.ctx, self.run_dir, self.mode = ctx, Path(run_dir), mode
+        self.shows: list[_Show] = []          # 현재 청크에 걸친 회차
+        self.ring: list[tuple[Path, set]] = []   # (임시 청크 파일, 걸친 회차 sd)
+        self.kept: list[Path] = []
+        self.n = 0
+        self.stats = {"chunks": 0, "dropped": 0, "ring": 0, "kept": 0, "evicted": 0}
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.tmp = None
+        self.active = False
+
+    async def start(self):
+        if self.mode == "off":
+            return
+        with contextlib.suppress(Exception):
+            if self.mode == "ring":      # 상시 기록 → 가볍게 (DOM 스냅샷이 가장 비쌈)
+                await self.ctx.tracing.start(screenshots=TRACE_RING_SHOTS, snapshots=TRACE_RING_SNAPSHOTS, sources=True)
+            else:
+                await self.ctx.tracing.start(screenshots=True, snapshots=True, sources=True)
+            self.active = True
+            if self.mode == "ring":
+                self.tmp = Path(tempfile.mkdtemp(prefix="trace-ring-"))
+                await self.ctx.tracing.start_chunk()
+                self.task = asyncio.create_task(self._rotator(), name="trace-ring")
+
+    def begin(self, sd: str) -> _Show:
+        sh = _Show(str(sd))
+        self.shows.append(sh)
+        return sh
+
+    def end(self, sh: _Show, failed: bool | None = None):
+        if failed is not None:
+            sh.failed = failed
+        sh.t1 = time.monotonic()
+        if self.active and self.mode == "ring":
+            self._settle(sh)
+
+    @contextlib.asynccontextmanager
+    async def show(self, sd: str):
+        sh = self.begin(sd)
+        try:
+            yield sh
+        except BaseException:
+            sh.failed = True
+            raise
+        finally:
+            self.end(sh)
+
+    # ---------- 청크 ----------
+    async def _rotator(self):
+        while True:
+            await asyncio.sleep(TRACE_CHUNK_SEC)
+            await self._rotate(restart=True)
+
+    async def _rotate(self, restart: bool):
+        async with self.lock:
+            shows, self.shows = self.shows, [s for s in self.shows if s.t1 is None]   # 진행 중은 다음 청크에도 걸침
+            self.n += 1
+            self.stats["chunks"] += 1
+            keep = [s.sd for s in shows if s.keep]
+            running = [s for s in shows if s.t1 is None]
+            live = {s.sd for s in running}
+            try:
+                if keep:
+                    p = self.run_dir / f"trace-{'_'.join(sorted(set(keep)))[:60]}-{self.n:03d}.zip"
+                    await self.ctx.tracing.stop_chunk(path=str(p))
+                    self.kept.append(p); self.stats["kept"] += 1
+                    live -= set(keep)
+                    if live:         # 같은 구간의 진행 중 회차도 이 파일로 승격될 수 있게 링에도 기록
+                        self.ring.append((p, live)); self._evict()
+                elif live:
+                    p = self.tmp / f"chunk-{self.n:03d}.zip"
+                    await self.ctx.tracing.stop_chunk(path=str(p))
+                    self.ring.append((p, live)); self.stats["ring"] += 1
+                    self._evict()
+                else:
+                    await self.ctx.tracing.stop_chunk()    # 정상 회차뿐 → 버림 (쓰기 없음)
+                    self.stats["dropped"] += 1
+                # stop_chunk 를 기다리는 사이 끝난 회차는 end() 의 _settle 이 이 청크를 못 봤음 → 여기서 정리
+                for s in running:
+                    if s.t1 is not None:
+                        self._settle(s)
+                if restart:
+                    await self.ctx.tracing.start_chunk()
+            except Exception as e:
+                print(f"[TRACE] chunk 처리 실패: {e}", flush=True)
+
+    def _evict(self):
+        while len(self.ring) > TRACE_RING:
+            p, _ = self.ring.pop(0)
+            if p.parent == self.tmp:
+                with contextlib.suppress(OSError): p.unlink()
+            self.stats["evicted"] += 1
+
+    def _settle(self, sh: _Show):
+        """회차 결과가 나오면 링에 있던 그 회차 청크를 승격(실패/느림) 또는 정리(정상)."""
+        rest = []
+        for p, sds in self.ring:
+            if sh.sd not in sds:
+                rest.append((p, sds)); continue
+            if sh.keep and p.parent == self.tmp:
+                dst = self.run_dir / f"trace-{sh.sd}-{p.stem.split('-')[-1]}.zip"
+                with contextlib.suppress(OSError):
+                    shutil.move(str(p), dst); self.kept.append(dst); self.stats["kept"] += 1
+                continue
+            sds = sds - {sh.sd}
+            if sds:
+                rest.append((p, sds))
+            elif p.parent == self.tmp:
+                with contextlib.suppress(OSError): p.unlink()
+        self.ring = rest
+
+    async def stop(self, full_path: Path | None = None):
+        if not self.active:
+            return
+        if self.task is not None:
+            self.task.cancel()
+            with contextlib.suppress(BaseException): await self.task
+        with contextlib.suppress(Exception):
+            if self.mode == "ring":
+                await self._rotate(restart=False)
+                await self.ctx.tracing.stop()
+            else:
+                await self.ctx.tracing.stop(path=str(full_path or self.run_dir / "trace.zip"))
+        if self.tmp is not None:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def report(self) -> str:
+        st = self.stats
+        if self.mode != "ring":
+            return f"[TRACE] mode={self.mode}"
+        return (f"[TRACE] ring chunks={st['chunks']} dropped(no I/O)={st['dropped']} ring(tmp write)={st['ring']} "
+                f"kept={st['kept']} evicted={st['evicted']} (chunk={TRACE_CHUNK_SEC:.0f}s slo={TRACE_SLO_SEC:.0f}s)")
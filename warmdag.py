@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# RS 세션 워밍업 DAG 실행기
+# - 기존: prod → prodChk → chkProdSdSeq → informLimit → prodSummary → blockSummary2 전부 순차
+# - 실제로 서버 세션 상태에 기대는 의존만 간선으로 남기고 나머지는 동시에 실행
+#     prodChk      : 세션의 현재 회차(sdSeq)를 바꾸는 호출 → 이후 회차 단위 호출 전부의 선행
+#     chkProdSdSeq : 바뀐 회차 검증 → 집계(prodSummary/blockSummary2)는 이 뒤
+#     informLimit  : 구매 한도 안내일 뿐 → prodChk 뒤이기만 하면 됨 (집계와 병렬)
+#     prod         : 상품 단위(회차 무관) → 루트
+# - 노드별 (시작 오프셋, 소요 ms, 성공) 기록 → report()
+# 사용:
+#   await run_dag([node("prodChk", lambda: P(...)), node("informLimit", lambda: P(...), required=False)],
+#                 name="swap", log=dlog)
+#   deps 생략 시 RS_DEPS 기준. 목록에 없는 선행 노드는 무시(예: swap에는 prod 없음)
+#   required=True 노드 실패 → 후속 노드 취소 + 예외 전파 / False → log 후 후속 노드 계속
+# ENV: WARMDAG=1 (0이면 선언 순서대로 순차 실행), WARMDAG_LOG=0 (1이면 매 실행 타임라인 출력)
+
+import asyncio, os, time
+from collections import defaultdict
+
+import metrics
+
+WARMDAG = os.getenv("WARMDAG", "1") == "1"
+WARMDAG_LOG = os.getenv("WARMDAG_LOG", "0") == "1"
+
+RS_DEPS = {
+    "prod":          (),
+    "prodChk":       ("prod",),
+    "chkProdSdSeq":  ("prodChk",),
+    "informLimit":   ("prodChk",),
+    "prodSummary":   ("chkProdSdSeq",),
+    "blockSummary2": ("chkProdSdSeq",),
+}
+
+# (dag, node) → [n, sum_ms, max_ms, fails]
+NODE_STATS: dict = defaultdict(lambda: [0, 0.0, 0.0, 0])
+# dag → [runs, sum_wall_ms, sum_serial_ms]
+DAG_STATS: dict = defaultdict(lambda: [0, 0.0, 0.0])
+
+
+class Node:
+    __slots__ = ("name", "fn", "deps", "required")
+    def __init__(self, name, fn, deps=None, required=True):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(RS_DEPS.get(name, ()) if deps is None else deps)
+        self.required = required
+
+
+def node(name: str, fn, deps=None, *, required: bool = True) -> Node:
+    return Node(name, fn, deps, required)
+
+
+async def run_dag(nodes, *, name: str = "dag", log=None) -> dict:
+    """노드 실행. {"wall_ms", "nodes": {name: (start_ms, dur_ms, ok)}} 반환."""
+    nodes = list(nodes)
+    names = {n.name for n in nodes}
+    t0 = time.monotonic()
+    tl: dict = {}
+
+    async def _exec(n: Node):
+        s = time.monotonic()
+        ok = True
+        try:
+            return await n.fn()
+        except Exception as e:
+            ok = False
+            if n.required:
+                raise
+            if log: log(f"[{name}] {n.name} warn: {e}")
+            return None
+        finally:
+            dur = (time.monotonic() - s) * 1000.0
+            tl[n.name] = (round((s - t0) * 1000.0), round(dur), ok)
+            st = NODE_STATS[(name, n.name)]
+            st[0] += 1; st[1] += dur; st[2] = max(st[2], dur); st[3] += (not ok)
+            metrics.stage_ms(f"{name}.{n.name}", dur, outcome="ok" if ok else "error")
+
+    if not WARMDAG:
+        for n in nodes:
+            await _exec(n)
+    else:
+        tasks: dict = {}
+
+        async def _after_deps(n: Node):
+            for d in n.deps:
+                if d in names:
+                    await tasks[d]      # 필수 선행 실패 시 여기서 같은 예외로 중단
+            return await _exec(n)
+
+        for n in nodes:
+            tasks[n.name] = asyncio.ensure_future(_after_deps(n))
+        try:
+            done, pending = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+            for t in done:
+                if not t.cancelled() and t.exception() is not None:
+                    raise t.exception()
+        finally:
+            for t in tasks.values():
+                if not t.done(): t.cancel()
+            for t in tasks.values():      # 회수 안 된 예외 경고 방지
+                if t.done() and not t.cancelled(): t.exception()
+
+    wall = (time.monotonic() - t0) * 1000.0
+    ds = DAG_STATS[name]
+    ds[0] += 1; ds[1] += wall; ds[2] += sum(v[1] for v in tl.values())
+    if WARMDAG_LOG:
+        order = sorted(tl.items(), key=lambda kv: kv[1][0])
+        print(f"[WARMDAG] {name} {wall:.0f}ms | " +
+              " ".join(f"{k}@{a}+{d}{'' if ok else '✗'}" for k, (a, d, ok) in order), flush=True)
+    return {"wall_ms": round(wall), "nodes": tl}
+
+
+def report() -> list[str]:
+    out = []
+    for dag, (runs, wall, serial) in sorted(DAG_STATS.items()):
+        if not runs: continue
+        out.append(f"[WARMDAG] {dag}: runs={runs} avg={wall/runs:.0f}ms (순차 합계 {serial/runs:.0f}ms)")
+        for (d, nm), (n, tot, mx, fails) in NODE_STATS.items():
+            if d == dag and n:
+                out.append(f"    {nm:<14} avg={tot/n:.0f}ms max={mx:.0f}ms" + (f" fail={fails}" if fails else ""))
+    return out
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# RS 워밍업 상태 레지스트리 (세션 = BrowserContext 단위)
+# - (step, prodSeq, sdSeq) 별 마지막 성공 시각 기록 → TTL 안이면 같은 워밍업 생략
+# - 회차 종속 step(prodChk 등)은 세션당 "현재 회차" 하나만 유효:
+#     다른 sdSeq로 prodChk 하면 서버 세션이 그 회차로 바뀌므로 이전 회차 기록은 폐기
+# - 응답이 세션 유실(401/403/419, 로그인·세션 만료 메시지)로 보이면 그 세션 기록 전부 폐기
+# - 동시에 같은 워밍업을 부르면 첫 호출 결과를 함께 기다림 (중복 왕복 X)
+# 사용:
+#   await WARM.once(page, "prod", prodSeq, "", lambda: post_api(page, "/rs/prod", ...))   # 생략 시 None
+#   WARM.mark(page, "prod", prodSeq)          # 응답을 직접 쓰는 호출(예: listSch 조회)도 워밍업으로 인정
+#   WARM.observe(page, status, body)          # fetch 계층에서 호출 → 세션 유실 감지
+# ENV: WARMSTATE=1, WARM_TTL_SEC=120
+
+import asyncio, os, re, time
+from collections import Counter
+
+WARMSTATE = os.getenv("WARMSTATE", "1") == "1"
+WARM_TTL_SEC = float(os.getenv("WARM_TTL_SEC", "120"))
+
+# 서버 세션의 "현재 회차"에 묶이는 step
+SD_BOUND = {"prodChk", "chkProdSdSeq", "informLimit", "prodSummary", "blockSummary2"}
+LOST_STATUS = {401, 403, 419, 440}
+_LOST_RX = re.compile(r"세션|로그인|만료|session|login|expired|csrf", re.I)
+
+
+def session_key(scope) -> int:
+    """Page/Frame/BrowserContext → 쿠키를 공유하는 BrowserContext 식별자."""
+    if scope is None:
+        return 0
+    obj = getattr(scope, "page", None) or scope      # Frame/Locator → Page
+    ctx = getattr(obj, "context", None) or obj       # Page → BrowserContext (ctx 자신은 그대로)
+    return id(ctx)
+
+
+def session_lost(status=None, body=None) -> bool:
+    try:
+        if status is not None and int(status) in LOST_STATUS:
+            return True
+    except Exception:
+        pass
+    if isinstance(body, dict):
+        code = str(body.get("resultCode") or body.get("code") or "")
+        if code and code not in ("0", "0000", "200", "SUCCESS"):
+            msg = str(body.get("resultMessage") or body.get("message") or body.get("msg") or "")
+            return bool(_LOST_RX.search(msg))
+    elif isinstance(body, str):
+        head = body[:400].lstrip()
+        return head.startswith("<") and bool(_LOST_RX.search(head))   # 로그인 페이지로 리다이렉트된 HTML
+    return False
+
+
+class WarmState:
+    def __init__(self, ttl: float = WARM_TTL_SEC):
+        self.ttl = ttl
+        self.done: dict[int, dict] = {}      # sess → {(step, prodSeq, sdSeq): ts}
+        self.cur: dict[int, tuple] = {}      # sess → 서버 세션의 현재 (prodSeq, sdSeq)
+        self.inflight: dict[tuple, asyncio.Future] = {}
+        self.stats = Counter()               # run / skip / shared / lost
+
+    def fresh(self, scope, step: str, prodSeq, sdSeq="") -> bool:
+        if not WARMSTATE:
+            return False
+        s = session_key(scope)
+        k = (step, str(prodSeq or ""), str(sdSeq or ""))
+        if step in SD_BOUND and self.cur.get(s) != k[1:]:
+            return False
+        ts = self.done.get(s, {}).get(k)
+        return ts is not None and (time.monotonic() - ts) < self.ttl
+
+    def mark(self, scope, step: str, prodSeq, sdSeq=""):
+        s = session_key(scope)
+        k = (step, str(prodSeq or ""), str(sdSeq or ""))
+        d = self.done.setdefault(s, {})
+        if step in SD_BOUND and self.cur.get(s) != k[1:]:
+            for kk in [kk for kk in d if kk[0] in SD_BOUND]:
+                del d[kk]
+            self.cur[s] = k[1:]
+        d[k] = time.monotonic()
+
+    def lost(self, scope, why: str = ""):
+        s = session_key(scope)
+        if self.done.pop(s, None):
+            self.stats["lost"] += 1
+            print(f"[WARM] 세션 유실 감지 → 워밍업 기록 초기화 {why}".rstrip(), flush=True)
+        self.cur.pop(s, None)
+
+    def observe(self, scope, status=None, body=None) -> bool:
+        if session_lost(status, body):
+            self.lost(scope, f"(status={status})")
+            return True
+        return False
+
+    async def once(self, scope, step: str, prodSeq, sdSeq, fn, ok=None):
+        """TTL 안에 이미 한 워밍업이면 None, 아니면 fn() 결과.
+        실패(예외 / 세션유실 / ok(r)가 False / {"__error__"})는 기록 안 함."""
+        if self.fresh(scope, step, prodSeq, sdSeq):
+            self.stats["skip"] += 1
+            return None
+        key = (session_key(scope), step, str(prodSeq or ""), str(sdSeq or ""))
+        fut = self.inflight.get(key)
+        if fut is not None and WARMSTATE:
+            self.stats["shared"] += 1
+            return await asyncio.shield(fut)
+        fut = asyncio.ensure_future(fn())
+        self.inflight[key] = fut
+        try:
+            r = await fut
+        finally:
+            self.inflight.pop(key, None)
+        self.stats["run"] += 1
+        good = ok(r) if ok is not None else not (isinstance(r, dict) and r.get("__error__"))
+        if not self.observe(scope, None, r) and good:
+            self.mark(scope, step, prodSeq, sdSeq)
+        return r
+
+    def report(self) -> str:
+        st = self.stats
+        return (f"[WARM] run={st['run']} skip={st['skip']} shared={st['shared']} lost={st['lost']}"
+                f" (ttl={self.ttl:.0f}s)")
+
+
+WARM = WarmState()